@@ -1,5 +1,5 @@
 """Auth package - Authentication and authorization utilities"""
 from app.auth.jwt_handler import create_access_token, verify_token
-from app.auth.password import hash_password, verify_password
+from app.auth.password import hash_password, verify_password, password_hasher
 
-__all__ = ["create_access_token", "verify_token", "hash_password", "verify_password"]
+__all__ = ["create_access_token", "verify_token", "hash_password", "verify_password", "password_hasher"]
@@ -1,9 +1,30 @@
 """
 JWT token creation and verification
 """
+import base64
+import hashlib
+import hmac
+import json
+import time
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from jose import JWTError, ExpiredSignatureError, jwt
 from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.ttl_cache import TTLCache
+
+# HMAC algorithms supported by the native verification backend
+_NATIVE_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+# Verified claims keyed by token digest; entries never outlive the token's exp
+_claims_cache = TTLCache(
+    max_size=settings.JWT_CACHE_SIZE,
+    ttl_seconds=settings.JWT_CACHE_TTL_SECONDS
+)
+register_metrics("jwt_cache", _claims_cache.stats)
 
 def create_access_token(data: dict) -> str:
     """
@@ -30,10 +51,70 @@ def create_access_token(data: dict) -> str:
     
     return encoded_jwt
 
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _decode_native(token: str) -> dict:
+    """
+    Verify an HMAC-signed JWT with the standard library only.
+
+    Equivalent to jose for the claims this app issues (signature and exp),
+    without jose's generic key handling and claim validation overhead.
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(_b64url_decode(header_segment))
+        signature = _b64url_decode(signature_segment)
+    except ValueError:
+        raise JWTError("Invalid token")
+    if not isinstance(header, dict):
+        raise JWTError("Invalid header")
+
+    algorithm = header.get("alg")
+    digestmod = _NATIVE_ALGORITHMS.get(algorithm)
+    if algorithm != settings.JWT_ALGORITHM or digestmod is None:
+        raise JWTError("The specified alg value is not allowed")
+
+    expected = hmac.digest(
+        settings.JWT_SECRET.encode(),
+        f"{header_segment}.{payload_segment}".encode(),
+        digestmod
+    )
+    if not hmac.compare_digest(expected, signature):
+        raise JWTError("Signature verification failed")
+
+    try:
+        payload = json.loads(_b64url_decode(payload_segment))
+    except ValueError:
+        raise JWTError("Invalid payload")
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)):
+            raise JWTError("Expiration Time claim (exp) must be an integer")
+        if exp <= time.time():
+            raise ExpiredSignatureError("Signature has expired")
+
+    return payload
+
+def _decode(token: str) -> dict:
+    if settings.JWT_BACKEND == "native":
+        return _decode_native(token)
+    return jwt.decode(
+        token,
+        settings.JWT_SECRET,
+        algorithms=[settings.JWT_ALGORITHM]
+    )
+
 def verify_token(token: str) -> dict:
     """
     Verify and decode a JWT token.
     
+    Successful verifications are cached by token digest until the token
+    expires (or the cache TTL, whichever is sooner).
+    
     Args:
         token: JWT token string to verify
         
@@ -43,12 +124,16 @@ def verify_token(token: str) -> dict:
     Raises:
         JWTError: If token is invalid or expired
     """
-    try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        return payload
-    except JWTError:
-        raise
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _claims_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    
+    payload = _decode(token)
+    
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    if ttl is None or ttl > 0:
+        _claims_cache.set(cache_key, payload, ttl)
+    
+    return dict(payload)
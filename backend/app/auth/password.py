@@ -1,10 +1,22 @@
 """
 Password hashing and verification using bcrypt
 """
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from app.config import settings
+from app.utils.metrics import register_metrics
 
-# Create password context with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Create password context with bcrypt; hashes below the configured cost
+# are flagged for rehashing on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS
+)
 
 def hash_password(password: str) -> str:
     """
@@ -30,3 +42,95 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         True if password matches, False otherwise
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its cost factor is outdated.
+
+    Args:
+        plain_password: Plain text password to verify
+        hashed_password: Hashed password to compare against
+
+    Returns:
+        Tuple of (matches, new hash or None if no rehash is needed)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded worker pool so it never blocks the event loop.
+
+    bcrypt releases the GIL, so a thread pool is enough to use every core;
+    PASSWORD_HASH_EXECUTOR=process isolates it in worker processes instead.
+    When more than PASSWORD_HASH_MAX_PENDING calls are queued, new calls
+    fail fast with 503 rather than piling up behind a login burst.
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                self._executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            # Cancelled calls (client gone) count as neither
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop"""
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify (and possibly rehash) a password off the event loop"""
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        """Release the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """Return queue-depth counters"""
+        return {
+            "pending": self.pending,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+# Shared hasher
+password_hasher = PasswordHasher()
+register_metrics("password_hasher", password_hasher.stats)
@@ -17,26 +17,149 @@ class Settings:
         "DATABASE_URL", 
         "mongodb://localhost:27017"
     )
+    # Explain registered hot queries before serving; a COLLSCAN stops startup
+    INDEX_EXPLAIN_CHECK: bool = os.getenv("INDEX_EXPLAIN_CHECK", "false").lower() == "true"
     
     # JWT configuration
     JWT_SECRET: str = os.getenv("JWT_SECRET", secrets.token_urlsafe(32))
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
+    JWT_BACKEND: str = os.getenv("JWT_BACKEND", "jose")  # "jose" or "native" (stdlib HMAC verification)
+    JWT_CACHE_SIZE: int = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+    JWT_CACHE_TTL_SECONDS: int = int(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+    
+    # Password hashing (bcrypt runs on a bounded pool off the event loop)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))  # Beyond this, fail fast with 503
+    
+    # Authenticated-user cache (get_current_user)
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    # Invalidate across workers via a users change stream (needs a replica set)
+    USER_CACHE_CHANGE_STREAM: bool = os.getenv("USER_CACHE_CHANGE_STREAM", "false").lower() == "true"
     
     # Google Gemini API configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "")  # Preferred model; also the fallback if discovery fails
+    GEMINI_MODEL_TTL_SECONDS: int = int(os.getenv("GEMINI_MODEL_TTL_SECONDS", "3600"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    GEMINI_RATE_PER_SECOND: float = float(os.getenv("GEMINI_RATE_PER_SECOND", "1"))  # 0 disables rate limiting
+    GEMINI_RATE_BURST: float = float(os.getenv("GEMINI_RATE_BURST", "5"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    GEMINI_RETRY_BASE_SECONDS: float = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "1"))
+    GEMINI_RETRY_MAX_SECONDS: float = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "20"))
     
     # Razorpay Payment Gateway configuration
     RAZORPAY_KEY_ID: str = os.getenv("RAZORPAY_KEY_ID", "")
     RAZORPAY_KEY_SECRET: str = os.getenv("RAZORPAY_KEY_SECRET", "")
+    RAZORPAY_BASE_URL: str = os.getenv("RAZORPAY_BASE_URL", "https://api.razorpay.com")  # e.g. http://127.0.0.1:9090 for benchmarks/fake_razorpay.py
+    RAZORPAY_POOL_SIZE: int = int(os.getenv("RAZORPAY_POOL_SIZE", "8"))  # Gateway threads and pooled connections
+    RAZORPAY_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT_SECONDS", "3"))
+    RAZORPAY_READ_TIMEOUT_SECONDS: float = float(os.getenv("RAZORPAY_READ_TIMEOUT_SECONDS", "10"))
+    RAZORPAY_CONNECT_RETRIES: int = int(os.getenv("RAZORPAY_CONNECT_RETRIES", "2"))  # Only failed connects are retried
+    RAZORPAY_ORDER_REUSE_SECONDS: int = int(os.getenv("RAZORPAY_ORDER_REUSE_SECONDS", "43200"))  # Reuse a booking's order while younger than this
+    RAZORPAY_WEBHOOK_SECRET: str = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")  # Webhooks are rejected when unset
+    PAYMENT_EVENT_BATCH_SIZE: int = int(os.getenv("PAYMENT_EVENT_BATCH_SIZE", "100"))  # Events applied per bulk_write
+    PAYMENT_EVENT_POLL_SECONDS: float = float(os.getenv("PAYMENT_EVENT_POLL_SECONDS", "2"))
+    PAYMENT_EVENT_LEASE_SECONDS: int = int(os.getenv("PAYMENT_EVENT_LEASE_SECONDS", "60"))
+    PAYMENT_EVENT_MAX_ATTEMPTS: int = int(os.getenv("PAYMENT_EVENT_MAX_ATTEMPTS", "5"))
     
     # CORS configuration
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
     
     # File upload configuration
     UPLOAD_DIR: str = "uploads"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")  # "local" or "s3"
+    STORAGE_IO_THREADS: int = int(os.getenv("STORAGE_IO_THREADS", "8"))
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "uploads")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    
+    # Thumbnail variants served from /uploads/{key}?w=...
+    THUMBNAIL_CACHE_DIR: str = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnail_cache")
+    THUMBNAIL_CACHE_MAX_BYTES: int = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    THUMBNAIL_WIDTHS: list = [int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "160,320,640").split(",")]
+    THUMBNAIL_FORMAT: str = os.getenv("THUMBNAIL_FORMAT", "WEBP")  # Default variant format
+    # Widths generated right after upload; empty disables pregeneration
+    THUMBNAIL_PREGENERATE_WIDTHS: list = [
+        int(w) for w in os.getenv("THUMBNAIL_PREGENERATE_WIDTHS", "").split(",") if w.strip()
+    ]
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     
+    # Uploaded images are downscaled and re-encoded before analysis and storage
+    IMAGE_MAX_SIDE: int = int(os.getenv("IMAGE_MAX_SIDE", "1280"))  # Longest side in pixels
+    IMAGE_MAX_BYTES: int = int(os.getenv("IMAGE_MAX_BYTES", str(400 * 1024)))
+    IMAGE_OUTPUT_FORMAT: str = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG")  # JPEG or WEBP
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    
+    # Food/activity log listings (keyset pagination)
+    LOG_PAGE_DEFAULT_LIMIT: int = int(os.getenv("LOG_PAGE_DEFAULT_LIMIT", "50"))
+    LOG_PAGE_MAX_LIMIT: int = int(os.getenv("LOG_PAGE_MAX_LIMIT", "200"))
+    # Trainer marketplace listings (anonymous queries are cached per worker)
+    TRAINER_CACHE_SIZE: int = int(os.getenv("TRAINER_CACHE_SIZE", "256"))
+    TRAINER_CACHE_TTL_SECONDS: int = int(os.getenv("TRAINER_CACHE_TTL_SECONDS", "30"))
+    TRAINER_SEARCH_MAX_LIMIT: int = int(os.getenv("TRAINER_SEARCH_MAX_LIMIT", "50"))
+    
+    # Trainer booking slots (hours are local to TRAINER_TIMEZONE)
+    TRAINER_TIMEZONE: str = os.getenv("TRAINER_TIMEZONE", "Asia/Kolkata")  # IANA zone name
+    TRAINER_SLOT_MINUTES: int = int(os.getenv("TRAINER_SLOT_MINUTES", "30"))  # Sessions are whole slots
+    TRAINER_DAY_START_HOUR: int = int(os.getenv("TRAINER_DAY_START_HOUR", "6"))
+    TRAINER_DAY_END_HOUR: int = int(os.getenv("TRAINER_DAY_END_HOUR", "21"))
+    TRAINER_SLOTS_MAX_DAYS: int = int(os.getenv("TRAINER_SLOTS_MAX_DAYS", "31"))  # Longest open-slot query
+    BOOKING_PAYMENT_TIMEOUT_MINUTES: int = int(os.getenv("BOOKING_PAYMENT_TIMEOUT_MINUTES", "30"))  # Unpaid bookings are then cancelled
+    BOOKING_SWEEP_SECONDS: float = float(os.getenv("BOOKING_SWEEP_SECONDS", "60"))
+    
+    # Response compression (brotli needs the optional brotli package)
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    # Serialize list endpoints straight from documents (see app/utils/fast_json.py)
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # Entries per /batch request
+    
+    # Rate limiting (see app/middleware/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" (per worker) or "mongo" (shared)
+    RATE_LIMIT_LOGIN_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_LOGIN_PER_MINUTE", "10"))  # Per IP, login and signup
+    RATE_LIMIT_LOGIN_BURST: int = int(os.getenv("RATE_LIMIT_LOGIN_BURST", "10"))
+    RATE_LIMIT_UPLOAD_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_UPLOAD_PER_MINUTE", "10"))  # Per user, Gemini-backed uploads
+    RATE_LIMIT_UPLOAD_BURST: int = int(os.getenv("RATE_LIMIT_UPLOAD_BURST", "5"))
+    RATE_LIMIT_DEFAULT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_DEFAULT_PER_SECOND", "20"))  # Other /api routes; 0 disables
+    RATE_LIMIT_DEFAULT_BURST: int = int(os.getenv("RATE_LIMIT_DEFAULT_BURST", "60"))
+    RATE_LIMIT_MEMORY_KEYS: int = int(os.getenv("RATE_LIMIT_MEMORY_KEYS", "100000"))  # Buckets kept per worker (LRU)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"  # Key IPs by X-Forwarded-For behind a proxy
+    RATE_LIMIT_FORWARDED_HOPS: int = int(os.getenv("RATE_LIMIT_FORWARDED_HOPS", "1"))  # Trusted proxies appending to X-Forwarded-For
+    
+    # Background food image analysis jobs
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "2"))
+    ANALYSIS_JOB_POLL_SECONDS: float = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", "1"))
+    ANALYSIS_JOB_LEASE_SECONDS: int = int(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "120"))
+    ANALYSIS_JOB_MAX_ATTEMPTS: int = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+    ANALYSIS_CALLBACK_TIMEOUT_SECONDS: float = float(os.getenv("ANALYSIS_CALLBACK_TIMEOUT_SECONDS", "5"))
+    ANALYSIS_CALLBACK_ALLOWED_HOSTS: str = os.getenv("ANALYSIS_CALLBACK_ALLOWED_HOSTS", "")  # Comma-separated; empty allows any public host
+    ANALYSIS_JOB_RETRY_BASE_SECONDS: float = float(os.getenv("ANALYSIS_JOB_RETRY_BASE_SECONDS", "5"))  # Doubles per attempt
+    ANALYSIS_JOB_RETRY_MAX_SECONDS: float = float(os.getenv("ANALYSIS_JOB_RETRY_MAX_SECONDS", "300"))
+    
+    # Food image analysis cache configuration
+    ANALYSIS_CACHE_MEMORY_SIZE: int = int(os.getenv("ANALYSIS_CACHE_MEMORY_SIZE", "1024"))
+    ANALYSIS_CACHE_TTL_HOURS: int = int(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "720"))  # 30 days
+    ANALYSIS_CACHE_MAX_DOCUMENTS: int = int(os.getenv("ANALYSIS_CACHE_MAX_DOCUMENTS", "100000"))
+    ANALYSIS_CACHE_TRIM_INTERVAL: int = int(os.getenv("ANALYSIS_CACHE_TRIM_INTERVAL", "100"))  # Writes between cap checks
+    
+    # Near-duplicate (perceptual hash) lookup configuration
+    # Max Hamming distance out of 64 bits; -1 disables that scope
+    PHASH_USER_MAX_DISTANCE: int = int(os.getenv("PHASH_USER_MAX_DISTANCE", "6"))
+    PHASH_GLOBAL_MAX_DISTANCE: int = int(os.getenv("PHASH_GLOBAL_MAX_DISTANCE", "3"))
+    PHASH_USER_MAX_ENTRIES: int = int(os.getenv("PHASH_USER_MAX_ENTRIES", "500"))
+    PHASH_GLOBAL_MAX_ENTRIES: int = int(os.getenv("PHASH_GLOBAL_MAX_ENTRIES", "1000000"))
+    PHASH_USER_INDEX_COUNT: int = int(os.getenv("PHASH_USER_INDEX_COUNT", "10000"))
+    PHASH_USER_INDEX_TTL_HOURS: int = int(os.getenv("PHASH_USER_INDEX_TTL_HOURS", "24"))
+    
     # Application metadata
     APP_NAME: str = "AI Fitness & Food Tracking App"
     VERSION: str = "1.0.0"
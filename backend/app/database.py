@@ -2,16 +2,36 @@
 Database configuration for MongoDB Atlas.
 Uses Motor (async MongoDB driver) for FastAPI.
 """
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
 
 # MongoDB client
 client = None
 database = None
+index_task = None
 
-async def connect_to_mongo():
-    """Connect to MongoDB Atlas on application startup"""
-    global client, database
+async def _apply_indexes_safely(db):
+    """Run the index registry, reporting failures instead of crashing startup"""
+    from app.indexes import apply_indexes
+    try:
+        await apply_indexes(db)
+    except Exception as e:
+        print(f"❌ MongoDB index check failed: {e}")
+
+async def connect_to_mongo(apply_indexes_in_background: bool = True):
+    """
+    Connect to MongoDB Atlas on application startup.
+    
+    Args:
+        apply_indexes_in_background: Ensure registered indexes in a background task
+
+    Raises:
+        RuntimeError: If INDEX_EXPLAIN_CHECK is on and a hot query scans a
+            collection, so the application refuses to start
+    """
+    global client, database, index_task
+    check_indexes_now = False
     try:
         import ssl
         import certifi
@@ -34,6 +54,14 @@ async def connect_to_mongo():
         await client.admin.command('ping')
         database = client.fitness_app
         print("✅ Connected to MongoDB Atlas")
+        
+        # Idempotent; runs in the background so startup is not delayed,
+        # unless the explain check must pass before serving
+        if apply_indexes_in_background:
+            if settings.INDEX_EXPLAIN_CHECK:
+                check_indexes_now = True
+            else:
+                index_task = asyncio.create_task(_apply_indexes_safely(database))
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
         print("⚠️ Continuing without MongoDB - using mock data")
@@ -52,6 +80,10 @@ async def connect_to_mongo():
             'insert_many': lambda *args, **kwargs: None
         })()
 
+    if check_indexes_now:
+        from app.indexes import apply_indexes
+        await apply_indexes(database)
+
 async def close_mongo_connection():
     """Close MongoDB connection on application shutdown"""
     global client
@@ -0,0 +1,204 @@
+"""
+Declarative MongoDB index registry.
+
+INDEXES lists every index the application relies on; apply_indexes()
+creates them idempotently (create_index is a no-op when the index already
+exists). HOT_QUERIES lists the query shapes on request paths; the explain
+check runs each one and fails if the winning plan is a collection scan.
+
+Run the check from the command line (exits non-zero on failure):
+    python -m app.indexes --check
+"""
+import asyncio
+import sys
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from app.config import settings
+
+class IndexSpec:
+    """An index the application needs on a collection"""
+
+    def __init__(self, collection: str, keys: List[Tuple[str, Union[int, str]]], unique: bool = False,
+                 expire_after_seconds: Optional[int] = None, name: Optional[str] = None,
+                 **options):
+        self.collection = collection
+        self.keys = keys
+        self.options = dict(options)
+        if unique:
+            self.options["unique"] = True
+        if expire_after_seconds is not None:
+            self.options["expireAfterSeconds"] = expire_after_seconds
+        if name:
+            self.options["name"] = name
+
+class HotQuery:
+    """A query shape on a request path that must be served by an index"""
+
+    def __init__(self, name: str, collection: str, filter: dict,
+                 sort: Optional[List[Tuple[str, int]]] = None):
+        self.name = name
+        self.collection = collection
+        self.filter = filter
+        self.sort = sort
+
+INDEXES = [
+    # Authentication: login and signup look users up by email; emails are unique
+    IndexSpec("users", [("email", 1)], unique=True),
+
+    # Per-user daily logs and history listings; _id breaks ties for keyset pagination
+    IndexSpec("food_logs", [("user_id", 1), ("date", -1), ("_id", -1)]),
+    IndexSpec("activity_logs", [("user_id", 1), ("date", -1), ("_id", -1)]),
+
+    # Batch sync idempotency; only documents written with a key are indexed
+    IndexSpec("food_logs", [("user_id", 1), ("idempotency_key", 1)], unique=True,
+              partialFilterExpression={"idempotency_key": {"$type": "string"}}),
+    IndexSpec("activity_logs", [("user_id", 1), ("idempotency_key", 1)], unique=True,
+              partialFilterExpression={"idempotency_key": {"$type": "string"}}),
+
+    # Dashboard point reads and $inc upserts; also the $merge key for rebuilds
+    IndexSpec("daily_rollups", [("user_id", 1), ("date", 1)], unique=True),
+
+    # set_goals upserts one goals document per user and date
+    IndexSpec("goals", [("user_id", 1), ("date", 1)], unique=True),
+
+    # Trainer marketplace
+    IndexSpec("trainers", [("email", 1)], unique=True),
+    IndexSpec("trainers", [("rating", -1)]),
+    IndexSpec("trainers", [("specialization", 1), ("rating", -1)]),
+    IndexSpec("trainers", [("name", "text"), ("bio", "text"), ("certifications", "text")],
+              name="trainer_text", weights={"name": 10, "certifications": 5, "bio": 1}),
+    IndexSpec("bookings", [("user_id", 1), ("created_at", -1)]),
+    # Webhook events without a booking_id note find their booking by order
+    IndexSpec("bookings", [("razorpay_order_id", 1)], sparse=True),
+    IndexSpec("bookings", [("razorpay_order_ids", 1)], sparse=True),
+    # Unpaid booking sweep
+    IndexSpec("bookings", [("status", 1), ("created_at", 1)]),
+    # One document per booked slot; uniqueness makes booking conflict-free
+    IndexSpec("trainer_slots", [("trainer_id", 1), ("slot_start", 1)], unique=True),
+    IndexSpec("trainer_slots", [("booking_id", 1)]),
+
+    # Food image analysis cache and background jobs
+    IndexSpec("food_analysis_cache", [("expires_at", 1)], expire_after_seconds=0),
+    IndexSpec("food_analysis_cache", [("last_used_at", 1)]),
+    IndexSpec("analysis_jobs", [("status", 1), ("created_at", 1)]),
+
+    # Payment webhook queue; _id is the Razorpay event ID, which deduplicates
+    IndexSpec("payment_events", [("status", 1), ("received_at", 1)]),
+    IndexSpec("payment_events", [("lease_token", 1)], sparse=True),
+
+    # Shared rate limit buckets disappear once they would be full again
+    IndexSpec("rate_limits", [("expires_at", 1)], expire_after_seconds=0),
+]
+
+HOT_QUERIES = [
+    HotQuery("login", "users", {"email": "probe@example.com"}),
+    HotQuery("daily food logs", "food_logs", {"user_id": "probe", "date": "2024-01-01"}),
+    HotQuery("food history", "food_logs", {"user_id": "probe"}, [("date", -1), ("_id", -1)]),
+    HotQuery("daily activity logs", "activity_logs", {"user_id": "probe", "date": "2024-01-01"}),
+    HotQuery("activity history", "activity_logs", {"user_id": "probe"}, [("date", -1), ("_id", -1)]),
+    HotQuery("daily rollup", "daily_rollups", {"user_id": "probe", "date": "2024-01-01"}),
+    HotQuery("rollup range", "daily_rollups",
+             {"user_id": "probe", "date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}}, [("date", 1)]),
+    HotQuery("daily goals", "goals", {"user_id": "probe", "date": "2024-01-01"}),
+    HotQuery("trainer listing", "trainers", {}, [("rating", -1)]),
+    HotQuery("trainer text search", "trainers", {"$text": {"$search": "yoga"}}),
+    HotQuery("trainers by specialization", "trainers", {"specialization": "Yoga"}, [("rating", -1)]),
+    HotQuery("open slots", "trainer_slots",
+             {"trainer_id": "probe", "slot_start": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 1, 8)}}),
+    HotQuery("my bookings", "bookings", {"user_id": "probe"}, [("created_at", -1)]),
+    HotQuery("job claim", "analysis_jobs", {"status": "queued"}, [("created_at", 1)]),
+    HotQuery("payment event claim", "payment_events", {"status": "queued"}, [("received_at", 1)]),
+]
+
+async def ensure_indexes(db) -> List[str]:
+    """
+    Create every registered index; existing indexes are left untouched.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Descriptions of indexes that could not be created
+    """
+    failures = []
+    for spec in INDEXES:
+        try:
+            await db[spec.collection].create_index(spec.keys, **spec.options)
+        except Exception as e:
+            # e.g. duplicate data preventing a unique index
+            failures.append(f"{spec.collection} {spec.keys}: {e}")
+    return failures
+
+def _plan_stages(plan: dict):
+    """Yield every stage name in an explain plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+async def find_collection_scans(db) -> List[str]:
+    """
+    Explain every registered hot query.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Names of hot queries whose winning plan is a COLLSCAN
+    """
+    offenders = []
+    for query in HOT_QUERIES:
+        cursor = db[query.collection].find(query.filter).limit(1)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning_plan)):
+            offenders.append(f"{query.name} ({query.collection})")
+    return offenders
+
+async def apply_indexes(db):
+    """
+    Ensure indexes, then optionally verify hot queries use them.
+
+    Raises:
+        RuntimeError: If INDEX_EXPLAIN_CHECK is on and a hot query scans a
+            collection (fails startup when run from connect_to_mongo)
+    """
+    failures = await ensure_indexes(db)
+    for failure in failures:
+        print(f"❌ Index creation failed: {failure}")
+    if not failures:
+        print(f"✅ Ensured {len(INDEXES)} MongoDB indexes")
+
+    if settings.INDEX_EXPLAIN_CHECK:
+        offenders = await find_collection_scans(db)
+        if offenders:
+            raise RuntimeError("Hot queries doing a COLLSCAN: " + ", ".join(offenders))
+        print(f"✅ All {len(HOT_QUERIES)} hot queries use an index")
+
+async def _main(check: bool):
+    from app.database import connect_to_mongo, get_database, close_mongo_connection
+
+    await connect_to_mongo(apply_indexes_in_background=False)
+    db = get_database()
+    try:
+        failures = await ensure_indexes(db)
+        for failure in failures:
+            print(f"❌ Index creation failed: {failure}")
+        offenders = await find_collection_scans(db) if check else []
+        for offender in offenders:
+            print(f"❌ COLLSCAN: {offender}")
+        if failures or offenders:
+            sys.exit(1)
+        print("✅ All indexes present" + (" and hot queries use them" if check else ""))
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(_main("--check" in sys.argv))
@@ -4,11 +4,21 @@ Configures the app, middleware, and routes with MongoDB Atlas.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.config import settings
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routes import auth, user, food, activity, goals, dashboard, trainers, payments
-import os
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.auth.password import password_hasher
+from app.middleware import (
+    CompressionMiddleware, ConditionalGetMiddleware, MongoBucketStore, RateLimitMiddleware, default_policies
+)
+from app.routes import auth, user, food, activity, goals, dashboard, trainers, payments, uploads
+from app.services.gemini_models import model_registry
+from app.services.gemini_dispatcher import gemini_dispatcher
+from app.services.analysis_jobs import analysis_workers
+from app.services.payment_events import payment_event_consumer
+from app.services.trainer_slots import unpaid_booking_sweeper
+from app.utils.metrics import metrics_snapshot
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.user_cache import user_cache
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -17,6 +27,17 @@ app = FastAPI(
     description="AI-powered fitness and food tracking application with MongoDB Atlas"
 )
 
+# Rate limiting sits inside CORS so 429 responses still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        policies=default_policies(),
+        shared_store=MongoBucketStore(get_database) if settings.RATE_LIMIT_BACKEND == "mongo" else None,
+        memory_keys=settings.RATE_LIMIT_MEMORY_KEYS,
+        trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+        forwarded_hops=settings.RATE_LIMIT_FORWARDED_HOPS
+    )
+
 # Configure CORS - Allow all origins for development
 app.add_middleware(
     CORSMiddleware,
@@ -24,11 +45,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Retry-After"],
 )
 
-# Mount static files (for uploaded images)
-if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# Compression wraps the ETag middleware so ETags are computed on uncompressed bodies
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
 
 # Include routers
 app.include_router(auth.router)
@@ -39,18 +66,31 @@ app.include_router(goals.router)
 app.include_router(dashboard.router)
 app.include_router(trainers.router)
 app.include_router(payments.router)
+app.include_router(uploads.router)  # Uploaded images (replaces the StaticFiles mount)
 
 # Startup event - Connect to MongoDB
 @app.on_event("startup")
 async def startup_event():
     """Connect to MongoDB Atlas on application startup"""
     await connect_to_mongo()
+    model_registry.start()
+    analysis_workers.start()
+    payment_event_consumer.start()
+    unpaid_booking_sweeper.start()
+    user_cache.start()
     print(f"✅ {settings.APP_NAME} v{settings.VERSION} is running")
 
 # Shutdown event - Close MongoDB connection
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close MongoDB connection on application shutdown"""
+    await analysis_workers.stop()
+    await payment_event_consumer.stop()
+    await unpaid_booking_sweeper.stop()
+    await user_cache.stop()
+    await model_registry.stop()
+    gemini_dispatcher.shutdown()
+    password_hasher.shutdown()
     await close_mongo_connection()
 
 # Root endpoint
@@ -69,3 +109,9 @@ def root():
 def health_check():
     """Health check endpoint for deployment monitoring"""
     return {"status": "healthy", "database": "MongoDB Atlas"}
+
+# Metrics endpoint
+@app.get("/metrics")
+def metrics():
+    """Cache, queue and limiter counters for performance monitoring"""
+    return metrics_snapshot()
@@ -0,0 +1,13 @@
+"""Middleware package - ASGI middleware for compression, HTTP caching and rate limiting"""
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.conditional import ConditionalGetMiddleware
+from app.middleware.rate_limit import MongoBucketStore, RateLimitMiddleware, RateLimitPolicy, default_policies
+
+__all__ = [
+    "CompressionMiddleware",
+    "ConditionalGetMiddleware",
+    "MongoBucketStore",
+    "RateLimitMiddleware",
+    "RateLimitPolicy",
+    "default_policies",
+]
@@ -0,0 +1,111 @@
+"""
+Response compression middleware (brotli or gzip).
+
+Compressible responses (JSON and text) at or above a size threshold are
+compressed with the best encoding the client accepts: brotli when the
+optional brotli package is installed, otherwise gzip. Images and other
+already-compressed or pre-encoded responses pass through untouched and
+unbuffered.
+"""
+import gzip
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick a response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip, deflate, br"
+
+    Returns:
+        "br", "gzip" or None
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON/text responses above a size threshold"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a body with the chosen encoding"""
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            (_header(scope["headers"], b"accept-encoding") or b"").decode("latin-1")
+        )
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (message["status"] in (204, 304) or _header(headers, b"content-encoding")
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = [(key, value) for key, value in start_message.get("headers", [])
+                       if key.lower() != b"content-length"]
+            headers.append((b"vary", b"Accept-Encoding"))
+            if len(body) >= self.minimum_size:
+                body = self.compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,79 @@
+"""
+Conditional GET middleware (ETag / If-None-Match).
+
+Successful GET responses without an ETag get a weak one. Endpoints that
+depend on require_data_version() already set it from the user's data
+version and answer 304 before building the body; everything else gets an
+ETag hashed from the body, which still saves the transfer. A matching
+If-None-Match turns the response into a bodiless 304.
+"""
+from typing import List, Optional, Tuple
+from app.utils.http_cache import DATA_ETAG_STATE_KEY, body_etag, etag_matches
+
+# Clients must revalidate, but may keep the body to reuse on a 304
+DEFAULT_CACHE_CONTROL = b"private, no-cache"
+
+CACHEABLE_TYPES = ("application/json", "text/")
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+class ConditionalGetMiddleware:
+    """ASGI middleware adding weak content ETags and 304 responses to GETs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        state = scope.setdefault("state", {})
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (message["status"] != 200 or _header(headers, b"etag")
+                        or not content_type.startswith(CACHEABLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            etag = state.get(DATA_ETAG_STATE_KEY) or "W/" + body_etag(body)
+            headers = list(start_message.get("headers", []))
+            headers.append((b"etag", etag.encode()))
+            if _header(headers, b"cache-control") is None:
+                headers.append((b"cache-control", DEFAULT_CACHE_CONTROL))
+
+            if etag_matches(if_none_match.decode("latin-1") if if_none_match else None, etag):
+                headers = [(key, value) for key, value in headers
+                           if key.lower() not in (b"content-length", b"content-type")]
+                await send({**start_message, "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,246 @@
+"""
+Rate limiting middleware (token buckets per route policy and client).
+
+Each request is matched to a policy by method and path, and takes one
+token from the bucket for (policy, key), where the key is the user ID from
+a valid bearer token or the client IP. An empty bucket answers 429 with a
+Retry-After header before the route runs.
+
+Buckets live in process memory by default, so limits apply per worker.
+With RATE_LIMIT_BACKEND=mongo, policies marked shared (the expensive
+routes: login and Gemini-backed uploads) use one bucket document per key
+in MongoDB, updated atomically so every worker draws from the same bucket.
+Other routes stay in memory, adding no round trip. If the shared store is
+unreachable, requests are allowed (fail open).
+
+Behind a reverse proxy (e.g. Render) every request arrives from the proxy,
+so set RATE_LIMIT_TRUST_FORWARDED to key by X-Forwarded-For. Only the
+entries appended by the trusted proxies are used, counted from the right;
+anything further left was sent by the client and could be forged.
+"""
+import json
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from jose import JWTError
+from pymongo import ReturnDocument
+from app.auth.jwt_handler import verify_token
+from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.token_bucket import TokenBucket
+
+class RateLimitPolicy:
+    """A limit applied to a set of routes"""
+
+    def __init__(self, name: str, per_second: float, burst: int, routes: Iterable[Tuple[str, str]] = (),
+                 key: str = "user", shared: bool = False):
+        """
+        Args:
+            name: Policy name, used in bucket keys and metrics
+            per_second: Sustained rate (tokens refilled per second)
+            burst: Bucket capacity
+            routes: (method, path) pairs the policy applies to; empty for the default policy
+            key: "user" (user ID, falling back to IP) or "ip"
+            shared: Use the shared store when one is configured
+        """
+        self.name = name
+        self.per_second = per_second
+        self.burst = burst
+        self.routes = list(routes)
+        self.key = key
+        self.shared = shared
+
+def default_policies() -> List[RateLimitPolicy]:
+    """Build the application's policies from settings"""
+    return [
+        RateLimitPolicy(
+            "auth", settings.RATE_LIMIT_LOGIN_PER_MINUTE / 60, settings.RATE_LIMIT_LOGIN_BURST,
+            routes=[("POST", "/api/auth/login"), ("POST", "/api/auth/signup")],
+            key="ip", shared=True
+        ),
+        RateLimitPolicy(
+            "food_upload", settings.RATE_LIMIT_UPLOAD_PER_MINUTE / 60, settings.RATE_LIMIT_UPLOAD_BURST,
+            routes=[("POST", "/api/food/upload"), ("POST", "/api/food/upload-async"),
+                    ("POST", "/api/food/upload-image")],
+            shared=True
+        ),
+        RateLimitPolicy("default", settings.RATE_LIMIT_DEFAULT_PER_SECOND, settings.RATE_LIMIT_DEFAULT_BURST)
+    ]
+
+class MemoryBucketStore:
+    """Per-process buckets, least recently used evicted beyond max_keys"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    async def take(self, policy: RateLimitPolicy, key: str) -> Tuple[bool, float]:
+        """
+        Take a token.
+
+        Returns:
+            Tuple of (allowed, seconds until a token is available)
+        """
+        bucket_key = (policy.name, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = TokenBucket(policy.per_second, policy.burst)
+            # An evicted bucket is the least recently used, so likely full again anyway
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+        return bucket.try_acquire()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class MongoBucketStore:
+    """
+    Buckets shared by all workers, one document per (policy, key).
+
+    A single upserting pipeline update refills and takes a token
+    atomically. Documents expire through a TTL index once the bucket would
+    be full again.
+    """
+
+    COLLECTION_NAME = "rate_limits"
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+
+    async def take(self, policy: RateLimitPolicy, key: str) -> Tuple[bool, float]:
+        """
+        Take a token.
+
+        Returns:
+            Tuple of (allowed, seconds until a token is available)
+        """
+        now = time.time()
+        capacity = policy.burst
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]},
+                           policy.per_second]}
+        ]}]}
+        doc = await self.get_db()[self.COLLECTION_NAME].find_one_and_update(
+            {"_id": f"{policy.name}:{key}"},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.utcnow() + timedelta(seconds=capacity / policy.per_second)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc["allowed"]:
+            return True, 0.0
+        return False, (1 - doc["tokens"]) / policy.per_second
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing RateLimitPolicy limits with 429 + Retry-After"""
+
+    def __init__(self, app, policies: List[RateLimitPolicy], shared_store=None,
+                 memory_keys: int = 100000, trust_forwarded: bool = False, forwarded_hops: int = 1):
+        self.app = app
+        self.routes: Dict[Tuple[str, str], RateLimitPolicy] = {}
+        self.default: Optional[RateLimitPolicy] = None
+        for policy in policies:
+            if policy.per_second <= 0:
+                continue
+            if policy.routes:
+                for route in policy.routes:
+                    self.routes[route] = policy
+            else:
+                self.default = policy
+        self.memory = MemoryBucketStore(memory_keys)
+        self.shared_store = shared_store
+        self.trust_forwarded = trust_forwarded
+        self.forwarded_hops = max(1, forwarded_hops)
+        self.allowed: Dict[str, int] = {policy.name: 0 for policy in policies}
+        self.limited: Dict[str, int] = {policy.name: 0 for policy in policies}
+        self.store_errors = 0
+        register_metrics("rate_limiter", self.stats)
+
+    def client_ip(self, scope) -> str:
+        """Client address, or the address the trusted proxies saw (X-Forwarded-For)"""
+        if self.trust_forwarded:
+            forwarded = _header(scope["headers"], b"x-forwarded-for")
+            if forwarded:
+                hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",")]
+                return hops[-min(self.forwarded_hops, len(hops))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def client_key(self, scope, policy: RateLimitPolicy) -> str:
+        """User ID from a valid bearer token (cached verification), else the client IP"""
+        if policy.key == "user":
+            authorization = _header(scope["headers"], b"authorization")
+            if authorization and authorization[:7].lower() == b"bearer ":
+                try:
+                    user_id = verify_token(authorization[7:].decode("latin-1")).get("user_id")
+                except JWTError:
+                    user_id = None
+                if user_id:
+                    return f"user:{user_id}"
+        return f"ip:{self.client_ip(scope)}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.routes.get((scope["method"], scope["path"]))
+        if policy is None and self.default is not None and scope["path"].startswith("/api/"):
+            policy = self.default
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.client_key(scope, policy)
+        store = self.shared_store if policy.shared and self.shared_store is not None else self.memory
+        try:
+            allowed, retry_after = await store.take(policy, key)
+        except Exception as e:
+            self.store_errors += 1
+            print(f"⚠️ Rate limit store unavailable, allowing request: {e}")
+            allowed, retry_after = True, 0.0
+
+        if allowed:
+            self.allowed[policy.name] += 1
+            await self.app(scope, receive, send)
+            return
+
+        self.limited[policy.name] += 1
+        body = json.dumps({"detail": "Too many requests, please retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> dict:
+        """Return per-policy allowed/limited counters"""
+        return {
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+            "memory_buckets": len(self.memory),
+            "shared_store": type(self.shared_store).__name__ if self.shared_store else None,
+            "store_errors": self.store_errors
+        }
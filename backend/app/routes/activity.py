@@ -1,14 +1,26 @@
 """
 Activity tracking routes - Simplified for MongoDB
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 from typing import List, Optional
 from datetime import datetime
-from app.schemas.activity_log import ActivityLogCreate, ActivityLogResponse
+from app.schemas.activity_log import ActivityLogCreate, ActivityLogBatchItem, ActivityLogResponse
+from app.schemas.batch import LogBatchRequest, BatchResponse
 from app.utils.dependencies import get_current_user
 from app.services.calorie_service import calculate_calories_burned
+from app.services.daily_rollups import increment_rollup, activity_log_delta
+from app.services.log_batches import insert_log_batch, validation_error
+from app.config import settings
 from app.database import get_database
 from app.utils.mongo_helpers import serialize_doc
+from app.utils.data_versions import require_data_version
+from app.utils.fast_json import document_list_response
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, SORT_ORDER, encode_cursor, keyset_filter,
+    mongo_projection, parse_fields, project_doc
+)
 
 router = APIRouter(prefix="/api/activity", tags=["Activity Tracking"])
 
@@ -43,25 +55,78 @@ async def add_activity(
         
         result = await db.activity_logs.insert_one(activity_doc)
         activity_doc["_id"] = result.inserted_id
+        await increment_rollup(db, activity_doc["user_id"], activity_doc["date"], activity_log_delta(activity_doc))
         
         return ActivityLogResponse(**serialize_doc(activity_doc))
     except Exception as e:
         print(f"Error logging activity: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to log activity: {str(e)}")
 
-@router.get("/logs", response_model=List[ActivityLogResponse])
+@router.post("/batch", response_model=BatchResponse)
+async def add_activity_batch(
+    batch: LogBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Add many fitness activities at once (e.g. an offline sync)"""
+    db = get_database()
+    
+    # Check if database is available
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection unavailable")
+    
+    user_id = str(current_user["_id"])
+    user_weight = current_user.get("weight", 70.0)
+    created_at = datetime.utcnow().isoformat()
+    docs, errors = [], []
+    for index, item in enumerate(batch.items):
+        try:
+            entry = ActivityLogBatchItem.model_validate(item)
+        except ValidationError as e:
+            errors.append(validation_error(index, e))
+            continue
+        
+        activity_doc = {
+            "user_id": user_id,
+            "activity_type": entry.activity_type,
+            "duration_minutes": entry.duration_minutes,
+            "calories_burned": calculate_calories_burned(
+                entry.activity_type, entry.duration_minutes, user_weight
+            ),
+            "date": entry.date.isoformat(),
+            "created_at": created_at
+        }
+        if entry.idempotency_key:
+            activity_doc["idempotency_key"] = entry.idempotency_key
+        docs.append((index, activity_doc))
+    
+    return await insert_log_batch(db, "activity_logs", user_id, docs, errors, activity_log_delta)
+
+@router.get("/logs", response_model=List[ActivityLogResponse], dependencies=[Depends(require_data_version)])
 async def get_activity_logs(
+    response: Response,
     date: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    limit: int = Query(settings.LOG_PAGE_DEFAULT_LIMIT, ge=1, le=settings.LOG_PAGE_MAX_LIMIT),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. activity_type,calories_burned"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get activity logs"""
+    """Get activity logs, newest first, one page at a time"""
     db = get_database()
-    query = {"user_id": str(current_user["_id"])}
+    selected = parse_fields(fields, ActivityLogResponse.model_fields)
+    query = {"user_id": str(current_user["_id"]), **keyset_filter(cursor)}
     
     if date:
         query["date"] = date
     
-    cursor = db.activity_logs.find(query).sort("date", -1).limit(50)
-    logs = await cursor.to_list(length=50)
+    log_cursor = db.activity_logs.find(query, mongo_projection(selected)).sort(SORT_ORDER).limit(limit)
+    logs = await log_cursor.to_list(length=limit)
+    
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(logs[-1])} if len(logs) == limit else {}
+    if selected is not None:
+        return JSONResponse([project_doc(serialize_doc(log), selected) for log in logs], headers=headers)
+    
+    if settings.FAST_JSON_RESPONSES:
+        return document_list_response(ActivityLogResponse, logs, headers)
     
+    response.headers.update(headers)
     return [ActivityLogResponse(**serialize_doc(log)) for log in logs]
@@ -1,12 +1,18 @@
 """
 Dashboard routes - Simplified for MongoDB
 """
-from fastapi import APIRouter, Depends
-from typing import Optional
-from datetime import datetime, date as date_type
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from datetime import datetime, timedelta, date as date_type
 from pydantic import BaseModel
 from app.utils.dependencies import get_current_user
+from app.utils.data_versions import require_data_version
 from app.database import get_database
+from app.services.daily_rollups import get_daily_totals, get_rollup_range
+from app.services.trends import build_trend, GRANULARITIES
+
+# Longest range a single trends request may cover
+MAX_TREND_DAYS = 366
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
@@ -24,7 +30,32 @@ class DailySummary(BaseModel):
     food_log_count: int
     activity_log_count: int
 
-@router.get("/summary", response_model=DailySummary)
+class TrendPoint(BaseModel):
+    """One day/week/month bucket of a trend series"""
+    start_date: str
+    end_date: str
+    total_calories_consumed: float
+    total_calories_burned: float
+    net_calories: float
+    protein: float
+    carbs: float
+    fats: float
+    food_log_count: int
+    activity_log_count: int
+    days_logged: int
+    days_with_intake_goal: int
+    days_within_intake_goal: int
+    days_with_burn_goal: int
+    days_met_burn_goal: int
+
+class TrendResponse(BaseModel):
+    """Schema for trend range response"""
+    start_date: str
+    end_date: str
+    granularity: str
+    points: List[TrendPoint]
+
+@router.get("/summary", response_model=DailySummary, dependencies=[Depends(require_data_version)])
 async def get_daily_summary(
     date: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
@@ -35,21 +66,13 @@ async def get_daily_summary(
     target_date = date if date else date_type.today().isoformat()
     user_id = str(current_user["_id"])
     
-    # Get food logs
-    food_cursor = db.food_logs.find({"user_id": user_id, "date": target_date})
-    food_logs = await food_cursor.to_list(length=1000)
-    total_consumed = sum(log.get("calories", 0) for log in food_logs)
-    
-    # Get activity logs
-    activity_cursor = db.activity_logs.find({"user_id": user_id, "date": target_date})
-    activity_logs = await activity_cursor.to_list(length=1000)
-    total_burned = sum(log.get("calories_burned", 0) for log in activity_logs)
-    
-    # Get goals
-    goals = await db.goals.find_one({"user_id": user_id, "date": target_date})
+    # Point read of the day's rollup (aggregates the raw logs if missing)
+    totals = await get_daily_totals(db, user_id, target_date)
+    total_consumed = totals["consumed"]
+    total_burned = totals["burned"]
     
-    intake_goal = goals.get("daily_calorie_intake_goal") if goals else None
-    burn_goal = goals.get("daily_calorie_burn_goal") if goals else None
+    intake_goal = totals["intake_goal"]
+    burn_goal = totals["burn_goal"]
     
     intake_progress = (total_consumed / intake_goal * 100) if intake_goal else None
     burn_progress = (total_burned / burn_goal * 100) if burn_goal else None
@@ -68,6 +91,56 @@ async def get_daily_summary(
         calorie_burn_goal=burn_goal,
         intake_progress_percentage=round(intake_progress, 2) if intake_progress else None,
         burn_progress_percentage=round(burn_progress, 2) if burn_progress else None,
-        food_log_count=len(food_logs),
-        activity_log_count=len(activity_logs)
+        food_log_count=totals["food_log_count"],
+        activity_log_count=totals["activity_log_count"]
+    )
+
+@router.get("/trends", response_model=TrendResponse, dependencies=[Depends(require_data_version)])
+async def get_trends(
+    start: Optional[date_type] = None,
+    end: Optional[date_type] = None,
+    granularity: str = Query("day", description="Bucket size: day, week or month"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get intake, burn, macros and goal adherence over a date range"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be day, week or month")
+    
+    end_date = end or date_type.today()
+    start_date = start or end_date - timedelta(days=6)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end_date - start_date).days >= MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_TREND_DAYS} days")
+    
+    db = get_database()
+    rollups = await get_rollup_range(
+        db, str(current_user["_id"]), start_date.isoformat(), end_date.isoformat()
+    )
+    
+    points = [
+        TrendPoint(
+            start_date=bucket["start_date"],
+            end_date=bucket["end_date"],
+            total_calories_consumed=round(bucket["consumed"], 2),
+            total_calories_burned=round(bucket["burned"], 2),
+            net_calories=round(bucket["consumed"] - bucket["burned"], 2),
+            protein=round(bucket["protein"], 2),
+            carbs=round(bucket["carbs"], 2),
+            fats=round(bucket["fats"], 2),
+            food_log_count=bucket["food_log_count"],
+            activity_log_count=bucket["activity_log_count"],
+            days_logged=bucket["days_logged"],
+            days_with_intake_goal=bucket["days_with_intake_goal"],
+            days_within_intake_goal=bucket["days_within_intake_goal"],
+            days_with_burn_goal=bucket["days_with_burn_goal"],
+            days_met_burn_goal=bucket["days_met_burn_goal"]
+        )
+        for bucket in build_trend(rollups, start_date, end_date, granularity)
+    ]
+    return TrendResponse(
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
+        granularity=granularity,
+        points=points
     )
@@ -1,15 +1,29 @@
 """
 Food tracking routes - Simplified for MongoDB (basic functionality)
 """
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime
-from app.schemas.food_log import FoodLogManual, FoodLogResponse, AIFoodAnalysis
+from app.schemas.food_log import FoodLogManual, FoodLogBatchItem, FoodLogResponse, AIFoodAnalysis, AnalysisJobAccepted, AnalysisJobResponse
+from app.schemas.batch import LogBatchRequest, BatchResponse
 from app.utils.dependencies import get_current_user
-from app.services.gemini_service import analyze_food_image, save_uploaded_image
+from app.services.gemini_service import prepare_upload, analyze_food_image, save_uploaded_image
+from app.services.analysis_jobs import check_callback_url, enqueue_analysis_job, get_analysis_job
+from app.services.daily_rollups import increment_rollup, food_log_delta
+from app.services.log_batches import insert_log_batch, validation_error
+from app.config import settings
 from app.database import get_database
 from app.utils.mongo_helpers import serialize_doc, serialize_docs
+from app.utils.data_versions import require_data_version
+from app.utils.fast_json import document_list_response
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, SORT_ORDER, encode_cursor, keyset_filter,
+    mongo_projection, parse_fields, project_doc
+)
 from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import ValidationError
 
 router = APIRouter(prefix="/api/food", tags=["Food Tracking"])
 
@@ -39,12 +53,52 @@ async def add_manual_food(
         
         result = await db.food_logs.insert_one(food_doc)
         food_doc["_id"] = result.inserted_id
+        await increment_rollup(db, food_doc["user_id"], food_doc["date"], food_log_delta(food_doc))
         
         return FoodLogResponse(**serialize_doc(food_doc))
     except Exception as e:
         print(f"Error logging food: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to log food: {str(e)}")
 
+@router.post("/batch", response_model=BatchResponse)
+async def add_food_batch(
+    batch: LogBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Add many manual food entries at once (e.g. an offline sync)"""
+    db = get_database()
+    
+    # Check if database is available
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection unavailable")
+    
+    user_id = str(current_user["_id"])
+    created_at = datetime.utcnow().isoformat()
+    docs, errors = [], []
+    for index, item in enumerate(batch.items):
+        try:
+            entry = FoodLogBatchItem.model_validate(item)
+        except ValidationError as e:
+            errors.append(validation_error(index, e))
+            continue
+        
+        food_doc = {
+            "user_id": user_id,
+            "food_name": entry.food_name,
+            "quantity": entry.quantity,
+            "calories": entry.calories,
+            "image_path": None,
+            "is_ai_detected": False,
+            "meal_type": entry.meal_type,
+            "date": entry.date.isoformat(),
+            "created_at": created_at
+        }
+        if entry.idempotency_key:
+            food_doc["idempotency_key"] = entry.idempotency_key
+        docs.append((index, food_doc))
+    
+    return await insert_log_batch(db, "food_logs", user_id, docs, errors, food_log_delta)
+
 @router.post("/upload", response_model=FoodLogResponse, status_code=201)
 async def upload_food_image(
     image: UploadFile = File(...),
@@ -61,8 +115,10 @@ async def upload_food_image(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    ai_result = await analyze_food_image(image)
-    image_path = await save_uploaded_image(image)
+    # Decode once; analysis and storage both use the downscaled result
+    prepared = await prepare_upload(image)
+    ai_result = await analyze_food_image(prepared, str(current_user["_id"]))
+    image_path = await save_uploaded_image(prepared)
     
     # Use meal_type if provided, otherwise try to infer or default
     final_meal_type = meal_type if meal_type else "Snack" 
@@ -85,9 +141,87 @@ async def upload_food_image(
     
     result = await db.food_logs.insert_one(food_doc)
     food_doc["_id"] = result.inserted_id
+    await increment_rollup(db, food_doc["user_id"], food_doc["date"], food_log_delta(food_doc))
     
     return FoodLogResponse(**serialize_doc(food_doc))
 
+@router.post("/upload-async", response_model=AnalysisJobAccepted, status_code=202)
+async def upload_food_image_async(
+    image: UploadFile = File(...),
+    date: str = Form(...),
+    meal_type: Optional[str] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Upload food image and analyze it in the background"""
+    if not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    try:
+        food_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    if callback_url:
+        await check_callback_url(callback_url)
+    
+    prepared = await prepare_upload(image)
+    image_path = await save_uploaded_image(prepared)
+    
+    db = get_database()
+    user_id = str(current_user["_id"])
+    food_doc = {
+        "user_id": user_id,
+        "food_name": "Analyzing...",
+        "quantity": None,
+        "calories": 0,
+        "protein": None,
+        "carbs": None,
+        "fats": None,
+        "image_path": image_path,
+        "is_ai_detected": True,
+        "analysis_status": "pending",
+        "meal_type": meal_type if meal_type else "Snack",
+        "date": food_date.isoformat(),
+        "created_at": datetime.utcnow().isoformat()
+    }
+    
+    result = await db.food_logs.insert_one(food_doc)
+    food_log_id = str(result.inserted_id)
+    await increment_rollup(db, user_id, food_doc["date"], food_log_delta(food_doc))
+    
+    job_id = await enqueue_analysis_job(
+        user_id, food_log_id, image_path, prepared.content_key, callback_url
+    )
+    
+    return AnalysisJobAccepted(job_id=job_id, food_log_id=food_log_id, status="queued")
+
+@router.get("/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the status of a background image analysis"""
+    try:
+        job = await get_analysis_job(job_id, str(current_user["_id"]))
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return AnalysisJobResponse(
+        job_id=str(job["_id"]),
+        food_log_id=job["food_log_id"],
+        status=job["status"],
+        progress=job["progress"],
+        attempts=job["attempts"],
+        result=job.get("result"),
+        error=job.get("error"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
+
 @router.post("/upload-image")
 async def analyze_food_image_only(
     image: UploadFile = File(...),
@@ -97,9 +231,11 @@ async def analyze_food_image_only(
     if not image.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    prepared = await prepare_upload(image)
+    
     try:
         # Analyze the image with Gemini AI
-        ai_result = await analyze_food_image(image)
+        ai_result = await analyze_food_image(prepared, str(current_user["_id"]))
         
         # Return the analysis result
         return {
@@ -158,27 +294,41 @@ async def quick_add_meal(
         
         result = await db.food_logs.insert_one(food_doc)
         food_doc["_id"] = result.inserted_id
+        await increment_rollup(db, food_doc["user_id"], food_doc["date"], food_log_delta(food_doc))
         
         return FoodLogResponse(**serialize_doc(food_doc))
     except Exception as e:
         print(f"Error quick adding meal: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to log meal: {str(e)}")
 
-@router.get("/logs", response_model=List[FoodLogResponse])
+@router.get("/logs", response_model=List[FoodLogResponse], dependencies=[Depends(require_data_version)])
 async def get_food_logs(
+    response: Response,
     date: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    limit: int = Query(settings.LOG_PAGE_DEFAULT_LIMIT, ge=1, le=settings.LOG_PAGE_MAX_LIMIT),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. food_name,calories"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get food logs"""
+    """Get food logs, newest first, one page at a time"""
     db = get_database()
-    query = {"user_id": str(current_user["_id"])}
+    selected = parse_fields(fields, FoodLogResponse.model_fields)
+    query = {"user_id": str(current_user["_id"]), **keyset_filter(cursor)}
     
     if date:
         query["date"] = date
     
-    cursor = db.food_logs.find(query).sort("date", -1).limit(50)
-    logs = await cursor.to_list(length=50)
+    log_cursor = db.food_logs.find(query, mongo_projection(selected)).sort(SORT_ORDER).limit(limit)
+    logs = await log_cursor.to_list(length=limit)
     
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(logs[-1])} if len(logs) == limit else {}
+    if selected is not None:
+        return JSONResponse([project_doc(serialize_doc(log), selected) for log in logs], headers=headers)
+    
+    if settings.FAST_JSON_RESPONSES:
+        return document_list_response(FoodLogResponse, logs, headers)
+    
+    response.headers.update(headers)
     return [FoodLogResponse(**serialize_doc(log)) for log in logs]
 
 @router.delete("/logs/{log_id}", status_code=204)
@@ -203,15 +353,18 @@ async def delete_food_log(
         if not log:
             raise HTTPException(status_code=404, detail="Food log not found")
         
-        # Delete the log
-        result = await db.food_logs.delete_one({
+        # Delete the log; the deleted document is what gets subtracted, in
+        # case a background analysis updated it since it was read
+        deleted = await db.food_logs.find_one_and_delete({
             "_id": ObjectId(log_id),
             "user_id": str(current_user["_id"])
         })
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Food log not found")
         
+        await increment_rollup(db, deleted["user_id"], deleted["date"], food_log_delta(deleted, -1))
+        
         return None
     except Exception as e:
         if isinstance(e, HTTPException):
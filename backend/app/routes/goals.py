@@ -4,10 +4,13 @@ Goals routes - Simplified for MongoDB
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Optional
 from datetime import datetime, date as date_type
+from pymongo import ReturnDocument
 from app.schemas.goals import GoalsCreate, GoalsResponse
 from app.utils.dependencies import get_current_user
+from app.services.daily_rollups import set_rollup_goals
 from app.database import get_database
 from app.utils.mongo_helpers import serialize_doc
+from app.utils.data_versions import require_data_version
 
 router = APIRouter(prefix="/api/goals", tags=["Goals"])
 
@@ -19,12 +22,6 @@ async def set_goals(
     """Set or update daily goals"""
     db = get_database()
     
-    # Check if goals exist for this date
-    existing = await db.goals.find_one({
-        "user_id": str(current_user["_id"]),
-        "date": goals_data.date.isoformat()
-    })
-    
     goals_doc = {
         "user_id": str(current_user["_id"]),
         "daily_calorie_intake_goal": goals_data.daily_calorie_intake_goal,
@@ -32,19 +29,24 @@ async def set_goals(
         "date": goals_data.date.isoformat()
     }
     
-    if existing:
-        await db.goals.update_one(
-            {"_id": existing["_id"]},
-            {"$set": goals_doc}
-        )
-        updated = await db.goals.find_one({"_id": existing["_id"]})
-        return GoalsResponse(**serialize_doc(updated))
-    else:
-        result = await db.goals.insert_one(goals_doc)
-        goals_doc["_id"] = result.inserted_id
-        return GoalsResponse(**serialize_doc(goals_doc))
+    # One atomic upsert; the unique (user_id, date) index makes a separate
+    # find-then-insert race into duplicate key errors
+    updated = await db.goals.find_one_and_update(
+        {"user_id": goals_doc["user_id"], "date": goals_doc["date"]},
+        {"$set": goals_doc},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    # Only after the goals are stored: this bumps the data version, and a GET
+    # in between would otherwise cache the old goals under the new ETag
+    await set_rollup_goals(
+        db, goals_doc["user_id"], goals_doc["date"],
+        goals_data.daily_calorie_intake_goal, goals_data.daily_calorie_burn_goal
+    )
+    return GoalsResponse(**serialize_doc(updated))
 
-@router.get("", response_model=GoalsResponse)
+@router.get("", response_model=GoalsResponse, dependencies=[Depends(require_data_version)])
 async def get_goals(
     date: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
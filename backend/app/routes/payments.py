@@ -1,11 +1,16 @@
 """
 Payment routes - Razorpay payment integration
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.database import get_database
 from app.schemas.trainer import PaymentOrderCreate, PaymentVerify
-from app.services.razorpay_service import create_razorpay_order, verify_payment_signature
+from app.services.payment_orders import get_or_create_order
+from app.services.payment_events import enqueue_payment_event, paid_update
+from app.services.razorpay_service import verify_payment_signature, verify_webhook_signature
 from app.utils.dependencies import get_current_user
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
@@ -15,7 +20,7 @@ async def create_payment_order(
     order_data: PaymentOrderCreate,
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a Razorpay order for booking payment"""
+    """Create (or reuse) a Razorpay order for booking payment"""
     db = get_database()
     
     # Get booking
@@ -31,21 +36,8 @@ async def create_payment_order(
     if booking["user_id"] != str(current_user["_id"]):
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Create Razorpay order
-    razorpay_order = create_razorpay_order(booking["total_amount"])
-    
-    # Update booking with order ID
-    await db.bookings.update_one(
-        {"_id": booking["_id"]},
-        {"$set": {"razorpay_order_id": razorpay_order["id"]}}
-    )
-    
-    return {
-        "order_id": razorpay_order["id"],
-        "amount": razorpay_order["amount"],
-        "currency": razorpay_order["currency"],
-        "booking_id": order_data.booking_id
-    }
+    # Reuse the booking's order, or create one off the event loop
+    return await get_or_create_order(db, booking, order_data.idempotency_key)
 
 @router.post("/verify")
 async def verify_payment(
@@ -65,21 +57,55 @@ async def verify_payment(
     if not is_valid:
         raise HTTPException(status_code=400, detail="Invalid payment signature")
     
-    # Update booking
     try:
-        result = await db.bookings.update_one(
-            {"_id": ObjectId(payment_data.booking_id), "user_id": str(current_user["_id"])},
-            {"$set": {
-                "payment_id": payment_data.razorpay_payment_id,
-                "payment_status": "completed",
-                "status": "scheduled"
-            }}
-        )
-        
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Booking not found or not authorized")
-        
-        return {"success": True, "message": "Payment verified successfully"}
+        booking_id = ObjectId(payment_data.booking_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid booking ID")
     
+    # Update booking; the webhook consumer may already have written the same
+    # values, so a match without a modification is still a success
+    try:
+        booking = await db.bookings.find_one_and_update(
+            {"_id": booking_id, "user_id": str(current_user["_id"])},
+            paid_update(payment_data.razorpay_payment_id),
+            projection={"payment_status": 1},
+            return_document=ReturnDocument.AFTER
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found or not authorized")
+    
+    # Paid after the booking expired: the slots are gone, so the money goes back
+    if booking["payment_status"] == "refund_pending":
+        print(f"⚠️ Payment {payment_data.razorpay_payment_id} arrived for cancelled booking {booking_id}; refund pending")
+        raise HTTPException(
+            status_code=409,
+            detail="This booking expired before payment was received; your payment will be refunded"
+        )
+    
+    return {"success": True, "message": "Payment verified successfully"}
+
+@router.post("/webhook")
+async def payment_webhook(request: Request):
+    """
+    Receive Razorpay webhooks.
+    
+    Only verifies, stores and acknowledges the event; booking updates are
+    applied by the background payment event consumer. Redelivered events
+    are acknowledged without being stored again.
+    """
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature", "")):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook body")
+    
+    # Razorpay sends a stable ID with every delivery of an event
+    event_id = request.headers.get("X-Razorpay-Event-Id") or hashlib.sha256(body).hexdigest()
+    queued = await enqueue_payment_event(get_database(), event_id, event)
+    return {"status": "queued" if queued else "duplicate"}
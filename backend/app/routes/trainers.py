@@ -1,14 +1,21 @@
 """
 Trainer routes - Browse and book personal trainers
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
 from bson import ObjectId
+from app.config import settings
 from app.database import get_database
-from app.schemas.trainer import TrainerCreate, TrainerResponse, BookingCreate, BookingResponse
+from app.schemas.trainer import TrainerCreate, TrainerResponse, TrainerSearchResponse, TrainerSlotsResponse, BookingCreate, BookingResponse
+from app.services.trainer_slots import (
+    to_utc, to_local, local_midnight, session_slots, check_bookable, claim_slots, release_slots, open_slots,
+    cancel_unpaid_booking
+)
+from app.services.trainer_search import search_trainers, trainer_listing_cache, invalidate_trainer_listings
 from app.utils.dependencies import get_current_user
 from app.utils.mongo_helpers import serialize_doc, serialize_docs
+from app.utils.fast_json import document_list_response
 
 router = APIRouter(prefix="/api/trainers", tags=["Trainers"])
 
@@ -32,6 +39,7 @@ async def register_trainer(trainer_data: TrainerCreate):
     
     result = await db.trainers.insert_one(trainer_doc)
     trainer_doc["_id"] = result.inserted_id
+    invalidate_trainer_listings()
     
     return TrainerResponse(**serialize_doc(trainer_doc))
 
@@ -49,10 +57,45 @@ async def get_trainers(
     if min_rating:
         query["rating"] = {"$gte": min_rating}
     
-    cursor = db.trainers.find(query).sort("rating", -1).limit(50)
-    trainers = await cursor.to_list(length=50)
+    cache_key = ("listing", specialization, min_rating)
+    trainers = trainer_listing_cache.get(cache_key)
+    if trainers is None:
+        cursor = db.trainers.find(query).sort("rating", -1).limit(50)
+        trainers = await cursor.to_list(length=50)
+        trainer_listing_cache.set(cache_key, trainers)
     
-    return [TrainerResponse(**serialize_doc(t)) for t in trainers]
+    if settings.FAST_JSON_RESPONSES:
+        return document_list_response(TrainerResponse, trainers)
+    
+    # serialize_doc mutates, and the documents may be shared through the cache
+    return [TrainerResponse(**serialize_doc(dict(t))) for t in trainers]
+
+@router.get("/search", response_model=TrainerSearchResponse)
+async def search_trainer_listings(
+    q: Optional[str] = Query(None, min_length=2, max_length=100, description="Search name, bio and certifications"),
+    specialization: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_experience: Optional[int] = Query(None, ge=0),
+    day: Optional[str] = Query(None, description="Day the trainer must be available"),
+    min_rating: Optional[float] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.TRAINER_SEARCH_MAX_LIMIT)
+):
+    """Search trainers with facet counts and keyset pagination"""
+    db = get_database()
+    
+    search = await search_trainers(
+        db, q=q, specialization=specialization, min_price=min_price, max_price=max_price,
+        min_experience=min_experience, day=day, min_rating=min_rating, cursor=cursor, limit=limit
+    )
+    
+    return TrainerSearchResponse(
+        results=[TrainerResponse.model_validate(t) for t in search["results"]],
+        facets=search["facets"],
+        total=search["total"],
+        next_cursor=search["next_cursor"]
+    )
 
 @router.get("/{trainer_id}", response_model=TrainerResponse)
 async def get_trainer(trainer_id: str):
@@ -69,6 +112,38 @@ async def get_trainer(trainer_id: str):
     
     return TrainerResponse(**serialize_doc(trainer))
 
+@router.get("/{trainer_id}/slots", response_model=TrainerSlotsResponse)
+async def get_trainer_slots(
+    trainer_id: str,
+    start: Optional[date] = None,
+    days: int = Query(7, ge=1, le=settings.TRAINER_SLOTS_MAX_DAYS)
+):
+    """Get a trainer's open booking slots over a date range"""
+    db = get_database()
+    
+    try:
+        trainer = await db.trainers.find_one({"_id": ObjectId(trainer_id)})
+    except:
+        raise HTTPException(status_code=400, detail="Invalid trainer ID")
+    
+    if not trainer:
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    
+    # Days are the trainer's local calendar days
+    first_day = start or to_local(datetime.utcnow()).date()
+    range_start = local_midnight(first_day)
+    range_end = local_midnight(first_day + timedelta(days=days))
+    
+    # Past slots can't be booked
+    slots = await open_slots(db, trainer, max(range_start, datetime.utcnow()), range_end)
+    
+    return TrainerSlotsResponse(
+        trainer_id=str(trainer["_id"]),
+        slot_minutes=settings.TRAINER_SLOT_MINUTES,
+        timezone=settings.TRAINER_TIMEZONE,
+        slots=[slot.replace(tzinfo=timezone.utc) for slot in slots]
+    )
+
 @router.post("/{trainer_id}/book", response_model=BookingResponse, status_code=201)
 async def book_trainer(
     trainer_id: str,
@@ -87,15 +162,28 @@ async def book_trainer(
     if not trainer:
         raise HTTPException(status_code=404, detail="Trainer not found")
     
-    # Calculate total amount
-    total_amount = trainer["hourly_rate"] * booking_data.duration_hours
+    session_start = to_utc(booking_data.session_date)
+    if session_start < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Sessions must be in the future")
+    
+    slots = session_slots(session_start, booking_data.duration_hours)
+    check_bookable(trainer, slots)
+    
+    # Claim the slots first; the unique slot index rejects overlapping bookings
+    booking_id = ObjectId()
+    user_id = str(current_user["_id"])
+    await claim_slots(db, str(trainer["_id"]), slots, booking_id, user_id)
+    
+    # Charge for the slots held
+    total_amount = trainer["hourly_rate"] * len(slots) * settings.TRAINER_SLOT_MINUTES / 60
     
     # Create booking
     booking_doc = {
-        "user_id": str(current_user["_id"]),
-        "trainer_id": trainer_id,
+        "_id": booking_id,
+        "user_id": user_id,
+        "trainer_id": str(trainer["_id"]),
         "trainer_name": trainer["name"],
-        "session_date": booking_data.session_date,
+        "session_date": session_start,
         "duration_hours": booking_data.duration_hours,
         "total_amount": total_amount,
         "payment_id": None,
@@ -105,8 +193,11 @@ async def book_trainer(
         "created_at": datetime.utcnow()
     }
     
-    result = await db.bookings.insert_one(booking_doc)
-    booking_doc["_id"] = result.inserted_id
+    try:
+        await db.bookings.insert_one(booking_doc)
+    except Exception:
+        await release_slots(db, booking_id)
+        raise
     
     return BookingResponse(**serialize_doc(booking_doc))
 
@@ -118,4 +209,28 @@ async def get_my_bookings(current_user: dict = Depends(get_current_user)):
     cursor = db.bookings.find({"user_id": str(current_user["_id"])}).sort("created_at", -1)
     bookings = await cursor.to_list(length=100)
     
+    if settings.FAST_JSON_RESPONSES:
+        return document_list_response(BookingResponse, bookings)
+    
     return [BookingResponse(**serialize_doc(b)) for b in bookings]
+
+@router.post("/bookings/{booking_id}/cancel", response_model=BookingResponse)
+async def cancel_booking(booking_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel an unpaid booking and free its slots"""
+    db = get_database()
+    
+    try:
+        booking_oid = ObjectId(booking_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid booking ID")
+    
+    user_id = str(current_user["_id"])
+    if not await cancel_unpaid_booking(db, booking_oid, {"user_id": user_id}):
+        booking = await db.bookings.find_one({"_id": booking_oid, "user_id": user_id})
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if booking.get("status") != "cancelled":
+            raise HTTPException(status_code=409, detail="Paid bookings can't be cancelled")
+    
+    booking = await db.bookings.find_one({"_id": booking_oid})
+    return BookingResponse(**serialize_doc(booking))
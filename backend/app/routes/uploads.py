@@ -0,0 +1,109 @@
+"""
+Uploaded image routes - Stream stored images and thumbnail variants
+"""
+import mimetypes
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.config import settings
+from app.services.storage import get_storage, UPLOAD_URL_PREFIX
+from app.services.thumbnails import thumbnail_cache, snap_width, variant_etag, VARIANT_FORMATS
+from app.services.image_preprocess import OUTPUT_FORMATS
+from app.utils.http_cache import etag_matches
+
+# Stored keys are content-addressed (or uniquely named), so a URL never changes content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+router = APIRouter(prefix=f"/{UPLOAD_URL_PREFIX}", tags=["Uploads"])
+
+def parse_range(range_header: str, size: int):
+    """
+    Parse a single-range "bytes=" header.
+
+    Args:
+        range_header: Value of the Range header
+        size: Total size of the file
+
+    Returns:
+        Tuple of (start, end) inclusive offsets, or None to serve the whole file
+
+    Raises:
+        HTTPException: 416 if the range cannot be satisfied
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: last N bytes
+            length = int(end_text)
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+@router.get("/{key:path}")
+async def get_upload(
+    key: str,
+    w: Optional[int] = Query(None, gt=0, description="Thumbnail width in pixels"),
+    format: Optional[str] = Query(None, description="Thumbnail format: webp or jpeg"),
+    range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Stream a stored image or a resized variant of it"""
+    storage = get_storage()
+
+    try:
+        size = await storage.size(key)
+    except ValueError:
+        size = None
+    if size is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if w is not None:
+        image_format = VARIANT_FORMATS.get((format or settings.THUMBNAIL_FORMAT).lower())
+        if image_format is None:
+            raise HTTPException(status_code=400, detail="Unsupported format")
+        width = snap_width(w)
+
+        headers = {"ETag": variant_etag(key, size, width, image_format), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        path, _ = await thumbnail_cache.get_variant(key, size, width, image_format)
+        return FileResponse(path, media_type=OUTPUT_FORMATS[image_format][0], headers=headers)
+
+    etag = variant_etag(key, size, 0, "original")
+    headers = {"Accept-Ranges": "bytes", "ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    byte_range = parse_range(range, size) if range else None
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(storage.stream(key), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        storage.stream(key, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
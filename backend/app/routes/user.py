@@ -6,6 +6,7 @@ from bson import ObjectId
 from app.database import get_database
 from app.schemas.user import UserProfile, UserResponse
 from app.utils.dependencies import get_current_user
+from app.utils.user_cache import user_cache
 from app.utils.mongo_helpers import serialize_doc
 
 router = APIRouter(prefix="/api/user", tags=["User Profile"])
@@ -60,6 +61,9 @@ async def update_profile(
         {"$set": update_doc}
     )
     
+    # Drop the cached copy so the next request sees the new profile
+    user_cache.invalidate(str(current_user["_id"]))
+    
     # Fetch updated user
     updated_user = await db.users.find_one({"_id": current_user["_id"]})
     user_serialized = serialize_doc(updated_user)
@@ -1,8 +1,10 @@
 """
 ActivityLog schemas for request/response validation
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 from datetime import date, datetime
+from app.utils.mongo_helpers import ObjectIdStr, document_id_field
 
 class ActivityLogCreate(BaseModel):
     """Schema for creating activity log"""
@@ -10,9 +12,13 @@ class ActivityLogCreate(BaseModel):
     duration_minutes: int
     date: date
 
+class ActivityLogBatchItem(ActivityLogCreate):
+    """Schema for one entry of an activity log batch"""
+    idempotency_key: Optional[str] = Field(None, max_length=128)  # Client-generated; makes retries safe
+
 class ActivityLogResponse(BaseModel):
     """Schema for activity log response"""
-    id: str  # Changed from int to str for MongoDB ObjectId
+    id: ObjectIdStr = document_id_field()  # Changed from int to str for MongoDB ObjectId
     user_id: str  # Changed from int to str for MongoDB
     activity_type: str
     duration_minutes: int
@@ -0,0 +1,29 @@
+"""
+Batch write schemas for request/response validation
+"""
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+class LogBatchRequest(BaseModel):
+    """
+    Schema for a batch of log entries.
+
+    Items are validated one by one so a single bad entry is reported in
+    its result instead of rejecting the whole batch.
+    """
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item, in request order"""
+    index: int
+    status: str  # "created", "duplicate" (idempotency key already used) or "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    """Schema for batch write response"""
+    created: int
+    duplicates: int
+    failed: int
+    results: List[BatchItemResult]
@@ -1,9 +1,10 @@
 """
 FoodLog schemas for request/response validation
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date, datetime
+from app.utils.mongo_helpers import ObjectIdStr, document_id_field
 
 class FoodLogManual(BaseModel):
     """Schema for manual food entry"""
@@ -12,9 +13,14 @@ class FoodLogManual(BaseModel):
     calories: float
     date: date
 
+class FoodLogBatchItem(FoodLogManual):
+    """Schema for one entry of a food log batch"""
+    meal_type: Optional[str] = None
+    idempotency_key: Optional[str] = Field(None, max_length=128)  # Client-generated; makes retries safe
+
 class FoodLogResponse(BaseModel):
     """Schema for food log response"""
-    id: str  # Changed from int to str for MongoDB ObjectId
+    id: ObjectIdStr = document_id_field()  # Changed from int to str for MongoDB ObjectId
     user_id: str  # Changed from int to str for MongoDB
     food_name: str
     quantity: Optional[str]
@@ -25,6 +31,7 @@ class FoodLogResponse(BaseModel):
     protein: Optional[str] = None
     carbs: Optional[str] = None
     fats: Optional[str] = None
+    analysis_status: Optional[str] = None  # "pending", "completed", "failed" for async uploads
     date: str  # Changed to str since we store as ISO string
     created_at: str  # Changed to str since we store as ISO string
     
@@ -40,3 +47,21 @@ class AIFoodAnalysis(BaseModel):
     fats: Optional[str] = None
     description: Optional[str] = None
     confidence: Optional[str] = None
+
+class AnalysisJobAccepted(BaseModel):
+    """Schema for an accepted asynchronous analysis upload"""
+    job_id: str
+    food_log_id: str
+    status: str
+
+class AnalysisJobResponse(BaseModel):
+    """Schema for analysis job status"""
+    job_id: str
+    food_log_id: str
+    status: str  # "queued", "running", "completed", "failed"
+    progress: str  # "queued", "analyzing", "saving", "completed", "failed"
+    attempts: int
+    result: Optional[AIFoodAnalysis] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
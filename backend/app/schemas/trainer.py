@@ -1,9 +1,10 @@
 """
 Trainer-related Pydantic schemas
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
+from app.utils.mongo_helpers import ObjectIdStr, document_id_field
 
 class TrainerCreate(BaseModel):
     """Schema for trainer registration"""
@@ -19,7 +20,7 @@ class TrainerCreate(BaseModel):
 
 class TrainerResponse(BaseModel):
     """Schema for trainer response"""
-    id: str
+    id: ObjectIdStr = document_id_field()
     name: str
     email: str
     specialization: str
@@ -37,6 +38,25 @@ class TrainerResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class FacetCount(BaseModel):
+    """Number of matching trainers with a facet value"""
+    value: str
+    count: int
+
+class TrainerFacets(BaseModel):
+    """Facet counts over all trainers matching a search"""
+    specialization: List[FacetCount]
+    price: List[FacetCount]  # Hourly rate bands, e.g. "500-1000"
+    experience: List[FacetCount]  # e.g. "2-5 years"
+    availability: List[FacetCount]  # Days available
+
+class TrainerSearchResponse(BaseModel):
+    """Schema for trainer search response"""
+    results: List[TrainerResponse]
+    facets: TrainerFacets
+    total: int
+    next_cursor: Optional[str] = None
+
 class BookingCreate(BaseModel):
     """Schema for creating a booking"""
     trainer_id: str
@@ -46,7 +66,7 @@ class BookingCreate(BaseModel):
 
 class BookingResponse(BaseModel):
     """Schema for booking response"""
-    id: str
+    id: ObjectIdStr = document_id_field()
     user_id: str
     trainer_id: str
     trainer_name: str
@@ -54,18 +74,26 @@ class BookingResponse(BaseModel):
     duration_hours: float
     total_amount: float
     payment_id: Optional[str] = None
-    payment_status: str  # "pending", "completed", "failed"
-    status: str  # "scheduled", "completed", "cancelled"
+    payment_status: str  # "pending", "completed", "failed", "refund_pending"
+    status: str  # "pending", "scheduled", "completed", "cancelled"
     notes: Optional[str] = None
     created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class TrainerSlotsResponse(BaseModel):
+    """Schema for a trainer's open slots"""
+    trainer_id: str
+    slot_minutes: int
+    timezone: str  # Zone the working hours are laid out in
+    slots: List[datetime]  # Start times (UTC) of free slots
+
 class PaymentOrderCreate(BaseModel):
     """Schema for creating Razorpay order"""
     booking_id: str
     amount: float
+    idempotency_key: Optional[str] = Field(None, max_length=100)  # Same key on retry returns the same order
 
 class PaymentVerify(BaseModel):
     """Schema for verifying Razorpay payment"""
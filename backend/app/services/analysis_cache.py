@@ -0,0 +1,144 @@
+"""
+Content-addressed cache for Gemini food image analysis results.
+
+Lookups go to an in-process LRU first, then to a MongoDB collection with a
+TTL index and a document cap, so duplicate uploads never reach the model.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import settings
+from app.database import get_database
+from app.schemas.food_log import AIFoodAnalysis
+from app.utils.metrics import register_metrics
+from app.utils.ttl_cache import TTLCache
+
+COLLECTION_NAME = "food_analysis_cache"
+
+def image_content_key(image_bytes: bytes) -> str:
+    """
+    Compute the cache key for raw image bytes.
+
+    Args:
+        image_bytes: Uploaded image content
+
+    Returns:
+        Hex SHA-256 digest of the content
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+class AnalysisCache:
+    """Two-tier (memory + MongoDB) cache of AIFoodAnalysis results"""
+
+    def __init__(self):
+        self._memory = TTLCache(
+            max_size=settings.ANALYSIS_CACHE_MEMORY_SIZE,
+            ttl_seconds=settings.ANALYSIS_CACHE_TTL_HOURS * 3600
+        )
+        self._writes_since_trim = 0
+        self.mongo_hits = 0
+        self.mongo_misses = 0
+        self.mongo_errors = 0
+
+    def _collection(self):
+        db = get_database()
+        if db is None:
+            return None
+        return getattr(db, COLLECTION_NAME, None)
+
+    async def get(self, key: str) -> Optional[AIFoodAnalysis]:
+        """
+        Look up a cached analysis.
+
+        Args:
+            key: Content key from image_content_key()
+
+        Returns:
+            Cached analysis, or None on a miss
+        """
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached
+
+        collection = self._collection()
+        if collection is None:
+            return None
+
+        try:
+            now = datetime.utcnow()
+            doc = await collection.find_one({"_id": key, "expires_at": {"$gt": now}})
+            if doc is None:
+                self.mongo_misses += 1
+                return None
+
+            self.mongo_hits += 1
+            await collection.update_one({"_id": key}, {"$set": {"last_used_at": now}})
+        except Exception as e:
+            self.mongo_errors += 1
+            print(f"⚠️ Analysis cache lookup failed: {e}")
+            return None
+
+        analysis = AIFoodAnalysis(**doc["analysis"])
+        self._memory.set(key, analysis)
+        return analysis
+
+    async def set(self, key: str, analysis: AIFoodAnalysis):
+        """
+        Store an analysis in both tiers.
+
+        Args:
+            key: Content key from image_content_key()
+            analysis: Result returned by the model
+        """
+        self._memory.set(key, analysis)
+
+        collection = self._collection()
+        if collection is None:
+            return
+
+        try:
+            now = datetime.utcnow()
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "analysis": analysis.model_dump(),
+                    "last_used_at": now,
+                    "expires_at": now + timedelta(hours=settings.ANALYSIS_CACHE_TTL_HOURS)
+                }},
+                upsert=True
+            )
+
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= settings.ANALYSIS_CACHE_TRIM_INTERVAL:
+                self._writes_since_trim = 0
+                await self._trim(collection)
+        except Exception as e:
+            self.mongo_errors += 1
+            print(f"⚠️ Analysis cache write failed: {e}")
+
+    async def _trim(self, collection):
+        """Evict least recently used documents above the configured cap"""
+        count = await collection.estimated_document_count()
+        excess = count - settings.ANALYSIS_CACHE_MAX_DOCUMENTS
+        if excess <= 0:
+            return
+
+        cursor = collection.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)
+        stale = [doc["_id"] async for doc in cursor]
+        if stale:
+            await collection.delete_many({"_id": {"$in": stale}})
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers"""
+        return {
+            "memory": self._memory.stats(),
+            "mongo": {
+                "hits": self.mongo_hits,
+                "misses": self.mongo_misses,
+                "errors": self.mongo_errors
+            }
+        }
+
+# Shared cache instance
+analysis_cache = AnalysisCache()
+register_metrics("analysis_cache", analysis_cache.stats)
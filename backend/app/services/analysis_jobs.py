@@ -0,0 +1,358 @@
+"""
+Background food image analysis jobs backed by a MongoDB queue collection.
+
+Uploads in async mode store the image, create a pending food log and
+enqueue a job. A pool of worker tasks claims jobs with an atomic
+find_one_and_update and a lease, so a job whose worker died (e.g. on a
+restart) is picked up again once its lease expires. Every claim counts as
+an attempt, so a job that keeps killing its worker (e.g. running it out of
+memory) fails after ANALYSIS_JOB_MAX_ATTEMPTS instead of being reclaimed
+forever.
+"""
+import asyncio
+import http.client
+import ipaddress
+import json
+import socket
+import ssl
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.config import settings
+from app.database import get_database
+from app.services.daily_rollups import increment_rollup, food_log_delta
+from app.services.gemini_service import analyze_food_image
+from app.services.image_preprocess import prepare_image
+from app.services.storage import get_storage, key_from_image_path
+from app.utils.data_versions import bump_data_version
+from app.utils.metrics import register_metrics
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to an already checked address; Host stays the URL's host"""
+
+    def __init__(self, address: str, host: str, port: int, timeout: float):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection to an already checked address, verified for the URL's host (SNI)"""
+
+    def __init__(self, address: str, host: str, port: int, timeout: float):
+        super().__init__(host, port, timeout=timeout, context=ssl.create_default_context())
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+async def check_callback_url(url: str) -> str:
+    """
+    Reject callback URLs that could reach internal services (SSRF).
+
+    The host must be on ANALYSIS_CALLBACK_ALLOWED_HOSTS when that is set,
+    and every address it resolves to must be public: loopback, private,
+    link-local (cloud metadata), reserved and multicast ranges are refused.
+
+    Args:
+        url: Client-supplied callback URL
+
+    Returns:
+        A checked address of the host; connect to it rather than resolving
+        the host again, which a DNS-rebinding host could answer differently
+
+    Raises:
+        HTTPException: 400 if the URL is not an allowed public http(s) URL
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme not in ("http", "https") or not host:
+        raise HTTPException(status_code=400, detail="callback_url must be an http(s) URL")
+
+    allowed = {h.strip().lower() for h in settings.ANALYSIS_CALLBACK_ALLOWED_HOSTS.split(",") if h.strip()}
+    if allowed and host.lower() not in allowed:
+        raise HTTPException(status_code=400, detail="callback_url host is not allowed")
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, ValueError):
+        raise HTTPException(status_code=400, detail="callback_url host cannot be resolved")
+
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise HTTPException(status_code=400, detail="callback_url must point to a public address")
+    return infos[0][4][0]
+
+async def enqueue_analysis_job(user_id: str, food_log_id: str, image_path: str,
+                               content_key: str, callback_url: Optional[str] = None) -> str:
+    """
+    Add an analysis job to the queue.
+
+    Args:
+        user_id: Owner of the food log
+        food_log_id: Pending food log to patch with the result
+        image_path: Stored (already downscaled) image to analyze
+        content_key: Content hash of the original upload, used as cache key
+        callback_url: Optional URL that receives a POST when the job finishes
+
+    Returns:
+        Job ID
+    """
+    db = get_database()
+    now = datetime.utcnow()
+    job_doc = {
+        "user_id": user_id,
+        "food_log_id": food_log_id,
+        "image_path": image_path,
+        "content_key": content_key,
+        "callback_url": callback_url,
+        "status": "queued",
+        "progress": "queued",
+        "attempts": 0,
+        "result": None,
+        "error": None,
+        "lease_until": None,
+        "available_at": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    result = await db.analysis_jobs.insert_one(job_doc)
+    return str(result.inserted_id)
+
+async def get_analysis_job(job_id: str, user_id: str) -> Optional[dict]:
+    """
+    Get a job owned by a user.
+
+    Args:
+        job_id: Job ID
+        user_id: Requesting user's ID
+
+    Returns:
+        Job document, or None if not found
+    """
+    db = get_database()
+    return await db.analysis_jobs.find_one({"_id": ObjectId(job_id), "user_id": user_id})
+
+class AnalysisWorkerPool:
+    """Pool of asyncio tasks that process queued analysis jobs"""
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def _claim(self) -> Optional[dict]:
+        """Atomically take the oldest queued job or one with an expired lease"""
+        db = get_database()
+        now = datetime.utcnow()
+
+        # A lease that expired on the last allowed attempt means the worker
+        # died mid-job each time; give up on the job instead of reclaiming it
+        abandoned = await db.analysis_jobs.find_one_and_update(
+            {"status": "running", "lease_until": {"$lt": now},
+             "attempts": {"$gte": settings.ANALYSIS_JOB_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "progress": "failed", "lease_until": None, "updated_at": now}}
+        )
+        if abandoned is not None:
+            await self._fail(abandoned, "Analysis worker stopped during every attempt")
+
+        return await db.analysis_jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "available_at": None},
+                {"status": "queued", "available_at": {"$lte": now}},
+                {"status": "running", "lease_until": {"$lt": now},
+                 "attempts": {"$lt": settings.ANALYSIS_JOB_MAX_ATTEMPTS}}
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "progress": "analyzing",
+                    "lease_until": now + timedelta(seconds=settings.ANALYSIS_JOB_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _process(self, job: dict):
+        db = get_database()
+        jobs = db.analysis_jobs
+
+        try:
+            image_bytes = await get_storage().read(key_from_image_path(job["image_path"]))
+            prepared = await asyncio.to_thread(prepare_image, image_bytes, job["content_key"])
+            analysis = await analyze_food_image(prepared, job["user_id"])
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            if job["attempts"] < settings.ANALYSIS_JOB_MAX_ATTEMPTS:
+                self.retried += 1
+                # Exponential backoff so a failing dependency is not hammered
+                delay = min(
+                    settings.ANALYSIS_JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1),
+                    settings.ANALYSIS_JOB_RETRY_MAX_SECONDS
+                )
+                now = datetime.utcnow()
+                await jobs.update_one(
+                    {"_id": job["_id"]},
+                    {"$set": {"status": "queued", "progress": "queued", "error": error,
+                              "lease_until": None, "available_at": now + timedelta(seconds=delay),
+                              "updated_at": now}}
+                )
+                return
+
+            await self._fail(job, error)
+            return
+
+        await jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"progress": "saving", "updated_at": datetime.utcnow()}}
+        )
+
+        # Only the first completion moves the rollup, even if a job whose
+        # lease expired mid-save is processed again
+        analyzed = {
+            "food_name": analysis.food_name,
+            "calories": analysis.calories,
+            "protein": analysis.protein,
+            "carbs": analysis.carbs,
+            "fats": analysis.fats
+        }
+        before = await db.food_logs.find_one_and_update(
+            {"_id": ObjectId(job["food_log_id"]), "analysis_status": {"$ne": "completed"}},
+            {"$set": {**analyzed, "analysis_status": "completed"}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is not None:
+            delta = food_log_delta(analyzed)
+            previous = food_log_delta(before)
+            delta = {field: value - previous[field] for field, value in delta.items()}
+            await increment_rollup(db, before["user_id"], before["date"], delta)
+
+        result = analysis.model_dump()
+        await jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "completed", "progress": "completed", "result": result,
+                      "error": None, "updated_at": datetime.utcnow()}}
+        )
+        self.processed += 1
+        await self._notify(job, "completed", result, None)
+
+    async def _fail(self, job: dict, error: str):
+        """Mark a job and its pending food log as failed for good"""
+        db = get_database()
+        self.failed += 1
+        await db.food_logs.update_one(
+            {"_id": ObjectId(job["food_log_id"]), "analysis_status": {"$ne": "completed"}},
+            # Replaces the "Analyzing..." placeholder the log was created with
+            {"$set": {"analysis_status": "failed", "food_name": "Analysis failed"}}
+        )
+        # No rollup change (pending logs count 0 calories), but cached
+        # log listings still show the log as pending
+        await bump_data_version(db, job["user_id"])
+        await db.analysis_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "failed", "progress": "failed", "error": error,
+                      "updated_at": datetime.utcnow()}}
+        )
+        await self._notify(job, "failed", None, error)
+
+    async def _notify(self, job: dict, status: str, result: Optional[dict], error: Optional[str]):
+        """POST the outcome to the job's callback URL, if any (best effort)"""
+        url = job.get("callback_url")
+        if not url:
+            return
+
+        body = json.dumps({
+            "job_id": str(job["_id"]),
+            "food_log_id": job["food_log_id"],
+            "status": status,
+            "result": result,
+            "error": error
+        }).encode()
+
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        def post(address: str):
+            # http.client never follows redirects, which could lead to an internal host
+            connection_class = _PinnedHTTPSConnection if parts.scheme == "https" else _PinnedHTTPConnection
+            connection = connection_class(address, parts.hostname, parts.port,
+                                          settings.ANALYSIS_CALLBACK_TIMEOUT_SECONDS)
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    raise RuntimeError(f"callback answered HTTP {response.status}")
+            finally:
+                connection.close()
+
+        try:
+            # Checked again at send time, and the checked address is the one
+            # connected to, so DNS changes can't redirect the POST
+            address = await check_callback_url(url)
+            await asyncio.to_thread(post, address)
+        except Exception as e:
+            print(f"⚠️ Analysis job callback failed for {job['_id']}: {e}")
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Analysis job queue unavailable: {e}")
+                await asyncio.sleep(settings.ANALYSIS_JOB_POLL_SECONDS * 10)
+                continue
+
+            if job is None:
+                await asyncio.sleep(settings.ANALYSIS_JOB_POLL_SECONDS)
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Lease expiry will hand the job to another worker
+                print(f"❌ Analysis job {job['_id']} crashed: {e}")
+
+    def start(self):
+        """Start the configured number of worker tasks"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker())
+            for _ in range(settings.ANALYSIS_WORKERS)
+        ]
+
+    async def stop(self):
+        """Cancel all worker tasks; running jobs are reclaimed after their lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        """Return worker counters"""
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried
+        }
+
+# Shared worker pool
+analysis_workers = AnalysisWorkerPool()
+register_metrics("analysis_jobs", analysis_workers.stats)
@@ -5,7 +5,7 @@ from fastapi import HTTPException, status
 from datetime import datetime
 from app.database import get_database
 from app.schemas.user import UserSignup, UserLogin
-from app.auth.password import hash_password, verify_password
+from app.auth.password import password_hasher
 from app.auth.jwt_handler import create_access_token
 
 async def register_user(user_data: UserSignup):
@@ -32,7 +32,7 @@ async def register_user(user_data: UserSignup):
         )
     
     # Create new user document
-    hashed_pwd = hash_password(user_data.password)
+    hashed_pwd = await password_hasher.hash(user_data.password)
     user_doc = {
         "email": user_data.email,
         "hashed_password": hashed_pwd,
@@ -67,12 +67,26 @@ async def authenticate_user(login_data: UserLogin):
     # Find user by email
     user = await db.users.find_one({"email": login_data.email})
     
-    if not user or not verify_password(login_data.password, user["hashed_password"]):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # bcrypt runs on the hasher pool; outdated hashes come back rehashed
+    is_valid, new_hash = await password_hasher.verify_and_update(
+        login_data.password, user["hashed_password"]
+    )
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        user["hashed_password"] = new_hash
+    
     # Generate access token
     access_token = create_access_token({"user_id": str(user["_id"])})
     
@@ -0,0 +1,407 @@
+"""
+Materialized per-user daily rollups.
+
+daily_rollups holds one document per (user_id, date) with calorie and
+macro sums, log counts and the day's goals. Every write path applies its
+delta with an atomic $inc, so the dashboard reads one indexed document
+instead of aggregating the raw logs. The same calls bump the user's data
+version, which invalidates their cached GET responses.
+
+A rollup is only trusted once it is complete. The first write of a day
+(or the first write since rollups were introduced) seeds it from a full
+aggregation of the raw logs, which already includes that write, instead
+of starting from the delta alone; reads of days without a complete
+rollup aggregate the raw logs.
+
+Rollups can drift if a write fails between the log and the rollup update,
+or in the rare case that two writes race on a day's very first rollup.
+Rebuild them from the raw logs with:
+    python -m app.services.daily_rollups [--user USER_ID]
+
+or only report days whose rollup disagrees with the raw logs (exits
+non-zero on drift):
+    python -m app.services.daily_rollups --check [--user USER_ID]
+"""
+import asyncio
+import re
+import sys
+from datetime import datetime, timedelta, date as date_type
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from app.services.daily_totals import aggregate_daily_totals
+from app.utils.data_versions import bump_data_version
+
+COLLECTION_NAME = "daily_rollups"
+
+SUMMARY_FIELDS = ("consumed", "burned", "food_log_count", "activity_log_count",
+                  "intake_goal", "burn_goal")
+
+ROLLUP_TOTAL_FIELDS = ("consumed", "burned", "protein", "carbs", "fats",
+                      "food_log_count", "activity_log_count", "intake_goal", "burn_goal")
+
+# Leading amount of a macro value such as "25g" or "12.5 g"
+_GRAMS_PATTERN = re.compile(r"[0-9]+(\.[0-9]+)?")
+
+def _number(value) -> float:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+def parse_grams(value) -> float:
+    """
+    Read a macro amount in grams.
+
+    Food logs store macros as strings like "25g" (the format the Gemini
+    prompt asks for and the schemas accept); plain numbers pass through.
+
+    Returns:
+        Grams, or 0 if the value holds no number
+    """
+    if isinstance(value, str):
+        match = _GRAMS_PATTERN.search(value)
+        return float(match.group()) if match else 0
+    return _number(value)
+
+def _grams_expression(field: str) -> dict:
+    """Aggregation equivalent of parse_grams() for a food log field"""
+    return {"$let": {
+        "vars": {"found": {"$regexFind": {"input": {"$toString": f"${field}"},
+                                          "regex": _GRAMS_PATTERN.pattern}}},
+        "in": {"$convert": {"input": "$$found.match", "to": "double", "onError": 0, "onNull": 0}}
+    }}
+
+def food_log_delta(log: dict, sign: int = 1) -> dict:
+    """
+    Build the $inc document for adding (sign=1) or removing (sign=-1) a food log.
+
+    Args:
+        log: Food log document
+        sign: 1 when the log is created, -1 when it is deleted
+
+    Returns:
+        Field increments for the log's rollup
+    """
+    return {
+        "consumed": sign * _number(log.get("calories")),
+        "protein": sign * parse_grams(log.get("protein")),
+        "carbs": sign * parse_grams(log.get("carbs")),
+        "fats": sign * parse_grams(log.get("fats")),
+        "food_log_count": sign
+    }
+
+def activity_log_delta(log: dict, sign: int = 1) -> dict:
+    """
+    Build the $inc document for adding (sign=1) or removing (sign=-1) an activity log.
+
+    Args:
+        log: Activity log document
+        sign: 1 when the log is created, -1 when it is deleted
+
+    Returns:
+        Field increments for the log's rollup
+    """
+    return {
+        "burned": sign * _number(log.get("calories_burned")),
+        "activity_log_count": sign
+    }
+
+def _day_filter(user_id: str, date: str) -> dict:
+    return {"user_id": user_id, "date": date}
+
+async def seed_rollup(db, user_id: str, date: str):
+    """
+    Write a day's complete rollup from a full aggregation of the raw logs.
+
+    Called after the triggering write is stored, so its effect is included
+    and its delta must not be applied on top.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        date: Day in ISO format (YYYY-MM-DD)
+    """
+    results = await db.food_logs.aggregate(rollup_pipeline(_day_filter(user_id, date))).to_list(length=1)
+    if results:
+        rollup = results[0]
+    else:
+        rollup = {field: None if field.endswith("_goal") else 0 for field in ROLLUP_TOTAL_FIELDS}
+        rollup.update(_day_filter(user_id, date))
+    rollup["complete"] = True
+    rollup["updated_at"] = datetime.utcnow()
+    await db[COLLECTION_NAME].replace_one(_day_filter(user_id, date), rollup, upsert=True)
+
+async def increment_rollup(db, user_id: str, date: str, delta: dict):
+    """
+    Atomically apply a delta to a user's rollup for one day.
+
+    The delta only applies to a complete rollup; otherwise the day is
+    seeded from the raw logs. Failures are logged rather than raised: the
+    log write has already succeeded, and the rebuild command repairs any
+    drift.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        date: Day in ISO format (YYYY-MM-DD)
+        delta: Field increments, e.g. from food_log_delta()
+    """
+    try:
+        result = await db[COLLECTION_NAME].update_one(
+            {**_day_filter(user_id, date), "complete": True},
+            {"$inc": delta, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            await seed_rollup(db, user_id, date)
+    except Exception as e:
+        print(f"⚠️ Daily rollup update failed for {user_id} on {date}: {e}")
+    await bump_data_version(db, user_id)
+
+async def increment_rollups(db, user_id: str, deltas: Dict[str, dict]):
+    """
+    Apply deltas to several of a user's daily rollups in one bulk write.
+
+    Days without a complete rollup are seeded from the raw logs instead.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        deltas: Field increments keyed by day (ISO format)
+    """
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    requests = [
+        UpdateOne(
+            {**_day_filter(user_id, date), "complete": True},
+            {"$inc": dict(delta), "$set": {"updated_at": now}}
+        )
+        for date, delta in deltas.items()
+    ]
+    try:
+        result = await db[COLLECTION_NAME].bulk_write(requests, ordered=False)
+        if result.matched_count < len(requests):
+            cursor = db[COLLECTION_NAME].find(
+                {"user_id": user_id, "date": {"$in": list(deltas)}, "complete": True},
+                {"date": 1}
+            )
+            complete = {doc["date"] async for doc in cursor}
+            for date in deltas:
+                if date not in complete:
+                    await seed_rollup(db, user_id, date)
+    except Exception as e:
+        print(f"⚠️ Daily rollup batch update failed for {user_id}: {e}")
+    await bump_data_version(db, user_id)
+
+async def set_rollup_goals(db, user_id: str, date: str,
+                           intake_goal: Optional[float], burn_goal: Optional[float]):
+    """
+    Copy a day's goals onto its rollup (call after the goals document is stored).
+
+    Seeds the day from the raw logs if it has no complete rollup yet.
+    """
+    try:
+        result = await db[COLLECTION_NAME].update_one(
+            {**_day_filter(user_id, date), "complete": True},
+            {"$set": {"intake_goal": intake_goal, "burn_goal": burn_goal,
+                      "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            await seed_rollup(db, user_id, date)
+    except Exception as e:
+        print(f"⚠️ Daily rollup goals update failed for {user_id} on {date}: {e}")
+    await bump_data_version(db, user_id)
+
+async def get_daily_totals(db, user_id: str, date: str) -> dict:
+    """
+    Read a user's totals for one day.
+
+    Uses the rollup when it is complete and falls back to aggregating the
+    raw logs otherwise (e.g. for days not yet backfilled).
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        date: Day in ISO format (YYYY-MM-DD)
+
+    Returns:
+        Dict with consumed, burned, food_log_count, activity_log_count,
+        intake_goal and burn_goal
+    """
+    rollup = await db[COLLECTION_NAME].find_one({**_day_filter(user_id, date), "complete": True})
+    if rollup is None:
+        return await aggregate_daily_totals(db, user_id, date)
+    return {field: rollup.get(field, None if field.endswith("_goal") else 0)
+            for field in SUMMARY_FIELDS}
+
+def rollup_pipeline(match: dict) -> List[dict]:
+    """
+    Build the aggregation (run on food_logs) that computes rollups from raw logs.
+
+    Args:
+        match: Filter applied to every source collection
+
+    Returns:
+        Pipeline yielding one rollup-shaped document per (user_id, date)
+    """
+    return [
+        {"$match": match},
+        {"$project": {"user_id": 1, "date": 1, "consumed": "$calories",
+                      "protein": _grams_expression("protein"), "carbs": _grams_expression("carbs"),
+                      "fats": _grams_expression("fats"), "food_log_count": {"$literal": 1}}},
+        {"$unionWith": {"coll": "activity_logs", "pipeline": [
+            {"$match": match},
+            {"$project": {"user_id": 1, "date": 1, "burned": "$calories_burned",
+                          "activity_log_count": {"$literal": 1}}}
+        ]}},
+        {"$unionWith": {"coll": "goals", "pipeline": [
+            {"$match": match},
+            {"$project": {"user_id": 1, "date": 1,
+                          "intake_goal": "$daily_calorie_intake_goal",
+                          "burn_goal": "$daily_calorie_burn_goal"}}
+        ]}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "date": "$date"},
+            "consumed": {"$sum": "$consumed"},
+            "burned": {"$sum": "$burned"},
+            "protein": {"$sum": "$protein"},
+            "carbs": {"$sum": "$carbs"},
+            "fats": {"$sum": "$fats"},
+            "food_log_count": {"$sum": "$food_log_count"},
+            "activity_log_count": {"$sum": "$activity_log_count"},
+            "intake_goal": {"$max": "$intake_goal"},
+            "burn_goal": {"$max": "$burn_goal"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "date": "$_id.date",
+            "consumed": 1, "burned": 1, "protein": 1, "carbs": 1, "fats": 1,
+            "food_log_count": 1, "activity_log_count": 1,
+            "intake_goal": 1, "burn_goal": 1,
+            "complete": {"$literal": True},
+            "updated_at": "$$NOW"
+        }}
+    ]
+
+async def get_rollup_range(db, user_id: str, start: str, end: str) -> List[dict]:
+    """
+    Read a user's rollups for an inclusive date range.
+
+    Days without a complete rollup are aggregated from the raw logs in one
+    extra query, so ranges work before a backfill has run.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        start: First day in ISO format (YYYY-MM-DD)
+        end: Last day in ISO format (YYYY-MM-DD)
+
+    Returns:
+        Rollup documents sorted by date (days with no data are omitted)
+    """
+    date_range = {"$gte": start, "$lte": end}
+    cursor = db[COLLECTION_NAME].find(
+        {"user_id": user_id, "date": date_range, "complete": True},
+        {"_id": 0}
+    ).sort("date", 1)
+    rollups = await cursor.to_list(length=None)
+
+    present = {rollup["date"] for rollup in rollups}
+    day = date_type.fromisoformat(start)
+    last = date_type.fromisoformat(end)
+    missing = []
+    while day <= last:
+        if day.isoformat() not in present:
+            missing.append(day.isoformat())
+        day += timedelta(days=1)
+
+    if missing:
+        pipeline = rollup_pipeline({"user_id": user_id, "date": {"$in": missing}})
+        rollups += await db.food_logs.aggregate(pipeline).to_list(length=None)
+        rollups.sort(key=lambda rollup: rollup["date"])
+    return rollups
+
+async def rebuild_rollups(db, user_id: Optional[str] = None) -> int:
+    """
+    Recompute rollups from the raw logs, server-side.
+
+    Existing rollups in scope are dropped first so days whose logs are all
+    gone disappear; reads fall back to aggregation while this runs. Writes
+    that land during a rebuild may be counted twice or not at all, so run it
+    off-peak or scoped to one user.
+
+    Args:
+        db: Motor database
+        user_id: Rebuild only this user's rollups (all users when None)
+
+    Returns:
+        Number of rollup documents after the rebuild
+    """
+    match = {"user_id": user_id} if user_id else {}
+    await db[COLLECTION_NAME].delete_many(match)
+    pipeline = rollup_pipeline(match) + [
+        {"$merge": {"into": COLLECTION_NAME, "on": ["user_id", "date"],
+                    "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    await db.food_logs.aggregate(pipeline).to_list(length=None)
+    return await db[COLLECTION_NAME].count_documents(match)
+
+async def find_rollup_drift(db, user_id: Optional[str] = None) -> List[dict]:
+    """
+    Compare stored rollups with a fresh aggregation of the raw logs.
+
+    Both the write-path deltas and the rebuild pipeline parse macro
+    strings ("25g"), in Python and in MongoDB respectively, so this also
+    catches the two disagreeing.
+
+    Args:
+        db: Motor database
+        user_id: Check only this user's rollups (all users when None)
+
+    Returns:
+        One entry per (user_id, date) whose stored totals differ, with the
+        stored and expected values of the differing fields
+    """
+    match = {"user_id": user_id} if user_id else {}
+    expected = {
+        (doc["user_id"], doc["date"]): doc
+        for doc in await db.food_logs.aggregate(rollup_pipeline(match)).to_list(length=None)
+    }
+    stored = {
+        (doc["user_id"], doc["date"]): doc
+        async for doc in db[COLLECTION_NAME].find(match, {"_id": 0})
+    }
+
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, {})
+        have = stored.get(key, {})
+        fields = {}
+        for field in ROLLUP_TOTAL_FIELDS:
+            want_value = want.get(field, None if field.endswith("_goal") else 0)
+            have_value = have.get(field, None if field.endswith("_goal") else 0)
+            if (want_value is None or have_value is None) and want_value != have_value:
+                fields[field] = {"stored": have_value, "expected": want_value}
+            elif want_value is not None and abs(want_value - have_value) > 1e-6:
+                fields[field] = {"stored": have_value, "expected": want_value}
+        if fields:
+            drift.append({"user_id": key[0], "date": key[1], "fields": fields})
+    return drift
+
+async def _main(user_id: Optional[str], check: bool):
+    from app.database import connect_to_mongo, get_database, close_mongo_connection
+
+    await connect_to_mongo(apply_indexes_in_background=False)
+    try:
+        if check:
+            drift = await find_rollup_drift(get_database(), user_id)
+            for entry in drift:
+                print(f"❌ {entry['user_id']} {entry['date']}: {entry['fields']}")
+            print("✅ Rollups match the raw logs" if not drift else f"❌ {len(drift)} rollups drifted")
+            sys.exit(1 if drift else 0)
+        count = await rebuild_rollups(get_database(), user_id)
+        print(f"✅ Rebuilt {count} daily rollups")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    user = sys.argv[sys.argv.index("--user") + 1] if "--user" in sys.argv else None
+    asyncio.run(_main(user, "--check" in sys.argv))
@@ -0,0 +1,78 @@
+"""
+Server-side daily calorie totals for a user.
+
+One aggregation on food_logs pulls in activity_logs and the day's goals
+with $unionWith and folds everything into a single document of totals
+and counts, so the dashboard needs one round trip and never transfers
+the log documents themselves.
+"""
+from typing import List
+
+def daily_totals_pipeline(user_id: str, date: str) -> List[dict]:
+    """
+    Build the aggregation pipeline (run on food_logs) for one user and day.
+
+    Args:
+        user_id: User ID as a string
+        date: Day in ISO format (YYYY-MM-DD)
+
+    Returns:
+        Pipeline yielding at most one document with consumed, burned,
+        food_log_count, activity_log_count, intake_goal and burn_goal
+    """
+    match = {"$match": {"user_id": user_id, "date": date}}
+    return [
+        match,
+        {"$project": {"_id": 0, "kind": {"$literal": "food"}, "calories": "$calories"}},
+        {"$unionWith": {"coll": "activity_logs", "pipeline": [
+            match,
+            {"$project": {"_id": 0, "kind": {"$literal": "activity"}, "calories": "$calories_burned"}}
+        ]}},
+        {"$unionWith": {"coll": "goals", "pipeline": [
+            match,
+            {"$limit": 1},
+            {"$project": {
+                "_id": 0,
+                "kind": {"$literal": "goals"},
+                "intake_goal": "$daily_calorie_intake_goal",
+                "burn_goal": "$daily_calorie_burn_goal"
+            }}
+        ]}},
+        {"$group": {
+            "_id": None,
+            "consumed": {"$sum": {"$cond": [{"$eq": ["$kind", "food"]}, "$calories", 0]}},
+            "burned": {"$sum": {"$cond": [{"$eq": ["$kind", "activity"]}, "$calories", 0]}},
+            "food_log_count": {"$sum": {"$cond": [{"$eq": ["$kind", "food"]}, 1, 0]}},
+            "activity_log_count": {"$sum": {"$cond": [{"$eq": ["$kind", "activity"]}, 1, 0]}},
+            # $max skips missing values, so these stay null without a goals document
+            "intake_goal": {"$max": "$intake_goal"},
+            "burn_goal": {"$max": "$burn_goal"}
+        }},
+        {"$project": {"_id": 0}}
+    ]
+
+async def aggregate_daily_totals(db, user_id: str, date: str) -> dict:
+    """
+    Compute a user's totals for one day in a single aggregation.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+        date: Day in ISO format (YYYY-MM-DD)
+
+    Returns:
+        Dict with consumed, burned, food_log_count, activity_log_count,
+        intake_goal and burn_goal (zeros/None when nothing is logged)
+    """
+    cursor = db.food_logs.aggregate(daily_totals_pipeline(user_id, date))
+    results = await cursor.to_list(length=1)
+    if results:
+        return results[0]
+    return {
+        "consumed": 0,
+        "burned": 0,
+        "food_log_count": 0,
+        "activity_log_count": 0,
+        "intake_goal": None,
+        "burn_goal": None
+    }
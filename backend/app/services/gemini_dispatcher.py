@@ -0,0 +1,154 @@
+"""
+Gemini dispatch layer - bounded, rate-limited execution of model calls.
+
+Blocking SDK calls run on a dedicated thread pool instead of the default
+executor. A semaphore caps concurrent calls, a token bucket keeps the
+request rate under the API quota, identical in-flight requests share one
+call, and quota errors are retried with jittered exponential backoff.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.token_bucket import TokenBucket
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether an SDK error means the request was throttled (HTTP 429)"""
+    try:
+        from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+        if isinstance(error, (ResourceExhausted, TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    return "429" in str(error)
+
+class GeminiDispatcher:
+    """Schedules Gemini SDK calls with concurrency, rate and retry control"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.GEMINI_MAX_CONCURRENCY,
+            thread_name_prefix="gemini"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket = TokenBucket(settings.GEMINI_RATE_PER_SECOND, settings.GEMINI_RATE_BURST)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.queue_depth = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.quota_errors = 0
+        self._wait_total = 0.0
+        self._wait_count = 0
+        self._wait_max = 0.0
+
+    async def _acquire_slot(self):
+        """Wait for a concurrency slot and a rate token, recording the wait"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+        self.queue_depth += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self._bucket.acquire()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.perf_counter() - started
+        self._wait_total += waited
+        self._wait_count += 1
+        self._wait_max = max(self._wait_max, waited)
+        self.active += 1
+
+    def _release_slot(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    async def _run(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self._acquire_slot()
+            try:
+                result = await loop.run_in_executor(self._executor, func, *args)
+                self.completed += 1
+                return result
+            except Exception as e:
+                if not is_quota_error(e):
+                    self.failed += 1
+                    raise
+                self.quota_errors += 1
+                if attempt >= settings.GEMINI_MAX_RETRIES:
+                    self.failed += 1
+                    raise
+            finally:
+                self._release_slot()
+
+            # Full jitter backoff, taken outside the concurrency slot
+            backoff = settings.GEMINI_RETRY_BASE_SECONDS * (2 ** attempt)
+            await asyncio.sleep(random.uniform(0, min(backoff, settings.GEMINI_RETRY_MAX_SECONDS)))
+            attempt += 1
+            self.retries += 1
+
+    async def submit(self, key: Optional[str], func: Callable, *args) -> Any:
+        """
+        Run a blocking SDK call through the dispatcher.
+
+        Args:
+            key: Coalescing key; concurrent submits with the same key share
+                one call. None disables coalescing.
+            func: Blocking callable, e.g. model.generate_content
+            *args: Arguments for func
+
+        Returns:
+            Result of func
+        """
+        if key is None:
+            return await self._run(func, *args)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._run(func, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def shutdown(self):
+        """Stop accepting work on the executor"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Return queue, concurrency and wait-time metrics"""
+        return {
+            "queue_depth": self.queue_depth,
+            "active": self.active,
+            "in_flight_keys": len(self._in_flight),
+            "max_concurrency": settings.GEMINI_MAX_CONCURRENCY,
+            "completed": self.completed,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "quota_errors": self.quota_errors,
+            "avg_wait_ms": round(self._wait_total / self._wait_count * 1000, 2) if self._wait_count else None,
+            "max_wait_ms": round(self._wait_max * 1000, 2)
+        }
+
+# Shared dispatcher instance
+gemini_dispatcher = GeminiDispatcher()
+register_metrics("gemini_dispatcher", gemini_dispatcher.stats)
@@ -0,0 +1,151 @@
+"""
+Gemini model registry - resolves the vision model once and reuses it.
+
+Model discovery (genai.list_models) is a blocking network call, so it runs
+in a worker thread at startup and is refreshed in the background once the
+TTL expires. Requests always get the current GenerativeModel instance, and
+a failed refresh keeps serving the last known good model.
+"""
+import asyncio
+import time
+from typing import Optional
+import google.generativeai as genai
+from app.config import settings
+from app.utils.metrics import register_metrics
+
+def get_available_vision_model() -> str:
+    """
+    Pick a Gemini model that supports generateContent.
+
+    Blocking; call from a worker thread.
+
+    Returns:
+        Model name, preferring settings.GEMINI_MODEL when it is available
+
+    Raises:
+        RuntimeError: If no listed model supports generateContent
+    """
+    candidates = [
+        m.name for m in genai.list_models()
+        if "generateContent" in m.supported_generation_methods
+    ]
+
+    if not candidates:
+        raise RuntimeError("No Gemini model supports generateContent")
+
+    if settings.GEMINI_MODEL:
+        for name in candidates:
+            if name == settings.GEMINI_MODEL or name == f"models/{settings.GEMINI_MODEL}":
+                return name
+
+    return candidates[0]
+
+class ModelRegistry:
+    """Holds the selected Gemini model and refreshes it on a TTL"""
+
+    def __init__(self):
+        self.model_name: Optional[str] = None
+        self._model = None
+        self._resolved_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_discovery_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._resolved_at > settings.GEMINI_MODEL_TTL_SECONDS
+
+    def _build(self, model_name: str):
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config={"temperature": 0.2}
+        )
+        print("Using Gemini model:", model_name)
+
+    async def refresh(self, force: bool = True):
+        """
+        Re-run model discovery off the event loop.
+
+        On failure the current model is kept; if there is none yet,
+        settings.GEMINI_MODEL is used as a fallback when configured.
+
+        Args:
+            force: When False, skip discovery if a fresh model is already held
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not force and self._model is not None and not self._is_stale():
+                return
+
+            started = time.perf_counter()
+            try:
+                model_name = await asyncio.to_thread(get_available_vision_model)
+                self.last_error = None
+            except Exception as e:
+                self.failure_count += 1
+                self.last_error = str(e)
+                print(f"⚠️ Gemini model discovery failed: {e}")
+                model_name = self.model_name or settings.GEMINI_MODEL or None
+            finally:
+                self.last_discovery_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.refresh_count += 1
+                self._resolved_at = time.monotonic()
+
+            if model_name and model_name != self.model_name:
+                self._build(model_name)
+
+    async def get_model(self):
+        """
+        Get the shared GenerativeModel instance.
+
+        Resolves synchronously (off-loop) only when no model is known yet;
+        a stale model is returned immediately while a refresh runs.
+
+        Returns:
+            genai.GenerativeModel
+
+        Raises:
+            RuntimeError: If no model could ever be resolved
+        """
+        if self._model is None:
+            await self.refresh(force=False)
+            if self._model is None:
+                raise RuntimeError(f"No Gemini model available: {self.last_error}")
+        elif self._is_stale():
+            self.start()
+
+        return self._model
+
+    def start(self):
+        """Schedule a background refresh unless one is already running"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def stop(self):
+        """Cancel any in-flight background refresh"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        """Return discovery timings and refresh counters"""
+        return {
+            "model": self.model_name,
+            "age_seconds": round(time.monotonic() - self._resolved_at, 1) if self._resolved_at else None,
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "last_discovery_ms": self.last_discovery_ms,
+            "last_error": self.last_error
+        }
+
+# Shared registry instance
+model_registry = ModelRegistry()
+register_metrics("gemini_model", model_registry.stats)
@@ -3,15 +3,21 @@ Google Gemini AI service - Food image analysis using Gemini API
 FULL AUTO MODEL VERSION (v1beta SAFE)
 """
 
-import os
-import io
 import json
 import asyncio
-from PIL import Image
+from PIL import UnidentifiedImageError
 import google.generativeai as genai
 from fastapi import UploadFile, HTTPException
 from app.config import settings
 from app.schemas.food_log import AIFoodAnalysis
+from app.services.analysis_cache import analysis_cache
+from app.services.image_hash import dhash, near_duplicate_index
+from app.services.gemini_models import model_registry
+from app.services.gemini_dispatcher import gemini_dispatcher
+from app.services.image_preprocess import PreparedImage, prepare_image
+from app.services.storage import get_storage, image_path_for_key
+from app.services.thumbnails import thumbnail_cache
+from app.utils.upload_stream import hash_upload
 
 
 # ============================
@@ -25,42 +31,45 @@ genai.configure(api_key=settings.GEMINI_API_KEY)
 
 
 # ============================
-# Auto Select Vision Model
+# Prepare Uploaded Image
 # ============================
 
-def get_available_vision_model():
+async def prepare_upload(image_file: UploadFile) -> PreparedImage:
 
-    models = genai.list_models()
+    # Hash and size-check the spooled upload in one chunked pass
+    content_key, _ = await hash_upload(image_file, settings.MAX_UPLOAD_SIZE)
 
-    for m in models:
-        if "generateContent" in m.supported_generation_methods:
-            return m.name
-
-    raise RuntimeError("No Gemini model supports generateContent")
+    # Decode straight from the same spooled file, off the event loop
+    try:
+        return await asyncio.to_thread(prepare_image, image_file.file, content_key)
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(400, "Could not decode image")
 
 
 # ============================
 # Analyze Food Image
 # ============================
 
-async def analyze_food_image(image_file: UploadFile) -> AIFoodAnalysis:
+async def analyze_food_image(prepared: PreparedImage, user_id: str = None) -> AIFoodAnalysis:
 
     try:
-        # Read image once
-        image_bytes = await image_file.read()
-        await image_file.seek(0)
+        # Reuse a previous analysis of the exact same image
+        cache_key = prepared.content_key
+        cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        # Convert to PIL Image (MANDATORY)
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        image = prepared.image
 
-        # Get working Gemini model dynamically
-        model_name = get_available_vision_model()
-        print("Using Gemini model:", model_name)
+        # Reuse the analysis of a visually near-identical earlier upload
+        perceptual_hash = dhash(image)
+        similar = near_duplicate_index.lookup(perceptual_hash, user_id)
+        if similar is not None:
+            await analysis_cache.set(cache_key, similar)
+            return similar
 
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config={"temperature": 0.2}
-        )
+        # Shared model instance, resolved at startup and refreshed in the background
+        model = await model_registry.get_model()
 
         prompt = """
 You are a professional nutritionist.
@@ -85,7 +94,9 @@ No markdown.
 No extra text.
 """
 
-        response = await asyncio.to_thread(
+        # Bounded, rate-limited call; identical in-flight images share one request
+        response = await gemini_dispatcher.submit(
+            cache_key,
             model.generate_content,
             [prompt, image]
         )
@@ -95,7 +106,7 @@ No extra text.
 
         data = json.loads(text)
 
-        return AIFoodAnalysis(
+        analysis = AIFoodAnalysis(
             food_name=data.get("food_name", "Unknown"),
             calories=float(data.get("calories", 200)),
             protein=data.get("protein"),
@@ -105,6 +116,11 @@ No extra text.
             confidence=data.get("confidence", "medium")
         )
 
+        await analysis_cache.set(cache_key, analysis)
+        near_duplicate_index.add(perceptual_hash, analysis, user_id)
+
+        return analysis
+
     except json.JSONDecodeError:
         raise HTTPException(500, "Gemini returned invalid JSON")
 
@@ -120,24 +136,25 @@ No extra text.
 # Save Uploaded Image
 # ============================
 
-async def save_uploaded_image(image_file: UploadFile) -> str:
-
-    from datetime import datetime
-    import uuid
-
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-    ext = os.path.splitext(image_file.filename)[1]
-
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}{ext}"
+# The event loop only keeps weak references to tasks; hold pregeneration
+# tasks until they finish so they are not garbage-collected mid-run
+_pregeneration_tasks = set()
 
-    path = os.path.join(settings.UPLOAD_DIR, filename)
+def _pregeneration_done(task: asyncio.Task):
+    _pregeneration_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Thumbnail pregeneration failed: {task.exception()}")
 
-    content = await image_file.read()
+async def save_uploaded_image(prepared: PreparedImage) -> str:
 
-    with open(path, "wb") as f:
-        f.write(content)
+    # Store the downscaled, metadata-free re-encode rather than the original;
+    # identical content maps to the same key and is written only once
+    key = await get_storage().save(prepared.data, prepared.extension)
 
-    await image_file.seek(0)
+    # Optionally render common thumbnail sizes from the image already in memory
+    if settings.THUMBNAIL_PREGENERATE_WIDTHS:
+        task = asyncio.create_task(thumbnail_cache.pregenerate(key, len(prepared.data), prepared.image))
+        _pregeneration_tasks.add(task)
+        task.add_done_callback(_pregeneration_done)
 
-    return path
+    return image_path_for_key(key)
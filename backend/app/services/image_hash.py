@@ -0,0 +1,212 @@
+"""
+Perceptual hashing and near-duplicate lookup for food images.
+
+A 64-bit difference hash (dHash) is computed from the decoded PIL image and
+indexed with multi-index hashing: the hash is split into (max_distance + 1)
+bit ranges, and by the pigeonhole principle any hash within max_distance
+shares at least one range exactly. Lookups only compare against the few
+hashes in the matching buckets, so they stay fast at millions of entries.
+"""
+import copy
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from PIL import Image
+from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.ttl_cache import TTLCache
+
+HASH_BITS = 64
+
+def dhash(image: Image.Image) -> int:
+    """
+    Compute a 64-bit difference hash of an image.
+
+    Args:
+        image: Decoded PIL image
+
+    Returns:
+        Hash as an integer
+    """
+    small = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+class PHashIndex:
+    """Multi-index hash table supporting Hamming-radius lookups"""
+
+    def __init__(self, max_distance: int, max_entries: int):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._ranges = self._split_ranges(max_distance + 1)
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in self._ranges]
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+
+    @staticmethod
+    def _split_ranges(parts: int) -> List[Tuple[int, int]]:
+        """Split the hash into (shift, mask) pairs of near-equal width"""
+        ranges = []
+        start = 0
+        for i in range(parts):
+            width = HASH_BITS // parts + (1 if i < HASH_BITS % parts else 0)
+            ranges.append((start, (1 << width) - 1))
+            start += width
+        return ranges
+
+    def _chunks(self, value: int):
+        for i, (shift, mask) in enumerate(self._ranges):
+            yield i, (value >> shift) & mask
+
+    def add(self, value: int, payload: Any):
+        """
+        Index a hash, evicting the oldest entry when full.
+
+        Args:
+            value: Perceptual hash
+            payload: Object returned by lookups that match this hash
+        """
+        if value in self._entries:
+            self._entries[value] = payload
+            self._entries.move_to_end(value)
+            return
+
+        self._entries[value] = payload
+        for i, chunk in self._chunks(value):
+            self._buckets[i].setdefault(chunk, set()).add(value)
+
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._remove_from_buckets(oldest)
+
+    def _remove_from_buckets(self, value: int):
+        for i, chunk in self._chunks(value):
+            bucket = self._buckets[i].get(chunk)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del self._buckets[i][chunk]
+
+    def lookup(self, value: int) -> Optional[Tuple[int, Any]]:
+        """
+        Find the closest indexed hash within max_distance.
+
+        Args:
+            value: Perceptual hash to look up
+
+        Returns:
+            Tuple of (distance, payload), or None if nothing is close enough
+        """
+        best = None
+        seen = set()
+        for i, chunk in self._chunks(value):
+            for candidate in self._buckets[i].get(chunk, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming_distance(value, candidate)
+                if distance == 0:
+                    # Nothing can be closer; skip the remaining bands
+                    return 0, self._entries[candidate]
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+
+        if best is None:
+            return None
+        return best[0], self._entries[best[1]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class NearDuplicateIndex:
+    """Per-user and global perceptual-hash indexes of previous analyses"""
+
+    def __init__(self):
+        self._global = PHashIndex(
+            max_distance=max(settings.PHASH_GLOBAL_MAX_DISTANCE, 0),
+            max_entries=settings.PHASH_GLOBAL_MAX_ENTRIES
+        )
+        # Per-user indexes are themselves kept in a bounded LRU
+        self._users = TTLCache(
+            max_size=settings.PHASH_USER_INDEX_COUNT,
+            ttl_seconds=settings.PHASH_USER_INDEX_TTL_HOURS * 3600
+        )
+        self.user_hits = 0
+        self.global_hits = 0
+        self.misses = 0
+
+    def lookup(self, value: int, user_id: Optional[str] = None) -> Optional[Any]:
+        """
+        Find a previous analysis for a visually similar image.
+
+        The user's own uploads are checked first with the looser per-user
+        threshold, then all uploads with the stricter global threshold.
+
+        Args:
+            value: Perceptual hash of the new image
+            user_id: Uploading user's ID, if known
+
+        Returns:
+            Copy of the stored payload (callers may modify it), or None if
+            no near duplicate exists
+        """
+        if user_id and settings.PHASH_USER_MAX_DISTANCE >= 0:
+            user_index = self._users.get(user_id)
+            match = user_index.lookup(value) if user_index is not None else None
+            if match is not None:
+                self.user_hits += 1
+                return copy.deepcopy(match[1])
+
+        if settings.PHASH_GLOBAL_MAX_DISTANCE >= 0:
+            match = self._global.lookup(value)
+            if match is not None:
+                self.global_hits += 1
+                return copy.deepcopy(match[1])
+
+        self.misses += 1
+        return None
+
+    def add(self, value: int, payload: Any, user_id: Optional[str] = None):
+        """
+        Index the analysis of a newly analyzed image.
+
+        Args:
+            value: Perceptual hash of the image
+            payload: Analysis to reuse for near duplicates
+            user_id: Uploading user's ID, if known
+        """
+        if settings.PHASH_GLOBAL_MAX_DISTANCE >= 0:
+            self._global.add(value, payload)
+
+        if user_id and settings.PHASH_USER_MAX_DISTANCE >= 0:
+            user_index = self._users.get(user_id)
+            if user_index is None:
+                user_index = PHashIndex(
+                    max_distance=settings.PHASH_USER_MAX_DISTANCE,
+                    max_entries=settings.PHASH_USER_MAX_ENTRIES
+                )
+            self._users.set(user_id, user_index)
+
+            user_index.add(value, payload)
+
+    def stats(self) -> dict:
+        """Return index sizes and hit counters"""
+        return {
+            "global_entries": len(self._global),
+            "user_indexes": len(self._users),
+            "user_hits": self.user_hits,
+            "global_hits": self.global_hits,
+            "misses": self.misses
+        }
+
+# Shared index instance
+near_duplicate_index = NearDuplicateIndex()
+register_metrics("near_duplicate_index", near_duplicate_index.stats)
@@ -0,0 +1,117 @@
+"""
+Image preprocessing - decode once, downscale, strip metadata and re-encode.
+
+Phone photos arrive as multi-megabyte JPEGs with EXIF. The decoded,
+size-capped image is what Gemini analyzes and the re-encoded bytes are what
+gets stored, so the full-resolution original is never uploaded or kept.
+"""
+import io
+from PIL import Image, ImageOps
+from app.config import settings
+
+# Output format -> (content type, file extension)
+OUTPUT_FORMATS = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "WEBP": ("image/webp", ".webp"),
+}
+
+MIN_QUALITY = 40
+
+class PreparedImage:
+    """Result of preprocessing an uploaded image"""
+
+    def __init__(self, image: Image.Image, data: bytes, content_type: str,
+                 extension: str, content_key: str):
+        self.image = image  # Downscaled RGB image for analysis
+        self.data = data  # Re-encoded bytes for storage
+        self.content_type = content_type
+        self.extension = extension
+        self.content_key = content_key  # SHA-256 of the original upload
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    options = {"quality": quality}
+    if image_format == "JPEG":
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=4)
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+def decode_image(source, max_side: int) -> Image.Image:
+    """
+    Decode an image at no more than max_side pixels on its longest side.
+
+    For JPEGs, draft() lets the decoder skip straight to a reduced DCT scale
+    (1/2, 1/4 or 1/8), which is much faster and lighter than decoding the
+    full-resolution image and resizing afterwards.
+
+    Args:
+        source: Path, file object or bytes-like object with the encoded image
+        max_side: Longest side of the result in pixels
+
+    Returns:
+        Upright RGB image with no metadata attached
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    image = Image.open(source)
+    image.draft("RGB", (max_side, max_side))
+
+    # Apply the EXIF orientation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image.info.clear()
+    return image
+
+def encode_image(image: Image.Image, max_bytes: int, image_format: str = None):
+    """
+    Encode an image under a byte budget, lowering quality then size.
+
+    Args:
+        image: RGB image
+        max_bytes: Target maximum encoded size
+        image_format: "JPEG" or "WEBP" (defaults to settings.IMAGE_OUTPUT_FORMAT)
+
+    Returns:
+        Tuple of (encoded bytes, content type, extension, image actually encoded)
+    """
+    image_format = (image_format or settings.IMAGE_OUTPUT_FORMAT).upper()
+    if image_format not in OUTPUT_FORMATS:
+        image_format = "JPEG"
+    content_type, extension = OUTPUT_FORMATS[image_format]
+
+    quality = settings.IMAGE_QUALITY
+    while True:
+        data = _encode(image, image_format, quality)
+        if len(data) <= max_bytes:
+            break
+        if quality - 10 >= MIN_QUALITY:
+            quality -= 10
+            continue
+        if min(image.size) <= 64:
+            break
+        # Still too large at the lowest quality: shrink and start over
+        image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.LANCZOS)
+        quality = settings.IMAGE_QUALITY
+
+    return data, content_type, extension, image
+
+def prepare_image(source, content_key: str) -> PreparedImage:
+    """
+    Decode, downscale and re-encode an uploaded image.
+
+    CPU-bound; call from a worker thread.
+
+    Args:
+        source: Path, file object or bytes-like object with the encoded image
+        content_key: Content hash of the original upload
+
+    Returns:
+        PreparedImage used for both analysis and storage
+    """
+    image = decode_image(source, settings.IMAGE_MAX_SIDE)
+    data, content_type, extension, image = encode_image(image, settings.IMAGE_MAX_BYTES)
+    return PreparedImage(image, data, content_type, extension, content_key)
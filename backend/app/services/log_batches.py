@@ -0,0 +1,92 @@
+"""
+Batch inserts for food and activity logs.
+
+A batch is written with one unordered insert_many, so a failing document
+does not stop the rest. Items may carry an idempotency key; a partial
+unique index on (user_id, idempotency_key) turns a retried item into a
+duplicate-key error, which is reported as "duplicate" with the ID of the
+log written the first time.
+"""
+from collections import defaultdict
+from typing import Callable, List, Tuple
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from app.schemas.batch import BatchItemResult, BatchResponse
+from app.services.daily_rollups import increment_rollups
+
+DUPLICATE_KEY_ERROR = 11000
+
+async def insert_log_batch(db, collection_name: str, user_id: str,
+                           docs: List[Tuple[int, dict]], errors: List[BatchItemResult],
+                           delta: Callable[[dict], dict]) -> BatchResponse:
+    """
+    Insert validated log documents and build per-item results.
+
+    Args:
+        db: Motor database
+        collection_name: "food_logs" or "activity_logs"
+        user_id: Owner of every document
+        docs: (request index, document) pairs that passed validation
+        errors: Results for items that failed validation
+        delta: Rollup delta for one document (food_log_delta / activity_log_delta)
+
+    Returns:
+        Counts and results for every item, in request order
+    """
+    collection = db[collection_name]
+    results = {result.index: result for result in errors}
+    failed_positions = {}
+
+    if docs:
+        try:
+            await collection.insert_many([doc for _, doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed_positions[write_error["index"]] = write_error
+
+    duplicate_keys = []
+    for position, (index, doc) in enumerate(docs):
+        write_error = failed_positions.get(position)
+        if write_error is None:
+            results[index] = BatchItemResult(index=index, status="created", id=str(doc["_id"]))
+        elif write_error.get("code") == DUPLICATE_KEY_ERROR and doc.get("idempotency_key"):
+            duplicate_keys.append(doc["idempotency_key"])
+            results[index] = BatchItemResult(index=index, status="duplicate")
+        else:
+            results[index] = BatchItemResult(index=index, status="error", error=write_error.get("errmsg"))
+
+    # Point duplicates at the logs their keys created the first time
+    if duplicate_keys:
+        cursor = collection.find(
+            {"user_id": user_id, "idempotency_key": {"$in": duplicate_keys}},
+            {"idempotency_key": 1}
+        )
+        existing = {doc["idempotency_key"]: str(doc["_id"]) async for doc in cursor}
+        for index, doc in docs:
+            if results[index].status == "duplicate":
+                results[index].id = existing.get(doc["idempotency_key"])
+
+    # One rollup update per touched day
+    # defaultdict(int) so the log counters stay integers; float sums still add up
+    deltas = defaultdict(lambda: defaultdict(int))
+    for index, doc in docs:
+        if results[index].status == "created":
+            for field, value in delta(doc).items():
+                deltas[doc["date"]][field] += value
+    await increment_rollups(db, user_id, deltas)
+
+    ordered = [results[index] for index in sorted(results)]
+    return BatchResponse(
+        created=sum(1 for result in ordered if result.status == "created"),
+        duplicates=sum(1 for result in ordered if result.status == "duplicate"),
+        failed=sum(1 for result in ordered if result.status == "error"),
+        results=ordered
+    )
+
+def validation_error(index: int, error: ValidationError) -> BatchItemResult:
+    """Result for an item that failed schema validation"""
+    message = "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+    return BatchItemResult(index=index, status="error", error=message)
@@ -0,0 +1,383 @@
+"""
+Razorpay webhook event queue and consumer.
+
+The webhook route only verifies the signature and inserts the raw event
+into payment_events, keyed by Razorpay's event ID so redelivered events
+are dropped by the unique _id, then acknowledges. A background consumer
+claims queued events in batches and applies the resulting booking updates
+with a single unordered bulk_write. Updates are conditional (a completed
+payment is never downgraded), so applying an event twice is harmless and
+events may be replayed at any time. Events whose booking can't be found
+are marked unmatched rather than processed, so they can be replayed
+(--status unmatched) once the cause is fixed.
+
+Replay events (e.g. after a bug fix) from the command line:
+    python -m app.services.payment_events [--since 2024-01-31T00:00] [--event ID] [--status failed]
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.config import settings
+from app.database import get_database
+from app.utils.metrics import register_metrics
+
+COLLECTION_NAME = "payment_events"
+
+# Events that change a booking; everything else is stored and marked ignored
+PAID_EVENTS = ("payment.captured", "order.paid")
+FAILED_EVENTS = ("payment.failed",)
+
+# Payment states no later event may change
+FINAL_PAYMENT_STATUSES = ("completed", "refund_pending")
+
+async def enqueue_payment_event(db, event_id: str, event: dict) -> bool:
+    """
+    Store a verified webhook event for the consumer.
+
+    Args:
+        db: Motor database
+        event_id: Razorpay event ID (X-Razorpay-Event-Id)
+        event: Parsed webhook body
+
+    Returns:
+        False if the event was already received
+    """
+    now = datetime.utcnow()
+    try:
+        await db[COLLECTION_NAME].insert_one({
+            "_id": event_id,
+            "event": event.get("event"),
+            "body": event,
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "lease_until": None,
+            "received_at": now,
+            "updated_at": now
+        })
+    except DuplicateKeyError:
+        return False
+    payment_event_consumer.wake()
+    return True
+
+def _entity(event: dict, name: str) -> dict:
+    return ((event.get("payload") or {}).get(name) or {}).get("entity") or {}
+
+def paid_update(payment_id: Optional[str]) -> List[dict]:
+    """
+    Pipeline update recording a completed payment on a booking.
+
+    A booking cancelled before the payment arrived (its slots already
+    released) stays cancelled, and its payment becomes "refund_pending".
+    """
+    cancelled = {"$eq": ["$status", "cancelled"]}
+    changes = {
+        "payment_status": {"$cond": [cancelled, "refund_pending", "completed"]},
+        # Leave sessions that were already paid (or have since completed) alone
+        "status": {"$cond": [
+            {"$or": [cancelled, {"$eq": ["$payment_status", "completed"]}]}, "$status", "scheduled"
+        ]}
+    }
+    if payment_id:
+        changes["payment_id"] = payment_id
+    return [{"$set": changes}]
+
+def _note(entity: dict, name: str) -> Optional[str]:
+    # Razorpay sends empty notes as a list
+    notes = entity.get("notes")
+    return notes.get(name) if isinstance(notes, dict) else None
+
+def booking_ref(event: dict) -> Optional[Tuple[str, object]]:
+    """
+    Identify the booking a webhook event refers to.
+
+    Uses the booking_id note of the order (set when it was created) or of
+    the payment (set by checkout), falling back to the order ID, which may
+    be any order ever created for the booking.
+
+    Returns:
+        ("_id", ObjectId) or ("order", order ID), or None if the event
+        does not affect a booking
+    """
+    if event.get("event") not in PAID_EVENTS and event.get("event") not in FAILED_EVENTS:
+        return None
+
+    payment = _entity(event, "payment")
+    order = _entity(event, "order")
+    booking_id = _note(order, "booking_id") or _note(payment, "booking_id")
+    if booking_id:
+        try:
+            return ("_id", ObjectId(booking_id))
+        except (InvalidId, TypeError):
+            return None
+    order_id = payment.get("order_id") or order.get("id")
+    return ("order", order_id) if order_id else None
+
+def ref_filter(ref: Tuple[str, object]) -> dict:
+    """Bookings filter for a booking_ref()"""
+    kind, value = ref
+    if kind == "_id":
+        return {"_id": value}
+    # Bookings from before order history only have their current order
+    return {"$or": [{"razorpay_order_ids": value}, {"razorpay_order_id": value}]}
+
+def booking_update(event: dict) -> Optional[UpdateOne]:
+    """
+    Translate a webhook event into a booking update.
+
+    Returns:
+        UpdateOne for bulk_write, or None if the event does not affect a booking
+    """
+    ref = booking_ref(event)
+    if ref is None:
+        return None
+
+    # A received payment is final; later or replayed events must not undo it
+    match = {**ref_filter(ref), "payment_status": {"$nin": list(FINAL_PAYMENT_STATUSES)}}
+    name = event.get("event")
+    payment = _entity(event, "payment")
+    if name in PAID_EVENTS:
+        return UpdateOne(match, paid_update(payment.get("id")))
+    return UpdateOne(match, {"$set": {"payment_status": "failed"}})
+
+class PaymentEventConsumer:
+    """Background task applying queued payment events in batches"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.applied = 0
+        self.ignored = 0
+        self.unmatched = 0
+        self.failed = 0
+        self.batches = 0
+
+    def wake(self):
+        """Process new events now instead of at the next poll"""
+        self._wake.set()
+
+    async def _claim(self, db) -> List[dict]:
+        """Lease up to a batch of queued events (or events whose lease expired)"""
+        now = datetime.utcnow()
+        claimable = {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": now}}
+        ]}
+        cursor = db[COLLECTION_NAME].find(claimable, {"_id": 1}).sort("received_at", 1)
+        ids = [doc["_id"] async for doc in cursor.limit(settings.PAYMENT_EVENT_BATCH_SIZE)]
+        if not ids:
+            return []
+
+        # The token identifies this claim; events another consumer took in
+        # between no longer match claimable and are skipped
+        token = ObjectId()
+        await db[COLLECTION_NAME].update_many(
+            {"_id": {"$in": ids}, **claimable},
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_token": token,
+                    "lease_until": now + timedelta(seconds=settings.PAYMENT_EVENT_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            }
+        )
+        return await db[COLLECTION_NAME].find({"lease_token": token}).to_list(length=None)
+
+    async def _existing_refs(self, db, refs: List[Tuple[str, object]]) -> set:
+        """Which of the given booking refs match a booking, in one query"""
+        if not refs:
+            return set()
+        found = set()
+        cursor = db.bookings.find(
+            {"$or": [ref_filter(ref) for ref in refs]},
+            {"_id": 1, "razorpay_order_id": 1, "razorpay_order_ids": 1}
+        )
+        async for booking in cursor:
+            found.add(("_id", booking["_id"]))
+            for order_id in booking.get("razorpay_order_ids") or []:
+                found.add(("order", order_id))
+            if booking.get("razorpay_order_id"):
+                found.add(("order", booking["razorpay_order_id"]))
+        return found
+
+    async def process_batch(self, db) -> int:
+        """
+        Claim and apply one batch of events.
+
+        Returns:
+            Number of events claimed
+        """
+        events = await self._claim(db)
+        if not events:
+            return 0
+
+        refs: Dict[str, Tuple[str, object]] = {}
+        ignored_ids = []
+        for event in events:
+            ref = booking_ref(event["body"])
+            if ref is None:
+                ignored_ids.append(event["_id"])
+            else:
+                refs[event["_id"]] = ref
+
+        existing = await self._existing_refs(db, list(set(refs.values())))
+        updates = []
+        applied_ids = []
+        unmatched_ids = []
+        for event in events:
+            if event["_id"] not in refs:
+                continue
+            if refs[event["_id"]] in existing:
+                updates.append(booking_update(event["body"]))
+                applied_ids.append(event["_id"])
+            else:
+                unmatched_ids.append(event["_id"])
+
+        events_collection = db[COLLECTION_NAME]
+        now = datetime.utcnow()
+        if updates:
+            try:
+                await db.bookings.bulk_write(updates, ordered=False)
+            except Exception as e:
+                print(f"❌ Applying {len(updates)} payment events failed: {e}")
+                retry_ids = [event["_id"] for event in events if event["_id"] in applied_ids
+                             and event["attempts"] < settings.PAYMENT_EVENT_MAX_ATTEMPTS]
+                await events_collection.update_many(
+                    {"_id": {"$in": retry_ids}},
+                    {"$set": {"status": "queued", "lease_until": None, "error": str(e), "updated_at": now}}
+                )
+                failed_ids = [event_id for event_id in applied_ids if event_id not in retry_ids]
+                await events_collection.update_many(
+                    {"_id": {"$in": failed_ids}},
+                    {"$set": {"status": "failed", "error": str(e), "updated_at": now}}
+                )
+                self.failed += len(failed_ids)
+                applied_ids = []
+
+        if applied_ids:
+            await events_collection.update_many(
+                {"_id": {"$in": applied_ids}},
+                {"$set": {"status": "processed", "error": None, "processed_at": now, "updated_at": now}}
+            )
+        if ignored_ids:
+            await events_collection.update_many(
+                {"_id": {"$in": ignored_ids}},
+                {"$set": {"status": "ignored", "processed_at": now, "updated_at": now}}
+            )
+        if unmatched_ids:
+            print(f"⚠️ {len(unmatched_ids)} payment events match no booking")
+            await events_collection.update_many(
+                {"_id": {"$in": unmatched_ids}},
+                {"$set": {"status": "unmatched", "processed_at": now, "updated_at": now}}
+            )
+        self.applied += len(applied_ids)
+        self.ignored += len(ignored_ids)
+        self.unmatched += len(unmatched_ids)
+        self.batches += 1
+        return len(events)
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.process_batch(get_database())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Payment event queue unavailable: {e}")
+                await asyncio.sleep(settings.PAYMENT_EVENT_POLL_SECONDS * 10)
+                continue
+
+            # A full batch means more may be waiting
+            if claimed >= settings.PAYMENT_EVENT_BATCH_SIZE:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.PAYMENT_EVENT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the consumer task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the consumer; leased events are reclaimed after their lease"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        """Return consumer counters"""
+        return {
+            "running": self._task is not None,
+            "applied": self.applied,
+            "ignored": self.ignored,
+            "unmatched": self.unmatched,
+            "failed": self.failed,
+            "batches": self.batches
+        }
+
+# Shared consumer
+payment_event_consumer = PaymentEventConsumer()
+register_metrics("payment_events", payment_event_consumer.stats)
+
+async def replay_events(db, since: Optional[datetime] = None, event_id: Optional[str] = None,
+                        status: Optional[str] = None) -> int:
+    """
+    Queue stored events for processing again.
+
+    Args:
+        db: Motor database
+        since: Only events received at or after this time
+        event_id: Only this event
+        status: Only events in this status (e.g. "failed")
+
+    Returns:
+        Number of events queued
+    """
+    match = {}
+    if since:
+        match["received_at"] = {"$gte": since}
+    if event_id:
+        match["_id"] = event_id
+    if status:
+        match["status"] = status
+    result = await db[COLLECTION_NAME].update_many(
+        match,
+        {"$set": {"status": "queued", "attempts": 0, "lease_until": None, "error": None,
+                  "updated_at": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+async def _main(since: Optional[datetime], event_id: Optional[str], status: Optional[str]):
+    from app.database import connect_to_mongo, close_mongo_connection
+
+    await connect_to_mongo(apply_indexes_in_background=False)
+    try:
+        db = get_database()
+        count = await replay_events(db, since, event_id, status)
+        print(f"✅ Queued {count} payment events")
+        # Apply them now rather than waiting for a running server's consumer
+        while await payment_event_consumer.process_batch(db):
+            pass
+        print(f"✅ Applied {payment_event_consumer.applied}, ignored {payment_event_consumer.ignored}, "
+              f"unmatched {payment_event_consumer.unmatched}, failed {payment_event_consumer.failed}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    def _arg(name: str) -> Optional[str]:
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else None
+
+    since = _arg("--since")
+    asyncio.run(_main(datetime.fromisoformat(since) if since else None, _arg("--event"), _arg("--status")))
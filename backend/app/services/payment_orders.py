@@ -0,0 +1,153 @@
+"""
+Idempotent Razorpay order creation for bookings.
+
+A booking keeps the order created for it (id, amount, currency, creation
+time and the client's idempotency key), so repeated "pay" clicks reuse one
+order instead of creating a new one each time:
+
+- a request carrying the key that created the current order gets that
+  order back, however old it is (safe client retries)
+- otherwise the current order is reused while it matches the booking
+  amount and is younger than RAZORPAY_ORDER_REUSE_SECONDS
+- otherwise the request claims the booking with an atomic update and
+  creates a new order; concurrent requests that lose the claim wait for
+  the winner's order rather than creating their own
+
+No order is handed out, new or reused, once the booking is older than
+BOOKING_PAYMENT_TIMEOUT_MINUTES: the unpaid booking sweeper is about to
+cancel it and release its slots.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.services.razorpay_service import create_razorpay_order
+
+# Longest a gateway call can take (every connect attempt plus the read);
+# a claim older than this belongs to a request that died mid-call
+ORDER_CLAIM_SECONDS = (
+    settings.RAZORPAY_CONNECT_TIMEOUT_SECONDS * (settings.RAZORPAY_CONNECT_RETRIES + 1)
+    + settings.RAZORPAY_READ_TIMEOUT_SECONDS + 5
+)
+
+CLAIM_POLL_SECONDS = 0.2
+
+def order_amount(booking: dict) -> int:
+    """Booking total in paise, as Razorpay stores it"""
+    return int(round(booking["total_amount"] * 100))
+
+def order_view(booking: dict) -> dict:
+    """Payment order details returned to the client"""
+    return {
+        "order_id": booking["razorpay_order_id"],
+        "amount": booking["razorpay_order_amount"],
+        "currency": booking["razorpay_order_currency"],
+        "booking_id": str(booking["_id"])
+    }
+
+def reusable_order(booking: dict, idempotency_key: Optional[str], now: datetime) -> bool:
+    """
+    Whether the booking's current order can be returned as is.
+
+    Bookings whose order predates order tracking (no creation time) always
+    get a new order.
+    """
+    if not booking.get("razorpay_order_id") or not booking.get("razorpay_order_created_at"):
+        return False
+    if idempotency_key and booking.get("order_idempotency_key") == idempotency_key:
+        return True
+    age = now - booking["razorpay_order_created_at"]
+    return (booking.get("razorpay_order_amount") == order_amount(booking)
+            and age < timedelta(seconds=settings.RAZORPAY_ORDER_REUSE_SECONDS))
+
+async def _wait_for_order(db, booking: dict, idempotency_key: Optional[str]) -> dict:
+    """
+    Wait for a concurrent request holding the claim to store its order.
+
+    Raises:
+        HTTPException: 409 if no order appears before the claim expires
+    """
+    deadline = datetime.utcnow() + timedelta(seconds=ORDER_CLAIM_SECONDS)
+    while datetime.utcnow() < deadline:
+        await asyncio.sleep(CLAIM_POLL_SECONDS)
+        current = await db.bookings.find_one({"_id": booking["_id"]})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if (current.get("razorpay_order_id") != booking.get("razorpay_order_id")
+                and reusable_order(current, idempotency_key, datetime.utcnow())):
+            return order_view(current)
+        if not current.get("order_claimed_at"):
+            break
+    raise HTTPException(status_code=409, detail="Payment order is being created, please retry")
+
+async def get_or_create_order(db, booking: dict, idempotency_key: Optional[str] = None) -> dict:
+    """
+    Return the booking's reusable payment order, creating one if needed.
+
+    Args:
+        db: Motor database
+        booking: Booking document
+        idempotency_key: Client-supplied key identifying this payment attempt
+
+    Returns:
+        Dict with order_id, amount (paise), currency and booking_id
+
+    Raises:
+        HTTPException: 409 if the booking is already paid, cancelled or past
+            its payment timeout, or another request is still creating its
+            order; 502/504 if the gateway call fails
+    """
+    if booking.get("payment_status") == "completed":
+        raise HTTPException(status_code=409, detail="Booking is already paid")
+    now = datetime.utcnow()
+    deadline = booking.get("created_at", now) + timedelta(minutes=settings.BOOKING_PAYMENT_TIMEOUT_MINUTES)
+    if booking.get("status") == "cancelled" or now >= deadline:
+        raise HTTPException(status_code=409, detail="Booking was cancelled or has expired, please book again")
+
+    if reusable_order(booking, idempotency_key, now):
+        return order_view(booking)
+
+    # Claim the booking unless another request holds a live claim or has
+    # already replaced the order we saw
+    claimed = await db.bookings.find_one_and_update(
+        {
+            "_id": booking["_id"],
+            "razorpay_order_id": booking.get("razorpay_order_id"),
+            "$or": [
+                {"order_claimed_at": None},
+                {"order_claimed_at": {"$lt": now - timedelta(seconds=ORDER_CLAIM_SECONDS)}}
+            ]
+        },
+        {"$set": {"order_claimed_at": now}}
+    )
+    if claimed is None:
+        return await _wait_for_order(db, booking, idempotency_key)
+
+    try:
+        order = await create_razorpay_order(
+            booking["total_amount"],
+            receipt=str(booking["_id"]),
+            notes={"booking_id": str(booking["_id"])}
+        )
+    except Exception:
+        await db.bookings.update_one(
+            {"_id": booking["_id"], "order_claimed_at": now},
+            {"$unset": {"order_claimed_at": ""}}
+        )
+        raise
+
+    fields = {
+        "razorpay_order_id": order["id"],
+        "razorpay_order_amount": order["amount"],
+        "razorpay_order_currency": order["currency"],
+        "razorpay_order_created_at": datetime.utcnow(),
+        "order_idempotency_key": idempotency_key
+    }
+    # Every order stays on record, so a late payment on a replaced one still
+    # finds its booking
+    await db.bookings.update_one(
+        {"_id": booking["_id"]},
+        {"$set": fields, "$unset": {"order_claimed_at": ""}, "$addToSet": {"razorpay_order_ids": order["id"]}}
+    )
+    return order_view({**booking, **fields})
@@ -1,36 +1,106 @@
 """
 Razorpay payment service
+
+The Razorpay SDK is synchronous, so every gateway call runs on a dedicated
+thread pool instead of the event loop. Calls share one pooled HTTP session
+with connect/read timeouts; only failed connects are retried, since a
+request that reached Razorpay may already have created an order.
 """
-import razorpay
+import asyncio
 import hmac
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+import razorpay
+import requests
+from fastapi import HTTPException
+from razorpay.errors import BadRequestError, GatewayError, ServerError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.config import settings
 
+GATEWAY_TIMEOUT = (settings.RAZORPAY_CONNECT_TIMEOUT_SECONDS, settings.RAZORPAY_READ_TIMEOUT_SECONDS)
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_maxsize=settings.RAZORPAY_POOL_SIZE,
+    max_retries=Retry(total=settings.RAZORPAY_CONNECT_RETRIES, connect=settings.RAZORPAY_CONNECT_RETRIES,
+                      read=0, status=0, backoff_factor=0.2)
+))
+_session.mount("http://", _session.get_adapter("https://"))
+
 # Initialize Razorpay client
-razorpay_client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+razorpay_client = razorpay.Client(
+    session=_session,
+    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+    base_url=settings.RAZORPAY_BASE_URL
+)
+
+_gateway_executor = ThreadPoolExecutor(
+    max_workers=settings.RAZORPAY_POOL_SIZE,
+    thread_name_prefix="razorpay"
+)
 
-def create_razorpay_order(amount: float, currency: str = "INR"):
+async def _call_gateway(func, *args, **kwargs):
+    """
+    Run a blocking SDK call on the gateway pool.
+
+    Raises:
+        HTTPException: 504 on timeout, 502 if Razorpay is unreachable or
+            rejects the request
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _gateway_executor, partial(func, *args, timeout=GATEWAY_TIMEOUT, **kwargs)
+        )
+    except requests.Timeout:
+        print("⚠️ Razorpay request timed out")
+        raise HTTPException(status_code=504, detail="Payment gateway timed out")
+    except (requests.RequestException, BadRequestError, GatewayError, ServerError) as e:
+        print(f"❌ Razorpay request failed: {e}")
+        raise HTTPException(status_code=502, detail="Payment gateway error")
+
+async def create_razorpay_order(amount: float, currency: str = "INR", receipt: Optional[str] = None,
+                                notes: Optional[dict] = None):
     """
     Create a Razorpay order for payment.
     
     Args:
         amount: Amount in rupees
         currency: Currency code (default: INR)
+        receipt: Merchant reference shown in the Razorpay dashboard
+        notes: Key-value metadata stored on the order
         
     Returns:
         Razorpay order details
+        
+    Raises:
+        HTTPException: 502/504 if the gateway call fails
     """
     # Convert amount to paise (smallest currency unit)
-    amount_in_paise = int(amount * 100)
+    amount_in_paise = int(round(amount * 100))
     
     order_data = {
         "amount": amount_in_paise,
         "currency": currency,
         "payment_capture": 1  # Auto capture payment
     }
+    if receipt:
+        order_data["receipt"] = receipt
+    if notes:
+        order_data["notes"] = notes
     
-    order = razorpay_client.order.create(data=order_data)
-    return order
+    return await _call_gateway(razorpay_client.order.create, data=order_data)
+
+def _signature_matches(secret: str, message: bytes, signature: str) -> bool:
+    """Constant-time check of a hex HMAC-SHA256 signature"""
+    try:
+        generated_signature = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(generated_signature, signature)
+    except Exception:
+        return False
 
 def verify_payment_signature(order_id: str, payment_id: str, signature: str) -> bool:
     """
@@ -44,20 +114,26 @@ def verify_payment_signature(order_id: str, payment_id: str, signature: str) ->
     Returns:
         True if signature is valid, False otherwise
     """
-    try:
-        # Generate signature
-        message = f"{order_id}|{payment_id}"
-        generated_signature = hmac.new(
-            settings.RAZORPAY_KEY_SECRET.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
+    message = f"{order_id}|{payment_id}"
+    return _signature_matches(settings.RAZORPAY_KEY_SECRET, message.encode(), signature)
+
+def verify_webhook_signature(body: bytes, signature: str) -> bool:
+    """
+    Verify a Razorpay webhook signature (X-Razorpay-Signature header).
+    
+    Args:
+        body: Raw request body, exactly as received
+        signature: Signature header value
         
-        return hmac.compare_digest(generated_signature, signature)
-    except Exception:
+    Returns:
+        True if signature is valid, False otherwise (always False when no
+        webhook secret is configured)
+    """
+    if not settings.RAZORPAY_WEBHOOK_SECRET or not signature:
         return False
+    return _signature_matches(settings.RAZORPAY_WEBHOOK_SECRET, body, signature)
 
-def get_payment_details(payment_id: str):
+async def get_payment_details(payment_id: str):
     """
     Get payment details from Razorpay.
     
@@ -67,4 +143,4 @@ def get_payment_details(payment_id: str):
     Returns:
         Payment details
     """
-    return razorpay_client.payment.fetch(payment_id)
+    return await _call_gateway(razorpay_client.payment.fetch, payment_id)
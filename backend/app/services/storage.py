@@ -0,0 +1,276 @@
+"""
+Storage backends for uploaded images.
+
+Files are content-addressed: the key is the SHA-256 of the bytes, sharded
+into two levels of hash-prefix directories (ab/cd/abcd...jpg), so identical
+uploads are stored once and no directory grows unbounded. All blocking I/O
+runs on a dedicated thread pool, never on the event loop.
+
+Drivers:
+    local - files under settings.UPLOAD_DIR
+    s3    - any S3-compatible object store (AWS, MinIO, a local moto server),
+            selected with STORAGE_BACKEND=s3; requires boto3
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+from app.config import settings
+
+# URL prefix under which stored images are served; image_path values stored
+# on food logs are "<prefix>/<key>"
+UPLOAD_URL_PREFIX = "uploads"
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_io_executor = ThreadPoolExecutor(
+    max_workers=settings.STORAGE_IO_THREADS,
+    thread_name_prefix="storage"
+)
+
+async def _run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+def content_key(data: bytes, extension: str) -> str:
+    """
+    Build the sharded, content-addressed key for a file.
+
+    Args:
+        data: File content
+        extension: File extension including the dot
+
+    Returns:
+        Key such as "ab/cd/abcd...ef.jpg"
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+def image_path_for_key(key: str) -> str:
+    """Public image_path stored on documents for a storage key"""
+    return f"{UPLOAD_URL_PREFIX}/{key}"
+
+def key_from_image_path(image_path: str) -> str:
+    """Storage key for an image_path stored on a document"""
+    path = image_path.replace("\\", "/").lstrip("/")
+    prefix = f"{UPLOAD_URL_PREFIX}/"
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+class StorageBackend(ABC):
+    """Interface implemented by storage drivers"""
+
+    @abstractmethod
+    async def save(self, data: bytes, extension: str) -> str:
+        """
+        Store content, skipping the write if identical content exists.
+
+        Args:
+            data: File content
+            extension: File extension including the dot
+
+        Returns:
+            Storage key
+        """
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size of a stored file in bytes, or None if it does not exist"""
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """Read a whole stored file"""
+
+    @abstractmethod
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Stream a byte range of a stored file.
+
+        Args:
+            key: Storage key
+            start: First byte offset
+            end: Last byte offset (inclusive), or None for end of file
+
+        Returns:
+            Async iterator of chunks
+        """
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove a stored file if present"""
+
+class LocalStorage(StorageBackend):
+    """Local filesystem driver"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError("Invalid storage key")
+        return path
+
+    def _write(self, path: str, data: bytes):
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def save(self, data: bytes, extension: str) -> str:
+        key = content_key(data, extension)
+        await _run_io(self._write, self._path(key), data)
+        return key
+
+    def _size(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return None
+
+    async def size(self, key: str) -> Optional[int]:
+        return await _run_io(self._size, self._path(key))
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def read(self, key: str) -> bytes:
+        return await _run_io(self._read, self._path(key))
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(key)
+        f = await _run_io(open, path, "rb")
+        try:
+            await _run_io(f.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+                chunk = await _run_io(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await _run_io(f.close)
+
+    def _delete(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def delete(self, key: str):
+        await _run_io(self._delete, self._path(key))
+
+class S3Storage(StorageBackend):
+    """S3-compatible object store driver"""
+
+    def __init__(self):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = settings.S3_BUCKET
+        self.prefix = settings.S3_PREFIX.strip("/")
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=Config(max_pool_connections=settings.STORAGE_IO_THREADS)
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def size(self, key: str) -> Optional[int]:
+        return await _run_io(self._size, key)
+
+    def _put(self, key: str, data: bytes, content_type: str):
+        if self._size(key) is not None:
+            return
+        self._client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=data,
+            ContentType=content_type
+        )
+
+    async def save(self, data: bytes, extension: str) -> str:
+        import mimetypes
+        key = content_key(data, extension)
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        await _run_io(self._put, key, data, content_type)
+        return key
+
+    def _get(self, key: str, byte_range: Optional[str] = None):
+        options = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if byte_range:
+            options["Range"] = byte_range
+        return self._client.get_object(**options)["Body"]
+
+    async def read(self, key: str) -> bytes:
+        body = await _run_io(self._get, key)
+        try:
+            return await _run_io(body.read)
+        finally:
+            body.close()
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        body = await _run_io(self._get, key, byte_range)
+        try:
+            while True:
+                chunk = await _run_io(body.read, STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str):
+        await _run_io(lambda: self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key)))
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    """
+    Get the configured storage backend.
+
+    Returns:
+        Shared StorageBackend instance
+    """
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        else:
+            _storage = LocalStorage(settings.UPLOAD_DIR)
+    return _storage
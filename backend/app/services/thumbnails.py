@@ -0,0 +1,217 @@
+"""
+Thumbnail variants of uploaded images.
+
+Variants are generated on demand in a worker thread and cached on local
+disk under settings.THUMBNAIL_CACHE_DIR. The cache is kept under a byte
+budget by evicting the least recently served variants. Requested widths
+snap to a small configured set so the number of variants per image stays
+bounded.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageOps
+from app.config import settings
+from app.services.image_preprocess import OUTPUT_FORMATS, encode_image
+from app.services.storage import get_storage
+from app.utils.metrics import register_metrics
+
+# Accepted ?format= values -> PIL format name
+VARIANT_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG"}
+
+def snap_width(width: int) -> int:
+    """
+    Snap a requested width to the smallest configured width that covers it.
+
+    Args:
+        width: Requested width in pixels
+
+    Returns:
+        One of settings.THUMBNAIL_WIDTHS
+    """
+    widths = sorted(settings.THUMBNAIL_WIDTHS)
+    for candidate in widths:
+        if candidate >= width:
+            return candidate
+    return widths[-1]
+
+def variant_etag(key: str, source_size: int, width: int, image_format: str) -> str:
+    """Strong ETag for a variant, derived from the source identity"""
+    digest = hashlib.sha256(f"{key}:{source_size}:{width}:{image_format}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def render_variant(source, width: int, image_format: str) -> bytes:
+    """
+    Resize an image to a width and encode it.
+
+    CPU-bound; call from a worker thread.
+
+    Args:
+        source: Encoded image bytes or an already decoded PIL image
+        width: Target width in pixels (never upscaled)
+        image_format: "WEBP" or "JPEG"
+
+    Returns:
+        Encoded variant bytes
+    """
+    if isinstance(source, Image.Image):
+        image = source.copy()
+    else:
+        image = Image.open(io.BytesIO(source))
+        image.draft("RGB", (width, width * 4))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+
+    data, _, _, _ = encode_image(image, max_bytes=settings.IMAGE_MAX_BYTES, image_format=image_format)
+    return data
+
+class ThumbnailCache:
+    """Disk cache of image variants with an LRU byte budget"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size
+        self._total_bytes = 0
+        self._loaded = False
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        """Rebuild the LRU index from disk, oldest access first"""
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_atime, path, stat.st_size))
+        found.sort()
+        return found
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for _, path, size in await asyncio.to_thread(self._scan):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _path(self, etag: str, image_format: str) -> str:
+        name = etag.strip('"')
+        extension = OUTPUT_FORMATS[image_format][1]
+        return os.path.join(self.root, name[:2], f"{name}{extension}")
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def _store(self, path: str, data: bytes):
+        await asyncio.to_thread(self._write, path, data)
+        previous = self._entries.pop(path, 0)
+        self._entries[path] = len(data)
+        self._total_bytes += len(data) - previous
+
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            await asyncio.to_thread(self._remove, oldest)
+
+    async def _generate(self, key: str, path: str, width: int, image_format: str,
+                        image: Optional[Image.Image] = None):
+        source = image if image is not None else await get_storage().read(key)
+        data = await asyncio.to_thread(render_variant, source, width, image_format)
+        await self._store(path, data)
+
+    async def get_variant(self, key: str, source_size: int, width: int,
+                          image_format: str) -> Tuple[str, str]:
+        """
+        Get the cached variant file, generating it if needed.
+
+        Args:
+            key: Storage key of the original image
+            source_size: Size of the original, part of the variant identity
+            width: Snapped target width
+            image_format: "WEBP" or "JPEG"
+
+        Returns:
+            Tuple of (file path, ETag)
+        """
+        await self._ensure_loaded()
+        etag = variant_etag(key, source_size, width, image_format)
+        path = self._path(etag, image_format)
+
+        if path in self._entries and os.path.exists(path):
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return path, etag
+
+        self.misses += 1
+        task = self._in_flight.get(path)
+        if task is None:
+            task = asyncio.create_task(self._generate(key, path, width, image_format))
+            self._in_flight[path] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(path, None))
+        await asyncio.shield(task)
+        return path, etag
+
+    async def pregenerate(self, key: str, source_size: int, image: Image.Image):
+        """
+        Generate the configured pregenerated widths from an already decoded image.
+
+        Args:
+            key: Storage key of the original image
+            source_size: Size of the stored original in bytes
+            image: Decoded image, reused so the original is not read back
+        """
+        await self._ensure_loaded()
+        image_format = VARIANT_FORMATS.get(settings.THUMBNAIL_FORMAT.lower(), "WEBP")
+        for width in settings.THUMBNAIL_PREGENERATE_WIDTHS:
+            width = snap_width(width)
+            etag = variant_etag(key, source_size, width, image_format)
+            path = self._path(etag, image_format)
+            if path in self._entries:
+                continue
+            try:
+                await self._generate(key, path, width, image_format, image)
+            except Exception as e:
+                print(f"⚠️ Thumbnail pregeneration failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        """Return cache size and hit counters"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+# Shared variant cache
+thumbnail_cache = ThumbnailCache(settings.THUMBNAIL_CACHE_DIR, settings.THUMBNAIL_CACHE_MAX_BYTES)
+register_metrics("thumbnails", thumbnail_cache.stats)
@@ -0,0 +1,170 @@
+"""
+Trainer marketplace search.
+
+One aggregation filters trainers (optionally by full-text search over
+name, bio and certifications), then a $facet returns the requested page
+together with counts per specialization, price band, experience band and
+availability day. Pages are keyset-paginated on (rating, _id), or on
+(text score, _id) when searching.
+
+Results of anonymous listing queries are cached in memory for a short TTL
+and cleared when a trainer registers.
+"""
+from typing import List, Optional
+from app.config import settings
+from app.utils.metrics import register_metrics
+from app.utils.pagination import decode_cursor_values, decode_object_id, encode_cursor_values
+from app.utils.ttl_cache import TTLCache
+
+# Hourly rate band boundaries (lower bound inclusive); the last band is open-ended
+PRICE_BANDS = [0, 500, 1000, 2000, 5000]
+# Years of experience band boundaries
+EXPERIENCE_BANDS = [0, 2, 5, 10]
+
+trainer_listing_cache = TTLCache(
+    max_size=settings.TRAINER_CACHE_SIZE,
+    ttl_seconds=settings.TRAINER_CACHE_TTL_SECONDS
+)
+register_metrics("trainer_listing_cache", trainer_listing_cache.stats)
+
+def invalidate_trainer_listings():
+    """Drop cached listings after the trainer set changes"""
+    trainer_listing_cache.clear()
+
+def _bucket(field: str, boundaries: List[int]) -> dict:
+    return {"$bucket": {
+        "groupBy": f"${field}",
+        "boundaries": boundaries + [float("inf")],
+        "default": "other",
+        "output": {"count": {"$sum": 1}}
+    }}
+
+def _band_counts(buckets: List[dict], boundaries: List[int], unit: str) -> List[dict]:
+    """Label $bucket output as "lo-hi" / "lo+" bands"""
+    counts = []
+    for bucket in buckets:
+        low = bucket["_id"]
+        if low == "other":
+            continue
+        index = boundaries.index(low)
+        if index + 1 < len(boundaries):
+            label = f"{low}-{boundaries[index + 1]}{unit}"
+        else:
+            label = f"{low}+{unit}"
+        counts.append({"value": label, "count": bucket["count"]})
+    return counts
+
+def build_search_pipeline(q: Optional[str], filters: dict, cursor: Optional[str], limit: int) -> List[dict]:
+    """
+    Build the search aggregation.
+
+    Args:
+        q: Full-text query, or None to list by rating
+        filters: Additional match conditions
+        cursor: Cursor from the previous page
+        limit: Page size
+
+    Returns:
+        Pipeline producing one document with results, facet lists and total
+    """
+    sort_field = "score" if q else "rating"
+    match = dict(filters)
+    pipeline = []
+    if q:
+        # $text must be in the first stage
+        match["$text"] = {"$search": q}
+        pipeline.append({"$match": match})
+        pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+    else:
+        pipeline.append({"$match": match})
+
+    page = []
+    if cursor:
+        value, object_id = decode_cursor_values(cursor, 2)
+        object_id = decode_object_id(object_id)
+        page.append({"$match": {"$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": object_id}}
+        ]}})
+    page += [
+        {"$sort": {sort_field: -1, "_id": -1}},
+        {"$limit": limit + 1}
+    ]
+
+    pipeline.append({"$facet": {
+        "results": page,
+        "specialization": [{"$sortByCount": "$specialization"}],
+        "price": [_bucket("hourly_rate", PRICE_BANDS)],
+        "experience": [_bucket("experience_years", EXPERIENCE_BANDS)],
+        "availability": [{"$unwind": "$availability"}, {"$sortByCount": "$availability"}],
+        "total": [{"$count": "count"}]
+    }})
+    return pipeline
+
+async def search_trainers(db, q: Optional[str] = None, specialization: Optional[str] = None,
+                          min_price: Optional[float] = None, max_price: Optional[float] = None,
+                          min_experience: Optional[int] = None, day: Optional[str] = None,
+                          min_rating: Optional[float] = None, cursor: Optional[str] = None,
+                          limit: int = 20) -> dict:
+    """
+    Search trainers with facet counts, served from the listing cache when possible.
+
+    Args:
+        db: Motor database
+        q: Full-text query over name, bio and certifications
+        specialization: Exact specialization
+        min_price: Minimum hourly rate
+        max_price: Maximum hourly rate
+        min_experience: Minimum years of experience
+        day: Day the trainer must be available
+        min_rating: Minimum rating
+        cursor: Cursor from the previous page
+        limit: Page size
+
+    Returns:
+        Dict with results (raw documents), facets, total and next_cursor
+    """
+    cache_key = (q, specialization, min_price, max_price, min_experience, day, min_rating, cursor, limit)
+    cached = trainer_listing_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    filters = {}
+    if specialization:
+        filters["specialization"] = specialization
+    if min_price is not None or max_price is not None:
+        filters["hourly_rate"] = {}
+        if min_price is not None:
+            filters["hourly_rate"]["$gte"] = min_price
+        if max_price is not None:
+            filters["hourly_rate"]["$lte"] = max_price
+    if min_experience is not None:
+        filters["experience_years"] = {"$gte": min_experience}
+    if day:
+        filters["availability"] = day
+    if min_rating is not None:
+        filters["rating"] = {"$gte": min_rating}
+
+    pipeline = build_search_pipeline(q, filters, cursor, limit)
+    facets = (await db.trainers.aggregate(pipeline).to_list(length=1))[0]
+
+    results = facets["results"]
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = encode_cursor_values([last["score"] if q else last["rating"], str(last["_id"])])
+
+    search = {
+        "results": results,
+        "facets": {
+            "specialization": [{"value": f["_id"], "count": f["count"]} for f in facets["specialization"]],
+            "price": _band_counts(facets["price"], PRICE_BANDS, ""),
+            "experience": _band_counts(facets["experience"], EXPERIENCE_BANDS, " years"),
+            "availability": [{"value": f["_id"], "count": f["count"]} for f in facets["availability"]]
+        },
+        "total": facets["total"][0]["count"] if facets["total"] else 0,
+        "next_cursor": next_cursor
+    }
+    trainer_listing_cache.set(cache_key, search)
+    return search
@@ -0,0 +1,358 @@
+"""
+Slot-based trainer availability and conflict-free booking.
+
+Time is divided into fixed slots of TRAINER_SLOT_MINUTES. A booking claims
+every slot it covers by inserting one trainer_slots document per slot; the
+unique (trainer_id, slot_start) index makes the claim atomic, so two
+concurrent bookings of an overlapping slot can never both succeed, without
+any read-then-write check. The same index serves open-slot range queries.
+
+Slots, working days and TRAINER_DAY_START_HOUR..TRAINER_DAY_END_HOUR are
+laid out in TRAINER_TIMEZONE wall-clock time, so they line up with the
+hours clients see; slot start times are stored and returned in UTC.
+
+Slots stay claimed until the booking is cancelled: by the user before
+paying, or by the sweeper once it has gone unpaid (including failed
+payments) for BOOKING_PAYMENT_TIMEOUT_MINUTES. Failed payments are not
+released at once because checkout lets the user retry on the same order.
+
+Bookings made before slots existed hold none, so the index can't see
+them. Claim their slots once, before taking bookings on the index:
+    python -m app.services.trainer_slots --backfill
+"""
+import asyncio
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.config import settings
+from app.database import get_database
+from app.utils.metrics import register_metrics
+
+COLLECTION_NAME = "trainer_slots"
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+TRAINER_TZ = ZoneInfo(settings.TRAINER_TIMEZONE)
+
+def to_utc(moment: datetime) -> datetime:
+    """Convert to naive UTC, the form MongoDB stores"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def to_local(moment: datetime) -> datetime:
+    """Convert naive UTC to an aware TRAINER_TIMEZONE time"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(TRAINER_TZ)
+
+def local_midnight(day: date) -> datetime:
+    """Start of a TRAINER_TIMEZONE calendar day, as naive UTC"""
+    return to_utc(datetime.combine(day, datetime.min.time(), tzinfo=TRAINER_TZ))
+
+def is_available_day(trainer: dict, moment: datetime) -> bool:
+    """
+    Whether a trainer works on a moment's weekday.
+
+    availability holds day names ("Monday" or "Mon", any case); an empty
+    list means every day.
+    """
+    days = {day.strip().lower()[:3] for day in trainer.get("availability") or []}
+    return not days or DAY_NAMES[moment.weekday()][:3].lower() in days
+
+def session_slots(session_start: datetime, duration_hours: float) -> List[datetime]:
+    """
+    List the slots a session covers.
+
+    Args:
+        session_start: Session start (naive UTC)
+        duration_hours: Session length
+
+    Returns:
+        Slot start times
+
+    Raises:
+        HTTPException: 400 if the start is not on a local slot boundary or
+            the duration is not a positive whole number of slots
+    """
+    slot = timedelta(minutes=settings.TRAINER_SLOT_MINUTES)
+    local = to_local(session_start)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if (local - midnight) % slot:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sessions must start on a {settings.TRAINER_SLOT_MINUTES}-minute boundary"
+        )
+
+    # Bookings are charged per slot held, so partial slots are not allowed
+    count = duration_hours * 60 / settings.TRAINER_SLOT_MINUTES
+    if count <= 0 or count != int(count):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Duration must be a multiple of {settings.TRAINER_SLOT_MINUTES} minutes"
+        )
+    return [session_start + slot * i for i in range(int(count))]
+
+def check_bookable(trainer: dict, slots: List[datetime]):
+    """
+    Reject slots outside the trainer's working days and hours (local time).
+
+    Raises:
+        HTTPException: 400 if any slot falls outside them
+    """
+    slot = timedelta(minutes=settings.TRAINER_SLOT_MINUTES)
+    for start in slots:
+        local = to_local(start)
+        day_start = local.replace(hour=settings.TRAINER_DAY_START_HOUR, minute=0, second=0, microsecond=0)
+        day_end = local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=settings.TRAINER_DAY_END_HOUR)
+        if not is_available_day(trainer, local) or local < day_start or local + slot > day_end:
+            raise HTTPException(status_code=400, detail="Trainer is not available at that time")
+
+async def claim_slots(db, trainer_id: str, slots: List[datetime], booking_id: ObjectId, user_id: str):
+    """
+    Atomically claim slots for a booking.
+
+    Args:
+        db: Motor database
+        trainer_id: Trainer ID as a string
+        slots: Slot start times from session_slots()
+        booking_id: ID the booking will be inserted with
+        user_id: Booking user
+
+    Raises:
+        HTTPException: 409 if any slot is already taken (nothing stays claimed)
+    """
+    now = datetime.utcnow()
+    docs = [
+        {"trainer_id": trainer_id, "slot_start": start, "booking_id": booking_id,
+         "user_id": user_id, "created_at": now}
+        for start in slots
+    ]
+    try:
+        await db[COLLECTION_NAME].insert_many(docs, ordered=True)
+    except (BulkWriteError, DuplicateKeyError):
+        # Ordered insert stops at the first taken slot; release the ones before it
+        await release_slots(db, booking_id)
+        raise HTTPException(status_code=409, detail="That time slot is already booked")
+
+async def release_slots(db, booking_id: ObjectId):
+    """Free every slot held by a booking"""
+    await db[COLLECTION_NAME].delete_many({"booking_id": booking_id})
+
+async def cancel_unpaid_booking(db, booking_id: ObjectId, match: Optional[dict] = None) -> bool:
+    """
+    Cancel a booking that has not been paid and free its slots.
+
+    Args:
+        db: Motor database
+        booking_id: Booking to cancel
+        match: Extra conditions the booking must meet (e.g. its owner)
+
+    Returns:
+        False if no unpaid, uncancelled booking matched
+    """
+    now = datetime.utcnow()
+    result = await db.bookings.update_one(
+        {"_id": booking_id, "status": "pending", "payment_status": {"$ne": "completed"}, **(match or {})},
+        {"$set": {"status": "cancelled", "cancelled_at": now}}
+    )
+    if result.matched_count == 0:
+        return False
+    await release_slots(db, booking_id)
+    return True
+
+def covering_slots(session_start: datetime, duration_hours: float) -> List[datetime]:
+    """
+    List the slots a session overlaps, for sessions that may predate the
+    slot grid (any start time or duration).
+
+    Returns:
+        The same slots as session_slots() for on-grid sessions
+    """
+    try:
+        return session_slots(session_start, duration_hours)
+    except HTTPException:
+        pass
+    slot = timedelta(minutes=settings.TRAINER_SLOT_MINUTES)
+    local = to_local(session_start)
+    moment = session_start - (local - local.replace(hour=0, minute=0, second=0, microsecond=0)) % slot
+    end = session_start + timedelta(hours=max(duration_hours, 0))
+    slots = [moment]
+    while moment + slot < end:
+        moment += slot
+        slots.append(moment)
+    return slots
+
+async def backfill_slots(db) -> dict:
+    """
+    Claim slots for upcoming bookings that hold none.
+
+    Safe to run repeatedly: slots a booking already holds are skipped.
+    Slots already held by another booking are reported, not taken; those
+    bookings overlapped before slots existed and need resolving by hand.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Dict with bookings checked, slots claimed and the conflicts found
+    """
+    now = datetime.utcnow()
+    # Sessions last hours, so a day back covers every one still running
+    cursor = db.bookings.find(
+        {"status": {"$ne": "cancelled"}, "session_date": {"$gte": now - timedelta(days=1)}},
+        {"trainer_id": 1, "user_id": 1, "session_date": 1, "duration_hours": 1}
+    )
+    checked = 0
+    claimed = 0
+    conflicts = []
+    async for booking in cursor:
+        duration = booking.get("duration_hours") or 0
+        if booking["session_date"] + timedelta(hours=duration) <= now:
+            continue
+        checked += 1
+        slots = covering_slots(booking["session_date"], duration)
+        cursor_held = db[COLLECTION_NAME].find(
+            {"trainer_id": booking["trainer_id"], "slot_start": {"$in": slots}},
+            {"slot_start": 1, "booking_id": 1}
+        )
+        held = {doc["slot_start"]: doc["booking_id"] async for doc in cursor_held}
+        docs = [
+            {"trainer_id": booking["trainer_id"], "slot_start": start, "booking_id": booking["_id"],
+             "user_id": booking["user_id"], "created_at": now}
+            for start in slots if start not in held
+        ]
+        if docs:
+            try:
+                result = await db[COLLECTION_NAME].insert_many(docs, ordered=False)
+                claimed += len(result.inserted_ids)
+            except BulkWriteError as e:
+                # Taken meanwhile by a new booking; a rerun reports the overlap
+                claimed += e.details.get("nInserted", 0)
+        for start, holder in held.items():
+            if holder != booking["_id"]:
+                conflicts.append({"booking_id": str(booking["_id"]), "slot_start": start,
+                                  "held_by": str(holder)})
+    return {"checked": checked, "claimed": claimed, "conflicts": conflicts}
+
+async def open_slots(db, trainer: dict, start: datetime, end: datetime) -> List[datetime]:
+    """
+    List a trainer's free slots in [start, end).
+
+    Args:
+        db: Motor database
+        trainer: Trainer document
+        start: Range start (naive UTC)
+        end: Range end (naive UTC)
+
+    Returns:
+        Start times of free slots within working days and hours
+    """
+    cursor = db[COLLECTION_NAME].find(
+        {"trainer_id": str(trainer["_id"]), "slot_start": {"$gte": start, "$lt": end}},
+        {"slot_start": 1, "_id": 0}
+    )
+    taken = {doc["slot_start"] async for doc in cursor}
+
+    # Walk each local day's working hours in wall-clock time
+    slot = timedelta(minutes=settings.TRAINER_SLOT_MINUTES)
+    free = []
+    day = to_local(start).date()
+    while local_midnight(day) < end:
+        if is_available_day(trainer, day):
+            midnight = datetime.combine(day, datetime.min.time(), tzinfo=TRAINER_TZ)
+            moment = midnight + timedelta(hours=settings.TRAINER_DAY_START_HOUR)
+            day_end = midnight + timedelta(hours=settings.TRAINER_DAY_END_HOUR)
+            while moment + slot <= day_end:
+                slot_start = to_utc(moment)
+                if start <= slot_start < end and slot_start not in taken:
+                    free.append(slot_start)
+                moment += slot
+        day += timedelta(days=1)
+    return free
+
+class UnpaidBookingSweeper:
+    """Background task cancelling bookings left unpaid past the payment timeout"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.cancelled = 0
+        self.sweeps = 0
+
+    async def sweep(self, db) -> int:
+        """
+        Cancel every overdue unpaid booking.
+
+        Returns:
+            Number of bookings cancelled
+        """
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.BOOKING_PAYMENT_TIMEOUT_MINUTES)
+        cursor = db.bookings.find(
+            {"status": "pending", "payment_status": {"$ne": "completed"}, "created_at": {"$lt": cutoff}},
+            {"_id": 1}
+        )
+        count = 0
+        async for booking in cursor:
+            # Conditional per booking, so one paid meanwhile is left alone
+            if await cancel_unpaid_booking(db, booking["_id"]):
+                count += 1
+        self.cancelled += count
+        self.sweeps += 1
+        return count
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep(get_database())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Unpaid booking sweep failed: {e}")
+            await asyncio.sleep(settings.BOOKING_SWEEP_SECONDS)
+
+    def start(self):
+        """Start the sweeper task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the sweeper task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        """Return sweeper counters"""
+        return {"running": self._task is not None, "cancelled": self.cancelled, "sweeps": self.sweeps}
+
+# Shared sweeper
+unpaid_booking_sweeper = UnpaidBookingSweeper()
+register_metrics("unpaid_bookings", unpaid_booking_sweeper.stats)
+
+async def _main():
+    from app.database import connect_to_mongo, close_mongo_connection
+    from app.indexes import ensure_indexes
+
+    await connect_to_mongo(apply_indexes_in_background=False)
+    try:
+        # Claims are only conflict-free once the unique slot index exists
+        failures = await ensure_indexes(get_database())
+        if any(failure.startswith(COLLECTION_NAME) for failure in failures):
+            sys.exit(f"❌ Slot index could not be created: {failures}")
+        result = await backfill_slots(get_database())
+        for conflict in result["conflicts"]:
+            print(f"⚠️ Booking {conflict['booking_id']} overlaps booking {conflict['held_by']} "
+                  f"at {conflict['slot_start'].isoformat()}Z")
+        print(f"✅ Checked {result['checked']} upcoming bookings, claimed {result['claimed']} slots, "
+              f"{len(result['conflicts'])} conflicts")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    if "--backfill" not in sys.argv:
+        sys.exit("Usage: python -m app.services.trainer_slots --backfill")
+    asyncio.run(_main())
@@ -0,0 +1,93 @@
+"""
+Bucket daily rollups into day/week/month trend series.
+"""
+from datetime import date, timedelta
+from typing import List
+
+GRANULARITIES = ("day", "week", "month")
+
+def bucket_start(day: date, granularity: str) -> date:
+    """
+    First day of the bucket containing a day.
+
+    Args:
+        day: Any day
+        granularity: "day", "week" (ISO weeks, starting Monday) or "month"
+
+    Returns:
+        The bucket's first day
+    """
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def _empty_bucket(start: date, end: date) -> dict:
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "consumed": 0,
+        "burned": 0,
+        "protein": 0,
+        "carbs": 0,
+        "fats": 0,
+        "food_log_count": 0,
+        "activity_log_count": 0,
+        "days_logged": 0,
+        "days_with_intake_goal": 0,
+        "days_within_intake_goal": 0,
+        "days_with_burn_goal": 0,
+        "days_met_burn_goal": 0
+    }
+
+def build_trend(rollups: List[dict], start: date, end: date, granularity: str) -> List[dict]:
+    """
+    Sum daily rollups into consecutive buckets covering [start, end].
+
+    Every bucket in the range is returned, including empty ones, so charts
+    get a continuous series. Edge buckets are clipped to the range.
+
+    Args:
+        rollups: Rollup documents from get_rollup_range()
+        start: First day of the range
+        end: Last day of the range
+        granularity: "day", "week" or "month"
+
+    Returns:
+        One dict per bucket, in date order
+    """
+    buckets = {}
+    day = start
+    while day <= end:
+        key = bucket_start(day, granularity)
+        if key not in buckets:
+            buckets[key] = _empty_bucket(max(key, start), day)
+        buckets[key]["end_date"] = day.isoformat()
+        day += timedelta(days=1)
+
+    for rollup in rollups:
+        bucket = buckets.get(bucket_start(date.fromisoformat(rollup["date"]), granularity))
+        if bucket is None:
+            continue
+
+        consumed = rollup.get("consumed") or 0
+        burned = rollup.get("burned") or 0
+        for field in ("consumed", "burned", "protein", "carbs", "fats",
+                      "food_log_count", "activity_log_count"):
+            bucket[field] += rollup.get(field) or 0
+        if rollup.get("food_log_count") or rollup.get("activity_log_count"):
+            bucket["days_logged"] += 1
+
+        intake_goal = rollup.get("intake_goal")
+        if intake_goal:
+            bucket["days_with_intake_goal"] += 1
+            if consumed <= intake_goal:
+                bucket["days_within_intake_goal"] += 1
+        burn_goal = rollup.get("burn_goal")
+        if burn_goal:
+            bucket["days_with_burn_goal"] += 1
+            if burned >= burn_goal:
+                bucket["days_met_burn_goal"] += 1
+
+    return [buckets[key] for key in sorted(buckets)]
@@ -0,0 +1,63 @@
+"""
+Per-user data version stamps for conditional GETs.
+
+Every write that changes a user's logs or goals bumps a counter in
+data_versions. Endpoints that depend on require_data_version() derive
+their ETag from that counter, the request URL and the current day, so a
+matching If-None-Match is answered with 304 after one point read, before
+the endpoint queries or serializes anything.
+"""
+import hashlib
+from datetime import date
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
+from app.database import get_database
+from app.utils.dependencies import get_current_user
+from app.utils.http_cache import DATA_ETAG_STATE_KEY, etag_matches
+
+COLLECTION_NAME = "data_versions"
+
+async def bump_data_version(db, user_id: str):
+    """
+    Invalidate ETags for a user's data after a write.
+
+    Args:
+        db: Motor database
+        user_id: User ID as a string
+    """
+    try:
+        await db[COLLECTION_NAME].update_one({"_id": user_id}, {"$inc": {"version": 1}}, upsert=True)
+    except Exception as e:
+        print(f"⚠️ Data version bump failed for {user_id}: {e}")
+
+async def get_data_version(db, user_id: str) -> Optional[int]:
+    """
+    Read a user's data version.
+
+    Returns:
+        Version counter (0 if never written), or None if it can't be read
+    """
+    try:
+        doc = await db[COLLECTION_NAME].find_one({"_id": user_id})
+    except Exception as e:
+        print(f"⚠️ Data version lookup failed for {user_id}: {e}")
+        return None
+    return doc["version"] if doc else 0
+
+async def require_data_version(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Dependency answering If-None-Match from the user's data version.
+
+    Raises:
+        HTTPException: 304 when the client's copy is current
+    """
+    user_id = str(current_user["_id"])
+    version = await get_data_version(get_database(), user_id)
+    if version is None:
+        return
+
+    stamp = f"{user_id}:{version}:{date.today().isoformat()}:{request.url.path}?{request.url.query}"
+    etag = 'W/"' + hashlib.sha256(stamp.encode()).hexdigest()[:32] + '"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    setattr(request.state, DATA_ETAG_STATE_KEY, etag)
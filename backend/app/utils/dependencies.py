@@ -7,6 +7,7 @@ from jose import JWTError
 from bson import ObjectId
 from app.database import get_database
 from app.auth.jwt_handler import verify_token
+from app.utils.user_cache import user_cache
 
 # Security scheme for bearer token
 security = HTTPBearer()
@@ -46,11 +47,18 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Serve from the short-lived user cache when possible
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
     # Get user from MongoDB
     db = get_database()
     user = await db.users.find_one({"_id": ObjectId(user_id)})
     
     if user is None:
         raise credentials_exception
+    
+    user_cache.set(user_id, user)
         
     return user
@@ -0,0 +1,52 @@
+"""
+Fast JSON rendering for list endpoints.
+
+The default path builds one Pydantic model per document, then FastAPI
+validates the list again against response_model and encodes it. The fast
+path validates the raw MongoDB documents once through a cached TypeAdapter
+(ObjectId "_id" maps to "id" in the response models) and serializes them
+with pydantic-core's Rust JSON encoder, returning the bytes directly.
+
+Enable with FAST_JSON_RESPONSES=true.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Type
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def dump_documents_json(model: Type[BaseModel], docs: List[dict]) -> bytes:
+    """
+    Validate MongoDB documents against a response model and encode them.
+
+    Args:
+        model: Response model whose "id" accepts a raw "_id"
+        docs: Documents as returned by the driver (not mutated)
+
+    Returns:
+        JSON array bytes
+    """
+    adapter = _list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(docs))
+
+def document_list_response(model: Type[BaseModel], docs: List[dict],
+                           headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Build a JSON response for a list of documents, bypassing response_model.
+
+    Args:
+        model: Response model for each item
+        docs: Documents as returned by the driver
+        headers: Extra response headers
+
+    Returns:
+        Response with the encoded list
+    """
+    return Response(
+        content=dump_documents_json(model, docs),
+        media_type="application/json",
+        headers=headers
+    )
@@ -0,0 +1,29 @@
+"""
+HTTP conditional request helpers (ETag / If-None-Match)
+"""
+import hashlib
+from typing import Optional
+
+# Request state key holding an ETag precomputed by the endpoint's dependencies
+DATA_ETAG_STATE_KEY = "data_etag"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" refer to the same representation
+    candidates = [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def body_etag(body: bytes) -> str:
+    """
+    Compute a strong ETag for a response body.
+
+    Args:
+        body: Serialized response
+
+    Returns:
+        Quoted ETag value
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
@@ -0,0 +1,32 @@
+"""
+Lightweight metrics registry exposed through the /metrics endpoint
+"""
+from typing import Any, Callable, Dict
+
+# Subsystem name -> callable returning a JSON-serializable stats dict
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    """
+    Register a stats provider for a subsystem.
+
+    Args:
+        name: Key under which the stats appear in the snapshot
+        provider: Callable returning the current stats
+    """
+    _providers[name] = provider
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """
+    Collect stats from every registered provider.
+
+    Returns:
+        Dictionary of subsystem name to stats
+    """
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -3,7 +3,8 @@ MongoDB helper utilities for database operations
 """
 from bson import ObjectId
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Annotated, Optional, Dict, Any
+from pydantic import AliasChoices, BeforeValidator, Field
 
 def serialize_doc(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """
@@ -36,6 +37,20 @@ def serialize_docs(docs: list) -> list:
     """
     return [serialize_doc(doc) for doc in docs]
 
+def _object_id_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+# String field that also accepts a raw ObjectId
+ObjectIdStr = Annotated[str, BeforeValidator(_object_id_to_str)]
+
+def document_id_field():
+    """
+    Field for a response model's "id" that validates from either "id" or a
+    raw MongoDB "_id", so models can be built from documents as returned by
+    the driver without serialize_doc().
+    """
+    return Field(validation_alias=AliasChoices("id", "_id"))
+
 class PyObjectId(ObjectId):
     """Custom ObjectId type for Pydantic models"""
     
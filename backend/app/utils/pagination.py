@@ -0,0 +1,142 @@
+"""
+Keyset pagination and field projection helpers for listings.
+
+Pages are ordered by (date, _id) descending. The cursor is an opaque,
+URL-safe encoding of the last returned (date, _id), and the next page
+starts strictly after it, so each page is one index range scan however
+deep the caller has scrolled.
+"""
+import base64
+import json
+from typing import Iterable, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SORT_ORDER = [("date", -1), ("_id", -1)]
+
+def encode_cursor_values(values: list) -> str:
+    """
+    Encode JSON-serializable sort key values as an opaque cursor.
+
+    Args:
+        values: Sort key values of the last returned document
+
+    Returns:
+        Opaque, URL-safe cursor string
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor_values(cursor: str, count: int) -> list:
+    """
+    Decode a cursor from encode_cursor_values().
+
+    Args:
+        cursor: Cursor string
+        count: Number of values the cursor must hold
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != count:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def decode_object_id(value) -> ObjectId:
+    """Parse the _id tiebreaker of a decoded cursor"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_cursor(doc: dict) -> str:
+    """
+    Encode the position after a log document.
+
+    Args:
+        doc: Last document of a page (needs date and _id)
+
+    Returns:
+        Opaque cursor string
+    """
+    return encode_cursor_values([doc["date"], str(doc["_id"])])
+
+def decode_cursor(cursor: str) -> Tuple[str, ObjectId]:
+    """
+    Decode a cursor from encode_cursor().
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    date, object_id = decode_cursor_values(cursor, 2)
+    return str(date), decode_object_id(object_id)
+
+def keyset_filter(cursor: Optional[str]) -> dict:
+    """
+    Build the query condition selecting documents after a cursor.
+
+    Args:
+        cursor: Cursor from the previous page, or None for the first page
+
+    Returns:
+        Filter to merge into the listing query (empty for the first page)
+    """
+    if not cursor:
+        return {}
+    date, object_id = decode_cursor(cursor)
+    return {"$or": [
+        {"date": {"$lt": date}},
+        {"date": date, "_id": {"$lt": object_id}}
+    ]}
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields= parameter.
+
+    Args:
+        fields: Raw parameter value, e.g. "food_name,calories"
+        allowed: Fields the response model exposes
+
+    Returns:
+        Requested field names, or None to return every field
+
+    Raises:
+        HTTPException: 400 if a field is unknown
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def mongo_projection(fields: Optional[List[str]]) -> Optional[dict]:
+    """
+    Build a find() projection for the requested fields.
+
+    The cursor keys (date, _id) are always fetched.
+
+    Args:
+        fields: Output of parse_fields()
+
+    Returns:
+        Projection document, or None for full documents
+    """
+    if fields is None:
+        return None
+    projection = {field: 1 for field in fields if field != "id"}
+    projection["date"] = 1
+    return projection
+
+def project_doc(doc: dict, fields: List[str]) -> dict:
+    """Reduce a serialized document to the requested fields"""
+    return {field: doc.get(field) for field in fields}
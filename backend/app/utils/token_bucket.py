@@ -0,0 +1,58 @@
+"""
+Token bucket rate limiter
+"""
+import asyncio
+import time
+from typing import Tuple
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    Not thread-safe; intended to be used from the event loop only.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> Tuple[bool, float]:
+        """
+        Take tokens if available.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            Tuple of (acquired, seconds until enough tokens are available)
+        """
+        if self.rate <= 0:
+            return True, 0.0
+
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True, 0.0
+
+        return False, (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1):
+        """
+        Wait until tokens are available, then take them.
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        while True:
+            acquired, wait = self.try_acquire(tokens)
+            if acquired:
+                return
+            await asyncio.sleep(wait)
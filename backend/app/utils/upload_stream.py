@@ -0,0 +1,49 @@
+"""
+Single-pass helpers for multipart uploads.
+
+Starlette keeps each UploadFile in a SpooledTemporaryFile that rolls over to
+disk past 1 MB, so the upload is already on disk by the time a handler runs.
+These helpers hash and size-check it chunk by chunk, and callers then decode
+from the same file object, so the upload is never held in memory as bytes.
+"""
+import hashlib
+from typing import Tuple
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 256 * 1024
+
+async def hash_upload(upload: UploadFile, max_size: int) -> Tuple[str, int]:
+    """
+    Stream an upload once, computing its SHA-256 and enforcing a size cap.
+
+    The file position is reset to the start afterwards.
+
+    Args:
+        upload: Uploaded file
+        max_size: Maximum allowed size in bytes
+
+    Returns:
+        Tuple of (hex digest, size in bytes)
+
+    Raises:
+        HTTPException: 413 as soon as the upload exceeds max_size
+    """
+    # Reject on the size Starlette already knows before reading anything
+    if upload.size is not None and upload.size > max_size:
+        raise HTTPException(413, "Image exceeds maximum upload size")
+
+    digest = hashlib.sha256()
+    size = 0
+
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(413, "Image exceeds maximum upload size")
+        digest.update(chunk)
+
+    await upload.seek(0)
+    return digest.hexdigest(), size
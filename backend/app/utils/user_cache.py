@@ -0,0 +1,88 @@
+"""
+Authenticated-user cache for get_current_user.
+
+User documents are cached per user ID for a short TTL so authenticated
+requests skip the users lookup. Writes in this process invalidate entries
+explicitly; other workers see changes after the TTL, or immediately when
+the optional MongoDB change-stream watcher is enabled (requires a replica
+set, which Atlas always provides).
+"""
+import asyncio
+from typing import Optional
+from app.config import settings
+from app.database import get_database
+from app.utils.metrics import register_metrics
+from app.utils.ttl_cache import TTLCache
+
+class UserCache:
+    """Short-TTL, size-bounded cache of user documents"""
+
+    def __init__(self):
+        self._cache = TTLCache(
+            max_size=settings.USER_CACHE_SIZE,
+            ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+        )
+        self._watch_task: Optional[asyncio.Task] = None
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """
+        Get a cached user document.
+
+        Args:
+            user_id: User ID as a string
+
+        Returns:
+            A shallow copy of the document (callers may mutate it), or None
+        """
+        user = self._cache.get(user_id)
+        return dict(user) if user is not None else None
+
+    def set(self, user_id: str, user: dict):
+        """Cache a user document"""
+        self._cache.set(user_id, dict(user))
+
+    def invalidate(self, user_id: str):
+        """Drop a user's cached document after it changes"""
+        self._cache.pop(user_id)
+        self.invalidations += 1
+
+    async def _watch(self):
+        """Invalidate entries for users changed by any process"""
+        db = get_database()
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}}]
+        try:
+            async with db.users.watch(pipeline) as stream:
+                async for change in stream:
+                    self._cache.pop(str(change["documentKey"]["_id"]))
+                    self.remote_invalidations += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ User cache change stream stopped, relying on TTL only: {e}")
+
+    def start(self):
+        """Start the change-stream watcher if enabled"""
+        if settings.USER_CACHE_CHANGE_STREAM and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        """Stop the change-stream watcher"""
+        if self._watch_task:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    def stats(self) -> dict:
+        """Return hit-rate and invalidation counters"""
+        return {
+            **self._cache.stats(),
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "change_stream": self._watch_task is not None and not self._watch_task.done()
+        }
+
+# Shared user cache
+user_cache = UserCache()
+register_metrics("user_cache", user_cache.stats)
@@ -0,0 +1,134 @@
+"""
+Load test: parallel booking attempts must never double-book a trainer.
+
+Creates a throwaway trainer and users, fires concurrent POST
+/api/trainers/{id}/book requests for overlapping sessions through the ASGI
+app (against the configured MongoDB), then checks that no two accepted
+bookings overlap and that every accepted booking holds exactly its slots.
+Test data is removed afterwards. Exits non-zero on a double booking.
+
+Usage (from the backend directory, with DATABASE_URL set):
+    python -m benchmarks.booking_race [attempts]
+"""
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth.jwt_handler import create_access_token
+from app.config import settings
+from app.services.trainer_slots import local_midnight, to_local
+
+async def run(db, app, attempts: int) -> dict:
+    """
+    Race booking attempts and verify the outcome.
+
+    Args:
+        db: Motor database the app is connected to
+        app: ASGI application
+        attempts: Number of concurrent booking requests
+
+    Returns:
+        Counts of accepted, conflicting and other responses, latency
+        percentiles and the number of overlapping accepted pairs
+    """
+    run_id = uuid.uuid4().hex[:8]
+    trainer = {
+        "name": f"Load Test {run_id}",
+        "email": f"load-test-{run_id}@example.com",
+        "specialization": "Load Test",
+        "bio": "",
+        "experience_years": 1,
+        "certifications": [],
+        "hourly_rate": 100.0,
+        "availability": [],
+        "rating": 0.0,
+        "total_reviews": 0,
+        "is_verified": False,
+        "created_at": datetime.utcnow()
+    }
+    trainer_id = str((await db.trainers.insert_one(trainer)).inserted_id)
+
+    users = [{"email": f"load-test-{run_id}-{i}@example.com", "full_name": "Load Test"}
+             for i in range(attempts)]
+    user_ids = [str(user_id) for user_id in (await db.users.insert_many(users)).inserted_ids]
+
+    # Sessions of 1-2 slots starting within a 3-slot window tomorrow all overlap heavily
+    slot = timedelta(minutes=settings.TRAINER_SLOT_MINUTES)
+    tomorrow = to_local(datetime.utcnow()).date() + timedelta(days=1)
+    first_slot = local_midnight(tomorrow) + timedelta(hours=settings.TRAINER_DAY_START_HOUR + 2)
+
+    async def attempt(client: httpx.AsyncClient, user_id: str):
+        start = first_slot + slot * random.randrange(3)
+        hours = settings.TRAINER_SLOT_MINUTES * random.choice([1, 2]) / 60
+        token = create_access_token({"user_id": user_id})
+        began = time.perf_counter()
+        response = await client.post(
+            f"/api/trainers/{trainer_id}/book",
+            json={"trainer_id": trainer_id, "session_date": start.isoformat(), "duration_hours": hours},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        return response.status_code, time.perf_counter() - began
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            outcomes = await asyncio.gather(*(attempt(client, user_id) for user_id in user_ids))
+
+        bookings = await db.bookings.find({"trainer_id": trainer_id}).to_list(length=None)
+        intervals = sorted(
+            (booking["session_date"], booking["session_date"] + timedelta(hours=booking["duration_hours"]))
+            for booking in bookings
+        )
+        overlaps = sum(1 for (_, end), (start, _) in zip(intervals, intervals[1:]) if start < end)
+
+        held = await db.trainer_slots.count_documents({"trainer_id": trainer_id})
+        expected = sum(
+            round(booking["duration_hours"] * 60 / settings.TRAINER_SLOT_MINUTES) for booking in bookings
+        )
+
+        latencies = sorted(seconds * 1000 for _, seconds in outcomes)
+        return {
+            "attempts": attempts,
+            "accepted": sum(1 for status, _ in outcomes if status == 201),
+            "conflicts": sum(1 for status, _ in outcomes if status == 409),
+            "other": sum(1 for status, _ in outcomes if status not in (201, 409)),
+            "bookings": len(bookings),
+            "overlaps": overlaps,
+            "slots_held": held,
+            "slots_expected": expected,
+            "p50_ms": round(latencies[len(latencies) // 2], 1),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1)
+        }
+    finally:
+        await db.trainer_slots.delete_many({"trainer_id": trainer_id})
+        await db.bookings.delete_many({"trainer_id": trainer_id})
+        await db.trainers.delete_one({"email": trainer["email"]})
+        await db.users.delete_many({"email": {"$regex": f"^load-test-{run_id}-"}})
+
+async def _main(attempts: int):
+    from app.database import connect_to_mongo, close_mongo_connection, get_database
+    from app.indexes import ensure_indexes
+    from app.main import app
+
+    await connect_to_mongo(apply_indexes_in_background=False)
+    try:
+        db = get_database()
+        # The unique slot index is what makes booking conflict-free
+        await ensure_indexes(db)
+        result = await run(db, app, attempts)
+    finally:
+        await close_mongo_connection()
+
+    for key, value in result.items():
+        print(f"{key:<18}{value}")
+    ok = result["overlaps"] == 0 and result["slots_held"] == result["slots_expected"]
+    print("✅ No double bookings" if ok else "❌ Double booking detected")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
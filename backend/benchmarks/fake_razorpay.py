@@ -0,0 +1,144 @@
+"""
+Local fake of the Razorpay orders and payments API.
+
+Implements just what the backend calls (POST /v1/orders, GET
+/v1/orders/{id}, GET /v1/payments/{id}) with Razorpay's response and error
+shapes, plus optional latency and failure injection, so payment flows can
+be exercised and load-tested without real credentials or network access.
+GET /_stats reports how many orders were created.
+
+Usage (from the backend directory):
+    python -m benchmarks.fake_razorpay [--port 9090] [--latency 0.2] [--fail-rate 0.1]
+    RAZORPAY_BASE_URL=http://127.0.0.1:9090 uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeRazorpay:
+    """In-memory order and payment store with latency/failure injection"""
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.orders = {}
+        self.payments = {}
+        self.lock = threading.Lock()
+
+    def create_order(self, data: dict) -> dict:
+        order = {
+            "id": f"order_{uuid.uuid4().hex[:14]}",
+            "entity": "order",
+            "amount": data["amount"],
+            "amount_paid": 0,
+            "amount_due": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt"),
+            "status": "created",
+            "attempts": 0,
+            "notes": data.get("notes") or [],
+            "created_at": int(time.time())
+        }
+        with self.lock:
+            self.orders[order["id"]] = order
+        return order
+
+def make_handler(fake: FakeRazorpay):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _error(self, status: int, code: str, description: str):
+            self._reply(status, {"error": {"code": code, "description": description}})
+
+        def _prepare(self) -> bool:
+            """Apply injected latency/failures and check basic auth"""
+            if fake.latency:
+                time.sleep(fake.latency)
+            if random.random() < fake.fail_rate:
+                self._error(500, "SERVER_ERROR", "Injected failure")
+                return False
+            if not self.headers.get("Authorization", "").startswith("Basic "):
+                self._error(401, "BAD_REQUEST_ERROR", "Authentication failed")
+                return False
+            return True
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path != "/v1/orders":
+                self._error(404, "BAD_REQUEST_ERROR", "The requested URL was not found on the server.")
+                return
+            if not self._prepare():
+                return
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                self._error(400, "BAD_REQUEST_ERROR", "Invalid JSON body")
+                return
+            if not isinstance(data.get("amount"), int) or data["amount"] < 100:
+                self._error(400, "BAD_REQUEST_ERROR", "Order amount less than minimum amount allowed")
+                return
+            self._reply(200, fake.create_order(data))
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/_stats":
+                self._reply(200, {"orders": len(fake.orders), "payments": len(fake.payments)})
+                return
+            if not self._prepare():
+                return
+            for prefix, store in (("/v1/orders/", fake.orders), ("/v1/payments/", fake.payments)):
+                if path.startswith(prefix):
+                    entity = store.get(path[len(prefix):])
+                    if entity is None:
+                        self._error(400, "BAD_REQUEST_ERROR", "The id provided does not exist")
+                    else:
+                        self._reply(200, entity)
+                    return
+            self._error(404, "BAD_REQUEST_ERROR", "The requested URL was not found on the server.")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_fake_razorpay(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+    """
+    Serve a fake Razorpay API on a background thread.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds to delay each API response
+        fail_rate: Fraction of API requests answered with a 500
+
+    Returns:
+        (server, fake) - base URL is http://127.0.0.1:{server.server_port};
+        call server.shutdown() to stop
+    """
+    fake = FakeRazorpay(latency, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay each response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests that fail with 500")
+    args = parser.parse_args()
+
+    server, _ = start_fake_razorpay(args.port, args.latency, args.fail_rate)
+    print(f"✅ Fake Razorpay listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
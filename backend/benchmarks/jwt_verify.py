@@ -0,0 +1,51 @@
+"""
+Benchmark JWT verification backends behind verify_token.
+
+Compares python-jose, the stdlib "native" HMAC backend, and a warm
+verified-claims cache on the same token.
+
+Usage (from the backend directory):
+    python -m benchmarks.jwt_verify [iterations]
+"""
+import os
+import sys
+import timeit
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.config import settings
+from app.auth import jwt_handler
+from app.auth.jwt_handler import create_access_token, verify_token
+
+def run(iterations: int):
+    token = create_access_token({"user_id": "65a1f0c2e4b0a1b2c3d4e5f6"})
+
+    def uncached():
+        jwt_handler._claims_cache.clear()
+        verify_token(token)
+
+    def cached():
+        verify_token(token)
+
+    cases = [
+        ("jose (uncached)", "jose", uncached),
+        ("native (uncached)", "native", uncached),
+        ("cache hit", "jose", cached),
+    ]
+
+    # Both backends must agree on the claims
+    settings.JWT_BACKEND = "jose"
+    jose_claims = jwt_handler._decode(token)
+    settings.JWT_BACKEND = "native"
+    assert jwt_handler._decode(token) == jose_claims
+
+    print(f"{'backend':<20}{'us/op':>10}{'ops/s':>12}")
+    for name, backend, func in cases:
+        settings.JWT_BACKEND = backend
+        func()
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        per_op = seconds / iterations
+        print(f"{name:<20}{per_op * 1e6:>10.2f}{1 / per_op:>12.0f}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,78 @@
+"""
+Benchmark list endpoint serialization: default path vs FAST_JSON_RESPONSES.
+
+Serves the same food log documents from two routes of a bare FastAPI app
+and times full requests through the ASGI stack (no network, no database),
+so the difference is model building, validation and JSON encoding only.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization [repeats]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from typing import List
+from app.schemas.food_log import FoodLogResponse
+from app.utils.fast_json import document_list_response
+from app.utils.mongo_helpers import serialize_doc
+
+SIZES = (50, 500, 5000)
+
+def make_docs(count: int) -> List[dict]:
+    now = datetime.utcnow().isoformat()
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": "65a1f0c2e4b0a1b2c3d4e5f6",
+            "food_name": f"Chicken salad {i}",
+            "quantity": "1 bowl",
+            "calories": 350.5 + i,
+            "protein": "30g",
+            "carbs": "12g",
+            "fats": "18g",
+            "image_path": f"/uploads/ab/cd/{i:064x}.jpg",
+            "is_ai_detected": True,
+            "meal_type": "Lunch",
+            "date": "2024-05-01",
+            "created_at": now
+        }
+        for i in range(count)
+    ]
+
+def build_app(docs: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default", response_model=List[FoodLogResponse])
+    async def default_path():
+        # serialize_doc mutates, so copy like a fresh driver result would be
+        return [FoodLogResponse(**serialize_doc(dict(doc))) for doc in docs]
+
+    @app.get("/fast", response_model=List[FoodLogResponse])
+    async def fast_path():
+        return document_list_response(FoodLogResponse, docs)
+
+    return app
+
+def run(repeats: int):
+    print(f"{'items':>6}{'default ms':>12}{'fast ms':>10}{'speedup':>9}")
+    for size in SIZES:
+        client = TestClient(build_app(make_docs(size)))
+        assert client.get("/default").json() == client.get("/fast").json()
+
+        number = max(1, 2000 // size)
+        timings = {}
+        for path in ("/default", "/fast"):
+            seconds = min(timeit.repeat(lambda: client.get(path), number=number, repeat=repeats))
+            timings[path] = seconds / number * 1000
+        print(f"{size:>6}{timings['/default']:>12.2f}{timings['/fast']:>10.2f}"
+              f"{timings['/default'] / timings['/fast']:>8.1f}x")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
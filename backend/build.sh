@@ -8,3 +8,9 @@ pip install setuptools wheel
 
 # Install dependencies
 pip install -r requirements.txt
+
+# Create indexes and fail the build if a hot query would scan a collection
+python -m app.indexes --check
+
+# Claim trainer slots for bookings made before slot-based booking (idempotent)
+python -m app.services.trainer_slots --backfill
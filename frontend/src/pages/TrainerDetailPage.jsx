@@ -14,9 +14,11 @@ const TrainerDetailPage = () => {
         notes: ''
     });
     const [booking, setBooking] = useState(false);
+    const [slots, setSlots] = useState({ slot_minutes: 30, timezone: undefined, slots: [] });
 
     useEffect(() => {
         fetchTrainer();
+        fetchSlots();
         loadRazorpayScript();
     }, [id]);
 
@@ -31,6 +33,39 @@ const TrainerDetailPage = () => {
         }
     };
 
+    const fetchSlots = async () => {
+        try {
+            const response = await api.get(`/api/trainers/${id}/slots`, { params: { days: 7 } });
+            setSlots(response.data);
+        } catch (error) {
+            console.error('Error fetching slots:', error);
+        }
+    };
+
+    // Start times with enough consecutive free slots for the chosen duration
+    const startOptions = () => {
+        const slotMs = slots.slot_minutes * 60 * 1000;
+        const count = Math.round((bookingData.duration_hours * 60) / slots.slot_minutes);
+        const free = new Set(slots.slots.map((slot) => new Date(slot).getTime()));
+        return slots.slots.filter((slot) => {
+            const start = new Date(slot).getTime();
+            for (let i = 1; i < count; i++) {
+                if (!free.has(start + i * slotMs)) return false;
+            }
+            return true;
+        });
+    };
+
+    const formatSlot = (slot) => new Date(slot).toLocaleString(undefined, {
+        weekday: 'short',
+        month: 'short',
+        day: 'numeric',
+        hour: 'numeric',
+        minute: '2-digit',
+        timeZone: slots.timezone,
+        timeZoneName: 'short'
+    });
+
     const loadRazorpayScript = () => {
         return new Promise((resolve) => {
             const script = document.createElement('script');
@@ -43,23 +78,16 @@ const TrainerDetailPage = () => {
 
     const handleBooking = async () => {
         try {
+            if (!bookingData.session_date) {
+                alert('Please choose a time slot');
+                return;
+            }
             setBooking(true);
 
-            // Debug logging
-            console.log('Booking data:', bookingData);
-            console.log('Session date value:', bookingData.session_date);
-
-            // Format the date properly for backend (use current date if not set)
-            const sessionDate = bookingData.session_date
-                ? new Date(bookingData.session_date).toISOString()
-                : new Date().toISOString();
-
-            console.log('Formatted session date:', sessionDate);
-
-            // Create booking
+            // Create booking for the chosen open slot (UTC, as the server sent it)
             const bookingResponse = await api.post(`/api/trainers/${id}/book`, {
                 trainer_id: id,
-                session_date: sessionDate,
+                session_date: bookingData.session_date,
                 duration_hours: bookingData.duration_hours,
                 notes: bookingData.notes || ''
             });
@@ -81,6 +109,8 @@ const TrainerDetailPage = () => {
                 name: 'FitTrack',
                 description: `Session with ${trainer.name}`,
                 order_id: orderResponse.data.order_id,
+                // Lets payment webhooks find the booking
+                notes: { booking_id: bookingId },
                 handler: async function (response) {
                     // Verify payment
                     try {
@@ -94,7 +124,7 @@ const TrainerDetailPage = () => {
                         alert('Booking confirmed! Check your bookings page.');
                         navigate('/trainers');
                     } catch (error) {
-                        alert('Payment verification failed');
+                        alert(error.response?.data?.detail || 'Payment verification failed');
                     }
                 },
                 prefill: {
@@ -113,6 +143,12 @@ const TrainerDetailPage = () => {
             console.error('Error booking trainer:', error);
             console.error('Error response:', error.response?.data);
 
+            if (error.response?.status === 409) {
+                // Slot was taken meanwhile; show what is still open
+                fetchSlots();
+                setBookingData((current) => ({ ...current, session_date: '' }));
+            }
+
             if (error.response?.status === 401) {
                 alert('Please login to book a trainer session');
             } else if (error.response?.data?.detail) {
@@ -210,21 +246,11 @@ const TrainerDetailPage = () => {
                 <h2 className="text-2xl font-bold text-white mb-6">Book a Session</h2>
 
                 <div className="space-y-6">
-                    <div>
-                        <label className="block text-dark-text mb-2">Session Date & Time</label>
-                        <input
-                            type="datetime-local"
-                            value={bookingData.session_date}
-                            onChange={(e) => setBookingData({ ...bookingData, session_date: e.target.value })}
-                            className="w-full bg-dark-bg border border-dark-border rounded-lg px-4 py-3 text-white focus:outline-none focus:border-primary"
-                        />
-                    </div>
-
                     <div>
                         <label className="block text-dark-text mb-2">Duration (hours)</label>
                         <select
                             value={bookingData.duration_hours}
-                            onChange={(e) => setBookingData({ ...bookingData, duration_hours: parseFloat(e.target.value) })}
+                            onChange={(e) => setBookingData({ ...bookingData, duration_hours: parseFloat(e.target.value), session_date: '' })}
                             className="w-full bg-dark-bg border border-dark-border rounded-lg px-4 py-3 text-white focus:outline-none focus:border-primary"
                         >
                             <option value={0.5}>30 minutes</option>
@@ -235,6 +261,22 @@ const TrainerDetailPage = () => {
                         </select>
                     </div>
 
+                    <div>
+                        <label className="block text-dark-text mb-2">Session Date & Time</label>
+                        <select
+                            value={bookingData.session_date}
+                            onChange={(e) => setBookingData({ ...bookingData, session_date: e.target.value })}
+                            className="w-full bg-dark-bg border border-dark-border rounded-lg px-4 py-3 text-white focus:outline-none focus:border-primary"
+                        >
+                            <option value="">
+                                {startOptions().length ? 'Choose a time slot' : 'No open slots in the next 7 days'}
+                            </option>
+                            {startOptions().map((slot) => (
+                                <option key={slot} value={slot}>{formatSlot(slot)}</option>
+                            ))}
+                        </select>
+                    </div>
+
                     <div>
                         <label className="block text-dark-text mb-2">Notes (Optional)</label>
                         <textarea
@@ -264,7 +306,7 @@ const TrainerDetailPage = () => {
 
                     <button
                         onClick={handleBooking}
-                        disabled={booking}
+                        disabled={booking || !bookingData.session_date}
                         className="w-full bg-primary hover:bg-emerald-600 text-white font-semibold py-4 rounded-lg transition-all disabled:opacity-50 disabled:cursor-not-allowed flex items-center justify-center gap-2"
                     >
                         {booking ? (